@@ -0,0 +1,69 @@
+"""
+Headless batch mode: run a JSONL file of prompts through Ollama models.
+
+Each line of the input is an object like {"id": "q1", "prompt": "...",
+"model": "llama3", "system": "..."}; only "prompt" is required. Every
+prompt without a "model" is sent to each model of the run. Results are
+appended to the output file as they finish, and running the same command
+again skips the prompts that already succeeded. A report with throughput
+and latency percentiles per model is printed at the end.
+
+Usage:
+    python batch_chat.py prompts.jsonl --output results.jsonl --models llama3,gemma2:2b --concurrency 8
+    python batch_chat.py prompts.jsonl --output results.jsonl --all-models
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from src.services.batch import BatchRunner, read_prompts
+from src.services.catalog import model_catalog
+from src.services.client_pool import client_pool
+from src.services.hosts import host_pool
+from src.services.models import DEFAULT_MODEL, ModelManager
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """Resolve the models and run the prompts."""
+    await host_pool.refresh()
+    host_pool.start()
+    try:
+        if args.all_models:
+            await model_catalog.refresh()
+            models = [model.get('model') for model in ModelManager().get_available_models()]
+            if not models:
+                raise SystemExit('No models found. Please install models using Ollama.')
+        else:
+            models = [name.strip() for name in args.models.split(',') if name.strip()]
+        runner = BatchRunner(models, args.output, concurrency=args.concurrency)
+        return await runner.run(read_prompts(args.prompts))
+    finally:
+        await client_pool.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('prompts', help='JSONL file with one prompt per line')
+    parser.add_argument('--output', required=True, help='JSONL file the results are appended to')
+    parser.add_argument('--models', default=DEFAULT_MODEL, help=f'comma-separated models (default: {DEFAULT_MODEL})')
+    parser.add_argument('--all-models', action='store_true', help='run every model installed on the Ollama hosts')
+    parser.add_argument('--concurrency', type=int, default=4, help='requests in flight at once (default: 4)')
+    parser.add_argument('--report', help='also write the report to this file')
+    args = parser.parse_args()
+
+    try:
+        report = asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print('Interrupted; run the same command again to continue.', file=sys.stderr)
+        sys.exit(130)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""
+Simulated browser tabs and server helpers for the benchmarks.
+
+A `Tab` loads a page over HTTP, connects to the NiceGUI websocket like a
+browser does and keeps a copy of the page's elements up to date, so a
+benchmark can find buttons and inputs and trigger their events.
+"""
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_ELEMENTS_PATTERN = re.compile(r'parseElements\(String\.raw`(.*?)`\)', re.S)
+
+
+def _parse_elements(raw: str) -> Dict[str, Dict]:
+    """Decode the elements embedded in a NiceGUI page (mirrors parseElements in nicegui.js)."""
+    for entity, char in (('&#36;', '$'), ('&#96;', '`'), ('&gt;', '>'), ('&lt;', '<'), ('&amp;', '&')):
+        raw = raw.replace(entity, char)
+    return json.loads(raw)
+
+
+class Tab:
+    """A simulated browser tab connected to the NiceGUI websocket."""
+
+    def __init__(self, base_url: str, path: str = '/'):
+        self.base_url = base_url
+        self.path = path
+        self.client_id: Optional[str] = None
+        self.elements: Dict[str, Dict] = {}
+        self.messages = 0
+        self.bytes = 0
+        self.sio = None
+        self._listeners: List[Callable[[str, Any], None]] = []
+        self._changed = asyncio.Event()
+
+    async def open(self, http) -> None:
+        """Load the page and connect to its websocket."""
+        import socketio
+
+        response = await http.get(self.base_url + self.path)
+        self.client_id = re.search(r'["\']client_id["\']:\s*["\']([^"\']+)', response.text).group(1)
+        match = _ELEMENTS_PATTERN.search(response.text)
+        if match is not None:
+            self.elements = _parse_elements(match.group(1))
+        self.sio = socketio.AsyncClient(reconnection=False)
+
+        @self.sio.on('*')
+        async def receive(event, data=None):
+            self.messages += 1
+            self.bytes += len(json.dumps(data, default=str))
+            if event == 'update':
+                for element_id, element in data.items():
+                    if element_id == '_id':
+                        continue
+                    if element is None:
+                        self.elements.pop(element_id, None)
+                    else:
+                        self.elements[element_id] = element
+            for listener in list(self._listeners):
+                listener(event, data)
+            self._changed.set()
+
+        await self.sio.connect(f'{self.base_url}?client_id={self.client_id}&next_message_id=0',
+                               socketio_path='/_nicegui_ws/socket.io', transports=['websocket'],
+                               wait_timeout=60)
+        ok = await self.sio.call('handshake', {
+            'client_id': self.client_id,
+            'document_id': f'bench-{id(self)}',
+            'tab_id': f'bench-{id(self)}',
+            'old_tab_id': None,
+            'next_message_id': 0,
+        })
+        if not ok:
+            raise RuntimeError(f'Handshake failed for client {self.client_id}')
+
+    async def close(self) -> None:
+        """Disconnect from the server."""
+        if self.sio is not None:
+            await self.sio.disconnect()
+
+    def on_message(self, listener: Callable[[str, Any], None]) -> Callable[[], None]:
+        """Call listener(event, data) for every incoming message; returns a function that removes it."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def find(self, tag: Optional[str] = None, label: Optional[str] = None, text: Optional[str] = None,
+             placeholder: Optional[str] = None) -> List[str]:
+        """Ids of the elements matching all given criteria."""
+        return [
+            element_id for element_id, element in self.elements.items()
+            if (tag is None or element.get('tag') == tag)
+            and (label is None or element.get('props', {}).get('label') == label)
+            and (text is None or element.get('text') == text)
+            and (placeholder is None or element.get('props', {}).get('placeholder') == placeholder)
+        ]
+
+    def find_one(self, **criteria) -> str:
+        """Id of the single element matching the criteria."""
+        matches = self.find(**criteria)
+        if not matches:
+            raise LookupError(f'No element matches {criteria}')
+        return matches[0]
+
+    def is_visible(self, element_id: str) -> bool:
+        """Whether an element is shown (NiceGUI hides elements with the 'hidden' class)."""
+        element = self.elements.get(element_id)
+        return element is not None and 'hidden' not in element.get('class', [])
+
+    async def trigger(self, element_id: str, event_type: str, *args: Any) -> None:
+        """Fire an event of an element like the browser would."""
+        element = self.elements[element_id]
+        listener = next(listener for listener in element.get('events', []) if listener['type'] == event_type)
+        await self.sio.emit('event', {
+            'id': int(element_id),
+            'client_id': self.client_id,
+            'listener_id': listener['listener_id'],
+            'args': [json.dumps(arg) for arg in args],
+        })
+
+    async def click(self, element_id: str) -> None:
+        """Click an element."""
+        await self.trigger(element_id, 'click', {})
+
+    async def set_value(self, element_id: str, value: Any) -> None:
+        """Change the value of an input element."""
+        await self.trigger(element_id, 'update:value', value)
+
+    async def wait_for(self, condition: Callable[[], bool], timeout: float = 60.0) -> float:
+        """Wait until condition() holds after an incoming message; returns the time it was met."""
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self._changed.clear()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError('Condition not met in time')
+            try:
+                await asyncio.wait_for(self._changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+        return time.monotonic()
+
+
+async def wait_for_server(http, url: str, attempts: int = 300) -> None:
+    """Poll a URL until the server answers."""
+    import httpx
+
+    for _ in range(attempts):
+        try:
+            await http.get(url)
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f'Server at {url} did not start')
+
+
+def start_process(arguments: List[str], cwd: str = ROOT, env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    """Start a Python script in a subprocess without output."""
+    return subprocess.Popen([sys.executable, *arguments], cwd=cwd, env={**os.environ, **(env or {})},
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def stop_process(process: subprocess.Popen) -> None:
+    """Terminate a subprocess and wait for it."""
+    process.terminate()
+    process.wait()
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """Median, 95th percentile and maximum of measurements in seconds."""
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def at(fraction: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 4)
+
+    return {'count': len(ordered), 'p50': at(0.5), 'p95': at(0.95), 'max': round(ordered[-1], 4)}
@@ -0,0 +1,134 @@
+"""
+Benchmark: server CPU and websocket traffic of idle chat tabs.
+
+Starts a NiceGUI server whose page mirrors `simple_chat_app.main` with a
+pre-filled chat history, connects N simulated tabs over the NiceGUI
+websocket and measures the server's CPU time while all tabs sit idle.
+
+Usage:
+    python benchmarks/idle_tabs.py                  # event-driven rendering
+    python benchmarks/idle_tabs.py --legacy-timer   # old 100 ms full refresh
+
+With the legacy timer the server saturates long before 50 tabs are
+connected, so compare it with a smaller `--tabs` value.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+from driver import ROOT, Tab, wait_for_server
+
+CPU_ENDPOINT = '/_bench/cpu'
+LEGACY_REFRESH_INTERVAL = 0.1  # Refresh interval of the removed UI timer
+
+
+def serve(port: int, history: int, legacy_timer: bool) -> None:
+    """Run the benchmark server (executed in a subprocess)."""
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+    from nicegui import app, ui
+    from src.styles.styles import add_chat_styles, serve_static_files
+    from src.services.models import ModelManager
+    from src.components.chat import ChatManager
+    from src.config.config import USER_ID, AI_ID, MAX_WIDTH, MARGIN_Y, MARGIN_X
+
+    @app.get(CPU_ENDPOINT)
+    def cpu_time() -> dict:
+        return {'cpu': time.process_time()}
+
+    serve_static_files()
+
+    @ui.page('/')
+    def main():
+        add_chat_styles()
+        chat_manager = ChatManager(ModelManager())
+        created_at = int(time.time())
+        for i in range(history):
+            if i % 2 == 0:
+                chat_manager.history.append(USER_ID, f'Question number {i}?', created_at)
+            else:
+                chat_manager.history.append(AI_ID, f'**Answer {i}**\n\n- first point\n- second point\n\n`code {i}`', created_at)
+        with ui.column().classes(f'w-full max-w-{MAX_WIDTH} {MARGIN_X} {MARGIN_Y}'):
+            chat_manager.chat_messages()
+            if legacy_timer:
+                ui.timer(LEGACY_REFRESH_INTERVAL, chat_manager.chat_messages.refresh)
+
+    ui.run(port=port, show=False, reload=False, reconnect_timeout=30, storage_secret='benchmark')
+
+
+async def measure(port: int, tabs: int, duration: float, warmup: float) -> dict:
+    """Connect idle tabs and sample the server CPU time."""
+    import httpx
+
+    base_url = f'http://127.0.0.1:{port}'
+    async with httpx.AsyncClient(timeout=60) as http:
+        await wait_for_server(http, base_url + CPU_ENDPOINT)
+
+        open_tabs = [Tab(base_url) for _ in range(tabs)]
+        try:
+            for tab in open_tabs:
+                await tab.open(http)
+            await asyncio.sleep(warmup)
+
+            for tab in open_tabs:
+                tab.messages = tab.bytes = 0
+            cpu_start = (await http.get(base_url + CPU_ENDPOINT)).json()['cpu']
+            await asyncio.sleep(duration)
+            cpu_end = (await http.get(base_url + CPU_ENDPOINT)).json()['cpu']
+        finally:
+            for tab in open_tabs:
+                await tab.close()
+
+    ws_messages = sum(tab.messages for tab in open_tabs)
+    ws_bytes = sum(tab.bytes for tab in open_tabs)
+    cpu_seconds = cpu_end - cpu_start
+    return {
+        'cpu_seconds': round(cpu_seconds, 3),
+        'cpu_percent': round(100 * cpu_seconds / duration, 1),
+        'ws_messages_per_second': round(ws_messages / duration, 1),
+        'ws_bytes_per_second': round(ws_bytes / duration),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tabs', type=int, default=50, help='number of idle tabs (default: 50)')
+    parser.add_argument('--history', type=int, default=200, help='messages per tab (default: 200)')
+    parser.add_argument('--duration', type=float, default=10.0, help='measurement window in seconds')
+    parser.add_argument('--warmup', type=float, default=3.0, help='seconds to wait after connecting')
+    parser.add_argument('--port', type=int, default=8123)
+    parser.add_argument('--legacy-timer', action='store_true', help='re-add the old 100 ms refresh timer')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.history, args.legacy_timer)
+        return
+
+    command = [sys.executable, os.path.abspath(__file__), '--serve',
+               '--port', str(args.port), '--history', str(args.history)]
+    if args.legacy_timer:
+        command.append('--legacy-timer')
+    server = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        result = asyncio.run(measure(args.port, args.tabs, args.duration, args.warmup))
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(json.dumps({
+        'mode': 'legacy-timer' if args.legacy_timer else 'event-driven',
+        'tabs': args.tabs,
+        'history': args.history,
+        'duration': args.duration,
+        **result,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
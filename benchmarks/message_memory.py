@@ -0,0 +1,93 @@
+"""
+Benchmark: memory used to keep chat messages of a session.
+
+Compares the previous representation (a list of (role, text, stamp)
+tuples with a formatted timestamp per message, plus the dictionary that
+referenced a markdown component per AI message) with the array-backed
+`MessageHistory`. The message texts are allocated before the measurement,
+so only the overhead of the representation is counted. The component
+objects themselves are not counted either, so the legacy figure is a
+lower bound.
+
+Usage:
+    python benchmarks/message_memory.py
+    python benchmarks/message_memory.py --messages 100000 --text-length 400
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.config.config import USER_ID, AI_ID  # noqa: E402
+from src.services.history import MessageHistory  # noqa: E402
+
+
+def measure(build) -> int:
+    """Bytes allocated by build() that are still alive afterwards."""
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def legacy(texts):
+    """The previous tuples with strftime stamps and markdown component references."""
+    messages = []
+    markdown_components = {}
+    for i, text in enumerate(texts):
+        role = USER_ID if i % 2 == 0 else AI_ID
+        messages.append((role, text, datetime.now().strftime('%X')))
+        if role == AI_ID:
+            markdown_components[f"message_{i}"] = None
+    return messages, markdown_components
+
+
+def compact(texts, max_bytes):
+    """The array-backed history with integer timestamps and role codes."""
+    history = MessageHistory(max_bytes=max_bytes)
+    created_at = int(time.time())
+    for i, text in enumerate(texts):
+        history.append(USER_ID if i % 2 == 0 else AI_ID, text, created_at + i)
+        history.spill(history.count)
+    return history
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=10000, help='messages per session (default: 10000)')
+    parser.add_argument('--text-length', type=int, default=200, help='characters per message (default: 200)')
+    parser.add_argument('--cap', type=int, default=1024 * 1024, help='byte cap of the capped run (default: 1 MiB)')
+    args = parser.parse_args()
+
+    texts = [f'{i:08d} ' + 'x' * args.text_length for i in range(args.messages)]
+    text_bytes = sum(sys.getsizeof(text) for text in texts)
+
+    legacy_bytes = measure(lambda: legacy(texts))
+    compact_bytes = measure(lambda: compact(texts, max_bytes=sys.maxsize))
+    capped_history = compact(texts, max_bytes=args.cap)
+
+    print(json.dumps({
+        'messages': args.messages,
+        'text_bytes': text_bytes,
+        'legacy_overhead_bytes': legacy_bytes,
+        'compact_overhead_bytes': compact_bytes,
+        'saved_bytes': legacy_bytes - compact_bytes,
+        'saved_bytes_per_10k_messages': round((legacy_bytes - compact_bytes) * 10000 / args.messages),
+        'capped': {
+            'cap_bytes': args.cap,
+            'loaded_messages': len(capped_history),
+            'loaded_bytes': capped_history.bytes,
+        },
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
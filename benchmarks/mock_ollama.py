@@ -0,0 +1,268 @@
+"""
+Local stand-in for the Ollama HTTP API.
+
+Serves `/api/chat`, `/api/generate`, `/api/embed`, `/api/tags`, `/api/ps`,
+`/api/pull` and `/api/delete` with a configurable token rate, latency and jitter, so
+the chat application can be load-tested without a GPU or real models.
+Responses carry the same timing metadata (eval_count, eval_duration, ...)
+as Ollama's final chunk.
+
+Usage:
+    python benchmarks/mock_ollama.py --port 11500 --token-rate 50 --latency 0.2
+    OLLAMA_HOST=http://127.0.0.1:11500 python simple_chat_app.py
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List
+
+MODEL_SIZE = 2 * 1024 ** 3
+EMBEDDING_DIMENSIONS = 64
+WORDS = ('lorem', 'ipsum', 'dolor', 'sit', 'amet', 'consectetur', 'adipiscing', 'elit', 'sed', 'do',
+         'eiusmod', 'tempor', 'incididunt', 'ut', 'labore', 'et', 'dolore', 'magna', 'aliqua')
+
+
+class MockOllama:
+    """State and timing of the stand-in server."""
+
+    def __init__(self, models: List[str], token_rate: float = 50.0, tokens: int = 200, latency: float = 0.2,
+                 jitter: float = 0.1, pull_layers: int = 3, pull_layer_size: int = 256 * 1024 ** 2,
+                 pull_rate: float = 512 * 1024 ** 2, pull_updates: int = 100):
+        self.models = {name: MODEL_SIZE for name in models}
+        self.token_rate = token_rate
+        self.tokens = tokens
+        self.latency = latency
+        self.jitter = jitter
+        self.pull_layers = pull_layers
+        self.pull_layer_size = pull_layer_size
+        self.pull_rate = pull_rate
+        self.pull_updates = pull_updates
+        self.loaded: Dict[str, float] = {}  # Model name -> monotonic time of the last use
+        self.stats: Dict[str, int] = {}
+        self.active_streams = 0
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        """Start counting requests from zero."""
+        self.stats = {'chat_requests': 0, 'tokens_sent': 0, 'max_active_streams': self.active_streams,
+                      'tags_requests': 0, 'pull_requests': 0, 'embed_requests': 0, 'embedded_inputs': 0, 'prompt_chars': 0}
+
+    async def delay(self) -> None:
+        """Wait for the configured latency plus jitter."""
+        await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+    def token_interval(self) -> float:
+        """Seconds between two tokens, including jitter."""
+        interval = 1 / self.token_rate
+        return max(0.0, interval * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    async def chat(self, model: str, stream: bool, messages: List[Dict]) -> AsyncIterator[Dict]:
+        """Yield the chunks of a generated response."""
+        self.stats['chat_requests'] += 1
+        self.stats['prompt_chars'] += sum(len(message.get('content') or '') for message in messages)
+        self.active_streams += 1
+        self.stats['max_active_streams'] = max(self.stats['max_active_streams'], self.active_streams)
+        try:
+            load_duration = 0.0 if model in self.loaded else self.latency
+            self.loaded[model] = time.monotonic()
+            started = time.monotonic()
+            await self.delay()
+            prompt_eval_duration = time.monotonic() - started
+            parts = []
+            eval_started = time.monotonic()
+            for index in range(self.tokens):
+                await asyncio.sleep(self.token_interval())
+                token = WORDS[index % len(WORDS)] + ' '
+                self.stats['tokens_sent'] += 1
+                if stream:
+                    yield _chunk(model, token, done=False)
+                else:
+                    parts.append(token)
+            final = _chunk(model, '' if stream else ''.join(parts), done=True)
+            final.update(
+                done_reason='stop',
+                total_duration=_ns(time.monotonic() - started + load_duration),
+                load_duration=_ns(load_duration),
+                prompt_eval_count=32,
+                prompt_eval_duration=_ns(prompt_eval_duration),
+                eval_count=self.tokens,
+                eval_duration=_ns(time.monotonic() - eval_started),
+            )
+            yield final
+        finally:
+            self.active_streams -= 1
+
+    async def pull(self, model: str) -> AsyncIterator[Dict]:
+        """Yield the progress of a simulated download."""
+        self.stats['pull_requests'] += 1
+        yield {'status': 'pulling manifest'}
+        await self.delay()
+        step = self.pull_layer_size // self.pull_updates
+        for layer in range(self.pull_layers):
+            digest = f'sha256:{layer:064x}'
+            for completed in range(0, self.pull_layer_size + 1, step):
+                yield {'status': f'pulling {digest[7:19]}', 'digest': digest,
+                       'total': self.pull_layer_size, 'completed': completed}
+                await asyncio.sleep(step / self.pull_rate)
+        yield {'status': 'verifying sha256 digest'}
+        yield {'status': 'writing manifest'}
+        self.models[model] = MODEL_SIZE
+        yield {'status': 'success'}
+
+    def embed(self, inputs: List[str]) -> List[List[float]]:
+        """Bag-of-words vectors, so texts that share words are similar."""
+        self.stats['embed_requests'] += 1
+        self.stats['embedded_inputs'] += len(inputs)
+        vectors = []
+        for text in inputs:
+            vector = [0.0] * EMBEDDING_DIMENSIONS
+            for word in text.lower().split():
+                vector[int(hashlib.md5(word.strip('.,;:!?').encode()).hexdigest(), 16) % EMBEDDING_DIMENSIONS] += 1.0
+            vectors.append(vector)
+        return vectors
+
+    async def tags(self) -> Dict:
+        """The installed models, counted when the request arrives."""
+        self.stats['tags_requests'] += 1
+        await self.delay()
+        return {'models': [_model_info(name, size) for name, size in self.models.items()]}
+
+    def ps(self) -> Dict:
+        """The loaded models."""
+        return {'models': [_model_info(name, self.models.get(name, MODEL_SIZE)) for name in self.loaded]}
+
+
+def _ns(seconds: float) -> int:
+    """Convert seconds to the nanoseconds Ollama reports."""
+    return int(seconds * 1e9)
+
+
+def _now() -> str:
+    """Current time in Ollama's format."""
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _chunk(model: str, content: str, done: bool) -> Dict:
+    """A chat response chunk."""
+    return {'model': model, 'created_at': _now(), 'message': {'role': 'assistant', 'content': content}, 'done': done}
+
+
+def _model_info(name: str, size: int) -> Dict:
+    """Model metadata as returned by /api/tags and /api/ps."""
+    return {
+        'name': name, 'model': name, 'modified_at': _now(), 'size': size, 'size_vram': size,
+        'digest': hashlib.sha256(name.encode()).hexdigest(),
+        'details': {'format': 'gguf', 'family': 'llama', 'parameter_size': '3B', 'quantization_level': 'Q4_0'},
+    }
+
+
+def create_app(mock: MockOllama):
+    """Create the HTTP application of the stand-in server."""
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, StreamingResponse
+
+    app = FastAPI()
+
+    async def stream_lines(chunks: AsyncIterator[Dict]) -> AsyncIterator[bytes]:
+        async for chunk in chunks:
+            yield json.dumps(chunk).encode() + b'\n'
+
+    async def respond(chunks: AsyncIterator[Dict], stream: bool):
+        if stream:
+            return StreamingResponse(stream_lines(chunks), media_type='application/x-ndjson')
+        last = None
+        async for last in chunks:
+            pass
+        return JSONResponse(last)
+
+    @app.post('/api/chat')
+    async def chat(request: Request):
+        body = await request.json()
+        model = body.get('model', '')
+        if model not in mock.models:
+            return JSONResponse({'error': f"model '{model}' not found"}, status_code=404)
+        if not body.get('messages'):  # Load request
+            mock.loaded[model] = time.monotonic()
+            return JSONResponse(_chunk(model, '', done=True))
+        stream = body.get('stream', True)
+        return await respond(mock.chat(model, stream, body['messages']), stream)
+
+    @app.post('/api/generate')
+    async def generate(request: Request):
+        body = await request.json()
+        model = body.get('model', '')
+        if model not in mock.models:
+            return JSONResponse({'error': f"model '{model}' not found"}, status_code=404)
+        mock.loaded[model] = time.monotonic()
+        return JSONResponse({'model': model, 'created_at': _now(), 'response': '', 'done': True})
+
+    @app.post('/api/embed')
+    async def embed(request: Request):
+        body = await request.json()
+        model = body.get('model', '')
+        if model not in mock.models:
+            return JSONResponse({'error': f"model '{model}' not found"}, status_code=404)
+        inputs = body.get('input', [])
+        await mock.delay()
+        return JSONResponse({'model': model, 'embeddings': mock.embed([inputs] if isinstance(inputs, str) else inputs)})
+
+    @app.get('/api/tags')
+    async def tags():
+        return await mock.tags()
+
+    @app.get('/api/ps')
+    async def ps():
+        return mock.ps()
+
+    @app.post('/api/pull')
+    async def pull(request: Request):
+        body = await request.json()
+        return await respond(mock.pull(body.get('model') or body.get('name', '')), body.get('stream', True))
+
+    @app.delete('/api/delete')
+    async def delete(request: Request):
+        body = await request.json()
+        model = body.get('model') or body.get('name', '')
+        if mock.models.pop(model, None) is None:
+            return JSONResponse({'error': f"model '{model}' not found"}, status_code=404)
+        mock.loaded.pop(model, None)
+        return JSONResponse({})
+
+    @app.get('/_mock/stats')
+    async def stats():
+        return mock.stats
+
+    @app.post('/_mock/reset')
+    async def reset():
+        mock.reset_stats()
+        return mock.stats
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=11500)
+    parser.add_argument('--models', default='mock-small:latest,mock-large:latest',
+                        help='comma-separated installed models')
+    parser.add_argument('--token-rate', type=float, default=50.0, help='tokens per second per stream (default: 50)')
+    parser.add_argument('--tokens', type=int, default=200, help='tokens per response (default: 200)')
+    parser.add_argument('--latency', type=float, default=0.2, help='seconds before the first token (default: 0.2)')
+    parser.add_argument('--jitter', type=float, default=0.1,
+                        help='random variation of latency (seconds) and token interval (fraction) (default: 0.1)')
+    parser.add_argument('--pull-rate', type=float, default=512, help='simulated download speed in MiB/s')
+    args = parser.parse_args()
+
+    import uvicorn
+
+    mock = MockOllama(args.models.split(','), token_rate=args.token_rate, tokens=args.tokens,
+                      latency=args.latency, jitter=args.jitter, pull_rate=args.pull_rate * 1024 ** 2)
+    uvicorn.run(create_app(mock), host='127.0.0.1', port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""
+Benchmark: startup time and first paint of the chat application.
+
+Imports the application in fresh interpreters to measure the import time
+and to check that the Ollama SDKs and numpy are not loaded at startup.
+Then starts the server against the mock Ollama server and measures how
+long it takes until the page is served, and what a browser has to fetch
+before it can paint: the page, its stylesheets and scripts, and any
+third-party resources (which never load on air-gapped hosts). A resource
+with a max-age cache header only has to be fetched on the first visit.
+
+Usage:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --repeat 10 --output startup.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+from urllib.parse import urljoin, urlparse
+
+from driver import ROOT, percentiles, start_process, stop_process, wait_for_server
+
+DEFERRED_MODULES = ('ollama', 'qv_ollama_sdk', 'numpy')
+IMPORT_SCRIPT = f"""
+import json, sys, time
+started = time.perf_counter()
+import simple_chat_app
+print(json.dumps({{
+    'seconds': time.perf_counter() - started,
+    'loaded': [name for name in {DEFERRED_MODULES!r} if name in sys.modules],
+}}))
+"""
+
+_STYLESHEET_PATTERN = re.compile(r'<link\b[^>]*\brel="stylesheet"[^>]*>', re.I)
+_SCRIPT_PATTERN = re.compile(r'<script\b([^>]*)\bsrc="([^"]+)"([^>]*)>', re.I)
+_HREF_PATTERN = re.compile(r'\bhref="([^"]+)"', re.I)
+_IMPORT_PATTERN = re.compile(r'@import\s+(?:url\()?\s*[\'"]?([^\'")\s;]+)', re.I)
+_STYLE_PATTERN = re.compile(r'<style\b[^>]*>(.*?)</style>', re.I | re.S)
+
+
+def serve(port: int) -> None:
+    """Run the chat application (executed in a subprocess)."""
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+    from nicegui import ui
+    import simple_chat_app  # noqa: F401  (registers the pages)
+
+    ui.run(port=port, show=False, reload=False, storage_secret='benchmark')
+
+
+def measure_import(repeat: int) -> Dict:
+    """Import time of the application and the deferred modules it loads anyway."""
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout
+        runs.append(json.loads(output.splitlines()[-1]))
+    return {
+        'seconds': percentiles([run['seconds'] for run in runs]),
+        'deferred_modules_loaded': sorted({name for run in runs for name in run['loaded']}),
+    }
+
+
+def blocking_resources(base_url: str, html: str) -> List[str]:
+    """URLs of the stylesheets and classic scripts a browser loads before the first paint."""
+    head = html.split('</head>', 1)[0]
+    urls = []
+    for link in _STYLESHEET_PATTERN.findall(head):
+        href = _HREF_PATTERN.search(link)
+        if href is not None:
+            urls.append(urljoin(base_url, href.group(1)))
+    for before, src, after in _SCRIPT_PATTERN.findall(head):
+        attributes = before + after
+        if not re.search(r'\b(async|defer)\b|type="module"', attributes):
+            urls.append(urljoin(base_url, src))
+    for style in _STYLE_PATTERN.findall(head):
+        urls.extend(urljoin(base_url, url) for url in _IMPORT_PATTERN.findall(style))
+    return urls
+
+
+async def measure_first_paint(http, app_url: str) -> Dict:
+    """Fetch the page and everything that blocks its first paint, like a browser with an empty cache."""
+    started = time.monotonic()
+    page = await http.get(app_url + '/')
+    page_seconds = time.monotonic() - started
+    inline_styles = sum(len(style) for style in _STYLE_PATTERN.findall(page.text.split('</head>', 1)[0]))
+
+    origin = urlparse(app_url).netloc
+    external: List[str] = []
+    resources: Dict[str, Dict] = {}
+
+    async def fetch(url: str) -> None:
+        if url in resources or url in external:
+            return
+        if urlparse(url).netloc != origin:
+            external.append(url)
+            return
+        resources[url] = {}
+        fetch_started = time.monotonic()
+        response = await http.get(url)
+        resources[url] = {
+            'bytes': len(response.content),
+            'cache_control': response.headers.get('cache-control'),
+            'seconds': time.monotonic() - fetch_started,
+        }
+        if url.split('?', 1)[0].endswith('.css'):
+            await asyncio.gather(*(fetch(urljoin(url, nested)) for nested in _IMPORT_PATTERN.findall(response.text)))
+
+    fetch_started = time.monotonic()
+    await asyncio.gather(*(fetch(url) for url in blocking_resources(app_url + '/', page.text)))
+    cold_seconds = page_seconds + time.monotonic() - fetch_started
+    uncached = [url for url, resource in resources.items() if 'max-age' not in (resource['cache_control'] or '')]
+    warm_seconds = page_seconds + max((resources[url]['seconds'] for url in uncached), default=0.0)
+    return {
+        'page_bytes': len(page.content),
+        'inline_style_bytes': inline_styles,
+        'blocking_resources': len(resources),
+        'blocking_bytes': sum(resource['bytes'] for resource in resources.values()),
+        'external_resources': external,
+        'uncached_resources': [urlparse(url).path for url in uncached],
+        'stylesheets': {urlparse(url).path: resource['cache_control'] for url, resource in resources.items()
+                        if urlparse(url).path.endswith('.css')},
+        'cold_seconds': round(cold_seconds, 4),
+        'warm_seconds': round(warm_seconds, 4),
+    }
+
+
+async def measure_server(args: argparse.Namespace, mock_url: str) -> Dict:
+    """Time from starting the server until it serves the page, and the first paint of that page."""
+    import httpx
+
+    app_url = f'http://127.0.0.1:{args.port}'
+    ready = []
+    first_paint = []
+    async with httpx.AsyncClient(timeout=60) as http:
+        await wait_for_server(http, mock_url + '/api/tags')
+        for _ in range(args.repeat):
+            with tempfile.TemporaryDirectory() as workdir:
+                started = time.monotonic()
+                server = start_process([os.path.abspath(__file__), '--serve', '--port', str(args.port)],
+                                       cwd=workdir, env={'OLLAMA_HOST': mock_url})
+                try:
+                    await wait_for_server(http, app_url + '/', attempts=600)
+                    ready.append(time.monotonic() - started)
+                    first_paint.append(await measure_first_paint(http, app_url))
+                finally:
+                    stop_process(server)
+    return {
+        'ready_seconds': percentiles(ready),
+        'first_paint': {
+            **first_paint[-1],
+            'cold_seconds': percentiles([run['cold_seconds'] for run in first_paint]),
+            'warm_seconds': percentiles([run['warm_seconds'] for run in first_paint]),
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='imports and server starts to measure (default: 5)')
+    parser.add_argument('--port', type=int, default=8125, help='port of the application')
+    parser.add_argument('--mock-port', type=int, default=11500, help='port of the mock Ollama server')
+    parser.add_argument('--output', help='write the results to this file instead of stdout')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port)
+        return
+
+    mock_url = f'http://127.0.0.1:{args.mock_port}'
+    mock = start_process([os.path.join(ROOT, 'benchmarks', 'mock_ollama.py'), '--port', str(args.mock_port)])
+    try:
+        imports = measure_import(args.repeat)
+        server = asyncio.run(measure_server(args, mock_url))
+    finally:
+        stop_process(mock)
+
+    report = json.dumps({
+        'python': platform.python_version(),
+        'settings': {key: value for key, value in vars(args).items() if key not in ('serve', 'output')},
+        'import': imports,
+        **server,
+    }, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
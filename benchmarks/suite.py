@@ -0,0 +1,328 @@
+"""
+Benchmark suite: the chat application against a local mock Ollama server.
+
+Starts `mock_ollama.py` and the real application (in a temporary working
+directory, so no conversations are stored in `data/`), connects simulated
+browser tabs over the NiceGUI websocket and runs these scenarios:
+
+    streaming      every tab sends a message at once; time to first token,
+                   response time, delivered tokens per second, server CPU
+    idle           tabs sit idle; server CPU and websocket traffic
+    models_dialog  tabs open and close the models dialog; time until the list is shown
+    pull           some tabs pull the same model while all tabs show the pull
+                   dialog; duration, downloads started and updates received per tab
+
+Results are written as JSON, so they can be compared between releases.
+
+Usage:
+    python benchmarks/suite.py
+    python benchmarks/suite.py --scenarios streaming,idle --tabs 50 --output results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from driver import ROOT, Tab, percentiles, start_process, stop_process, wait_for_server
+
+CPU_ENDPOINT = '/_bench/cpu'
+SCENARIOS = ('streaming', 'idle', 'models_dialog', 'pull')
+MESSAGE_PLACEHOLDER = 'Type your message...'
+PULL_PLACEHOLDER = 'Enter model name (e.g. llama2)'
+PULL_MODEL = 'mock-pulled:latest'
+
+
+def serve(port: int) -> None:
+    """Run the chat application with a CPU time endpoint (executed in a subprocess)."""
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+    from nicegui import app, ui
+    import simple_chat_app  # noqa: F401  (registers the pages)
+
+    @app.get(CPU_ENDPOINT)
+    def cpu_time() -> dict:
+        return {'cpu': time.process_time()}
+
+    ui.run(port=port, show=False, reload=False, reconnect_timeout=30, storage_secret='benchmark')
+
+
+class Bench:
+    """Connections to the application and the mock server shared by the scenarios."""
+
+    def __init__(self, http, app_url: str, mock_url: str, args: argparse.Namespace):
+        self.http = http
+        self.app_url = app_url
+        self.mock_url = mock_url
+        self.args = args
+
+    async def open_tabs(self, count: int) -> List[Tab]:
+        """Open tabs one after another, like users arriving."""
+        tabs = []
+        for _ in range(count):
+            tab = Tab(self.app_url)
+            await tab.open(self.http)
+            tabs.append(tab)
+        return tabs
+
+    async def cpu(self) -> float:
+        """CPU seconds used by the application so far."""
+        return (await self.http.get(self.app_url + CPU_ENDPOINT)).json()['cpu']
+
+    async def mock_stats(self, reset: bool = False) -> Dict[str, int]:
+        """Request counts of the mock server."""
+        if reset:
+            return (await self.http.post(self.mock_url + '/_mock/reset')).json()
+        return (await self.http.get(self.mock_url + '/_mock/stats')).json()
+
+
+async def close_tabs(tabs: List[Tab]) -> None:
+    """Disconnect all tabs."""
+    await asyncio.gather(*(tab.close() for tab in tabs))
+
+
+def traffic(tabs: List[Tab], reset: bool = False) -> Dict[str, int]:
+    """Websocket messages and bytes received by the tabs."""
+    result = {'ws_messages': sum(tab.messages for tab in tabs), 'ws_bytes': sum(tab.bytes for tab in tabs)}
+    if reset:
+        for tab in tabs:
+            tab.messages = tab.bytes = 0
+    return result
+
+
+async def measured(bench: Bench, tabs: List[Tab], action: Callable) -> Dict:
+    """Run an action and add the wall time, server CPU and websocket traffic it caused."""
+    traffic(tabs, reset=True)
+    cpu_start = await bench.cpu()
+    started = time.monotonic()
+    result = await action()
+    wall = time.monotonic() - started
+    cpu = await bench.cpu() - cpu_start
+    return {
+        **result,
+        'wall_seconds': round(wall, 3),
+        'cpu_seconds': round(cpu, 3),
+        'cpu_percent': round(100 * cpu / wall, 1),
+        **traffic(tabs),
+    }
+
+
+async def streaming(bench: Bench) -> Dict:
+    """All tabs send a message at the same time and wait for the complete answer."""
+    tabs = await bench.open_tabs(bench.args.tabs)
+
+    async def chat(tab: Tab) -> Dict[str, float]:
+        first_token = []
+        remove = tab.on_message(lambda event, data: not first_token and event == 'run_javascript'
+                                and ('"append"' in data['code'] or '"freeze"' in data['code'])
+                                and first_token.append(time.monotonic()))
+        send = tab.find_one(tag='q-btn', label='Send')
+        await tab.set_value(tab.find_one(placeholder=MESSAGE_PLACEHOLDER), 'Tell me something.')
+        started = time.monotonic()
+        await tab.click(send)
+        try:
+            await tab.wait_for(lambda: bool(first_token), timeout=bench.args.timeout)
+            finished = await tab.wait_for(lambda: tab.is_visible(send), timeout=bench.args.timeout)
+        finally:
+            remove()
+        return {'time_to_first_token': first_token[0] - started, 'response_time': finished - started}
+
+    async def run() -> Dict:
+        await bench.mock_stats(reset=True)
+        results = await asyncio.gather(*(chat(tab) for tab in tabs))
+        return {'results': results, 'mock': await bench.mock_stats()}
+
+    try:
+        result = await measured(bench, tabs, run)
+    finally:
+        await close_tabs(tabs)
+    results = result.pop('results')
+    mock = result.pop('mock')
+    return {
+        'tabs': len(tabs),
+        'time_to_first_token': percentiles([r['time_to_first_token'] for r in results]),
+        'response_time': percentiles([r['response_time'] for r in results]),
+        'tokens_per_second': round(mock['tokens_sent'] / result['wall_seconds'], 1),
+        'max_concurrent_streams': mock['max_active_streams'],
+        **result,
+    }
+
+
+async def idle(bench: Bench) -> Dict:
+    """Tabs stay open without any interaction."""
+    tabs = await bench.open_tabs(bench.args.tabs)
+    try:
+        await asyncio.sleep(bench.args.warmup)
+        result = await measured(bench, tabs, lambda: asyncio.sleep(bench.args.duration, {}))
+    finally:
+        await close_tabs(tabs)
+    return {
+        'tabs': len(tabs),
+        **result,
+        'ws_messages_per_second': round(result['ws_messages'] / result['wall_seconds'], 1),
+        'ws_bytes_per_second': round(result['ws_bytes'] / result['wall_seconds']),
+    }
+
+
+async def models_dialog(bench: Bench) -> Dict:
+    """Tabs repeatedly open the models dialog and wait until the model list is redrawn."""
+    tabs = await bench.open_tabs(bench.args.tabs)
+
+    async def browse(tab: Tab) -> List[float]:
+        latencies = []
+        redrawn = []
+        remove = tab.on_message(lambda event, data: event == 'update' and _shows_models(data)
+                                and redrawn.append(time.monotonic()))
+        try:
+            for _ in range(bench.args.repeat):
+                redrawn.clear()
+                started = time.monotonic()
+                await tab.click(tab.find_one(tag='q-btn', label='Models'))
+                finished = await tab.wait_for(lambda: bool(redrawn), timeout=bench.args.timeout)
+                latencies.append(finished - started)
+                await tab.click(tab.find_one(tag='q-btn', label='Close'))
+        finally:
+            remove()
+        return latencies
+
+    async def run() -> Dict:
+        await bench.mock_stats(reset=True)
+        latencies = await asyncio.gather(*(browse(tab) for tab in tabs))
+        return {'latencies': [latency for tab_latencies in latencies for latency in tab_latencies],
+                'mock': await bench.mock_stats()}
+
+    try:
+        result = await measured(bench, tabs, run)
+    finally:
+        await close_tabs(tabs)
+    return {
+        'tabs': len(tabs),
+        'opens_per_tab': bench.args.repeat,
+        'latency': percentiles(result.pop('latencies')),
+        'model_list_requests': result.pop('mock')['tags_requests'],
+        **result,
+    }
+
+
+def _shows_models(update: Dict) -> bool:
+    """Whether an update (re)draws an entry of the model list."""
+    return any(isinstance(element, dict) and 'model-name' in element.get('class', []) for element in update.values())
+
+
+async def pull(bench: Bench) -> Dict:
+    """Some tabs pull the same model while the other tabs watch the pull dialog."""
+    pulling = await bench.open_tabs(bench.args.pull_tabs)
+    watching = await bench.open_tabs(max(0, bench.args.tabs - bench.args.pull_tabs))
+
+    async def pull_model(tab: Tab) -> float:
+        done = []
+        remove = tab.on_message(lambda event, data: event == 'notify' and PULL_MODEL in str(data.get('message'))
+                                and done.append(time.monotonic()))
+        await tab.set_value(tab.find_one(placeholder=PULL_PLACEHOLDER), PULL_MODEL)
+        started = time.monotonic()
+        await tab.click(tab.find_one(tag='q-btn', label='Pull'))
+        try:
+            return await tab.wait_for(lambda: bool(done), timeout=bench.args.timeout) - started
+        finally:
+            remove()
+
+    for tab in pulling + watching:  # Every tab watches the progress in the pull dialog
+        await tab.click(tab.find_one(tag='q-btn', label='Pull Model'))
+
+    async def run() -> Dict:
+        await bench.mock_stats(reset=True)
+        durations = await asyncio.gather(*(pull_model(tab) for tab in pulling))
+        return {'durations': durations, 'mock': await bench.mock_stats()}
+
+    try:
+        result = await measured(bench, pulling + watching, run)
+    finally:
+        await close_tabs(pulling + watching)
+    return {
+        'pulling_tabs': len(pulling),
+        'watching_tabs': len(watching),
+        'duration': percentiles(result.pop('durations')),
+        'pull_requests': result.pop('mock')['pull_requests'],
+        'ws_messages_per_pulling_tab': round(sum(tab.messages for tab in pulling) / max(1, len(pulling)), 1),
+        'ws_messages_per_watching_tab': round(sum(tab.messages for tab in watching) / max(1, len(watching)), 1),
+        **result,
+    }
+
+
+async def run_suite(args: argparse.Namespace, app_url: str, mock_url: str) -> Dict:
+    """Run the selected scenarios one after another."""
+    import httpx
+
+    results = {}
+    async with httpx.AsyncClient(timeout=60) as http:
+        await wait_for_server(http, mock_url + '/api/tags')
+        await wait_for_server(http, app_url + CPU_ENDPOINT)
+        bench = Bench(http, app_url, mock_url, args)
+        for name in args.scenarios.split(','):
+            print(f'Running {name}...', file=sys.stderr)
+            results[name] = await globals()[name](bench)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='comma-separated scenarios (default: all)')
+    parser.add_argument('--tabs', type=int, default=20, help='simulated tabs per scenario (default: 20)')
+    parser.add_argument('--pull-tabs', type=int, default=2, help='tabs that pull a model (default: 2)')
+    parser.add_argument('--repeat', type=int, default=5, help='models dialog opens per tab (default: 5)')
+    parser.add_argument('--duration', type=float, default=10.0, help='idle measurement window in seconds')
+    parser.add_argument('--warmup', type=float, default=2.0, help='seconds to wait before measuring idle tabs')
+    parser.add_argument('--timeout', type=float, default=120.0, help='seconds to wait for a single response')
+    parser.add_argument('--token-rate', type=float, default=50.0, help='mock tokens per second per stream')
+    parser.add_argument('--tokens', type=int, default=200, help='mock tokens per response')
+    parser.add_argument('--latency', type=float, default=0.2, help='mock seconds before the first token')
+    parser.add_argument('--jitter', type=float, default=0.1, help='mock latency and token rate variation')
+    parser.add_argument('--port', type=int, default=8124, help='port of the application')
+    parser.add_argument('--mock-port', type=int, default=11500, help='port of the mock Ollama server')
+    parser.add_argument('--output', help='write the results to this file instead of stdout')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port)
+        return
+    unknown = set(args.scenarios.split(',')) - set(SCENARIOS)
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(sorted(unknown))}')
+
+    sys.path.insert(0, ROOT)
+    from src.services.models import DEFAULT_MODEL
+
+    mock_url = f'http://127.0.0.1:{args.mock_port}'
+    app_url = f'http://127.0.0.1:{args.port}'
+    mock = start_process([os.path.join(ROOT, 'benchmarks', 'mock_ollama.py'), '--port', str(args.mock_port),
+                          '--models', f'{DEFAULT_MODEL},mock-large:latest', '--token-rate', str(args.token_rate),
+                          '--tokens', str(args.tokens), '--latency', str(args.latency), '--jitter', str(args.jitter)])
+    with tempfile.TemporaryDirectory() as workdir:
+        server = start_process([os.path.abspath(__file__), '--serve', '--port', str(args.port)],
+                               cwd=workdir, env={'OLLAMA_HOST': mock_url})
+        try:
+            results = asyncio.run(run_suite(args, app_url, mock_url))
+        finally:
+            stop_process(server)
+            stop_process(mock)
+
+    report = json.dumps({
+        'python': platform.python_version(),
+        'settings': {key: value for key, value in vars(args).items() if key not in ('serve', 'output')},
+        'scenarios': results,
+    }, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
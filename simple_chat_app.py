@@ -8,41 +8,73 @@ import os
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from nicegui import ui
-from src.styles.styles import CHAT_STYLES
+from fastapi.responses import PlainTextResponse
+from nicegui import app, ui
+from src.styles.styles import add_chat_styles, serve_static_files
 from src.services.models import ModelManager
+from src.services.catalog import model_catalog
+from src.services.client_pool import client_pool
+from src.services.hosts import host_pool
+from src.services.residency import residency_manager
+from src.services.conversation_store import conversation_store
+from src.services.sessions import session_registry, get_storage_secret
+from src.services.metrics import metrics
 from src.components.chat import ChatManager
+from src.components.compare import CompareView
 from src.components.dialogs import DialogManager
+from src.components.sidebar import ConversationSidebar
 from src.components.header import create_header
 from src.components.footer import create_footer
+from src.components.stats import create_stats_view
 from src.config.config import (
     APP_TITLE, APP_PORT, MAX_WIDTH, MARGIN_Y, MARGIN_X
 )
 
-# UI refresh settings
-UI_REFRESH_INTERVAL = 0.1  # UI refresh interval in seconds
-
 @ui.page('/')
-def main():
+async def main():
     """Main application page with chat interface."""
-    # Add custom CSS to the page
-    ui.add_head_html(f'<style>{CHAT_STYLES}</style>')
+    # Link the cached stylesheet into the page
+    add_chat_styles()
     
     # Initialize managers
     model_manager = ModelManager()
     chat_manager = ChatManager(model_manager)
     dialog_manager = DialogManager(model_manager, chat_manager)
+    compare_view = CompareView(chat_manager)
+    
+    # Continue the most recent conversation of this browser
+    await chat_manager.open_recent_conversation()
     
-    # Create header
-    create_header(dialog_manager, model_manager)
+    # Create sidebar and header
+    sidebar = ConversationSidebar(chat_manager)
+    create_header(dialog_manager, model_manager, sidebar, compare_view)
     
     # Main content area 
     with ui.column().classes(f'w-full max-w-{MAX_WIDTH} {MARGIN_X} {MARGIN_Y}'):
         chat_manager.chat_messages()
-        ui.timer(UI_REFRESH_INTERVAL, chat_manager.chat_messages.refresh)
     
     # Create footer
     create_footer(chat_manager)
 
+@ui.page('/stats')
+def stats():
+    """Live sessions and their memory footprint."""
+    add_chat_styles()
+    create_stats_view()
+
+@app.get('/metrics')
+def metrics_endpoint():
+    """Performance metrics in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type='text/plain; version=0.0.4')
+
+serve_static_files()
+app.on_startup(host_pool.start)
+app.on_startup(model_catalog.start)
+app.on_startup(residency_manager.start)
+app.on_startup(conversation_store.start)
+app.on_startup(session_registry.start)
+app.on_shutdown(conversation_store.close)
+app.on_shutdown(client_pool.close)
+
 if __name__ in {'__main__', '__mp_main__'}:
-    ui.run(title=APP_TITLE, port=APP_PORT)
\ No newline at end of file
+    ui.run(title=APP_TITLE, port=APP_PORT, storage_secret=get_storage_secret())
\ No newline at end of file
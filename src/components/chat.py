@@ -2,94 +2,393 @@
 Chat functionality for the application.
 Handles message management and UI components.
 """
-from datetime import datetime
-from typing import List, Tuple, Dict
+import asyncio
+import sys
 import time
-import threading
-from nicegui import ui
+from collections import deque
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional
+from nicegui import app, ui, background_tasks, binding, Client
 
 from src.config.config import (
-    USER_ID, AI_ID, STREAMING_DELAY
+    USER_ID, AI_ID, STATUS_ID, STREAMING_FRAME_RATE, CHAT_WINDOW_SIZE, CHAT_PAGE_SIZE,
+    CONVERSATION_CHECKPOINT_INTERVAL, THINKING_MSG, GENERATION_STOPPED_MSG, QUEUE_POSITION_MSG, QUEUE_FULL_MSG,
+    RESPONSE_STATS_MSG
 )
 from src.services.models import ModelManager
+from src.services.conversation_store import conversation_store
+from src.services.history import MessageHistory, MessageRecord
+from src.services.scheduler import scheduler, QueueFullError
+from src.services.sessions import session_registry
+from src.components.scroll_sentinel import ScrollSentinel
+from src.components.streaming_markdown import StreamingMarkdown, render_markdown
 
 class ChatManager:
     """Manages chat messages and UI components."""
-    
+    is_thinking = binding.BindableProperty()
+
     def __init__(self, model_manager: ModelManager):
         """Initialize chat manager with model manager."""
         self.model_manager = model_manager
-        self.messages: List[Tuple[str, str, str]] = []
+        self.session_id = ui.context.client.id
+        self.owner: str = app.storage.browser['id']  # Conversations are listed and opened per browser
+        model_manager.owner = self.owner  # And so are documents
+        self.conversation_id: Optional[str] = None
+        self.history = MessageHistory()  # The loaded part of the conversation
+        self.on_conversations_changed: Optional[Callable[[], None]] = None
         self.is_thinking = False
-        self.current_response = ""
-        self.message_completed = False
-        self.markdown_components: Dict[str, ui.markdown] = {}
+        self.generation_task: Optional[asyncio.Task] = None
+        self.pending_chunks: Deque[str] = deque()
+        self.response_parts: List[str] = []
+        self.response_seq: Optional[int] = None  # Seq of the streaming response once it has been saved
+        self.checkpointed_at = 0.0
+        self.is_stale = False  # Another tab added messages to the conversation
+        self.message_elements: Deque[ui.chat_message] = deque()
+        self.first_mounted = 0
+        self.loading_history = False
+        self.messages_container: Optional[ui.column] = None
+        self.history_loader: Optional[ScrollSentinel] = None
+        self.empty_label: Optional[ui.label] = None
+        self.streaming_message: Optional[ui.chat_message] = None
+        self.streaming_markdown: Optional[StreamingMarkdown] = None
+
+        session_registry.register(self.session_id, self)
+        ui.context.client.on_disconnect(self.close)
 
     def add_user_message(self, text: str) -> None:
         """Add a user message to chat history."""
-        stamp = datetime.now().strftime('%X')
-        self.messages.append((USER_ID, text, stamp))
+        self._add_message(USER_ID, text)
+
+    def add_ai_message(self, text: str, details: Optional[str] = None) -> None:
+        """Add an AI message to chat history, with an optional details line."""
+        self._add_message(AI_ID, text, details)
+
+    def add_status_message(self, text: str) -> None:
+        """Add a status (e.g. an error) in place of an AI message; it is not part of the conversation."""
+        self._add_message(STATUS_ID, text)
+
+    async def new_conversation(self) -> None:
+        """Start an empty conversation; it is stored once the first message is sent."""
+        session_registry.touch(self.session_id)
+        await self._cancel_generation()
+        self.conversation_id = None
+        self._load_history(0, [])
+        self.model_manager.new_conversation()
+
+    async def open_recent_conversation(self) -> None:
+        """Continue the most recent conversation of this browser, unless another tab has it open."""
+        recent = await conversation_store.list_conversations(self.owner, 1)
+        if recent and not self._is_open_elsewhere(recent[0]['id']):
+            await self.open_conversation(recent[0]['id'])
+
+    async def open_conversation(self, conversation_id: str) -> None:
+        """Continue a stored conversation, loading only its newest messages."""
+        session_registry.touch(self.session_id)
+        conversation = await conversation_store.get_conversation(conversation_id, self.owner)
+        if conversation is None:
+            return
+        rows = await conversation_store.load_messages(conversation_id, None, CHAT_WINDOW_SIZE)
+        await self._cancel_generation()
+        self.conversation_id = conversation_id
+        self._load_history(rows[0][0] if rows else 0, [(role, content, created_at) for _, role, content, created_at in rows])
+        self.model_manager.restore_conversation(conversation['model_name'], [(role, content) for _, role, content, _ in rows])
+
+    def switch_model(self, model_name: str) -> None:
+        """Continue the conversation with a different model."""
+        session_registry.touch(self.session_id)
+        self.model_manager.switch_model(model_name)
+        if self.conversation_id is not None:
+            conversation_store.set_model(self.conversation_id, model_name)
+
+    def start_generation(self, message_text: str) -> None:
+        """Add the user message and generate the AI response in the background."""
+        session_registry.touch(self.session_id)
+        self.add_user_message(message_text)
+        self.start_streaming()
+        self.generation_task = background_tasks.create(self.get_ai_response(message_text), name='ai_response')
+
+    def stop_generation(self) -> None:
+        """Abort the running generation, keeping the text received so far."""
+        if self.generation_task is not None:
+            self.generation_task.cancel()
+
+    def is_alive(self) -> bool:
+        """Whether the client of this session still exists."""
+        return self.session_id in Client.instances
+
+    def is_busy(self) -> bool:
+        """Whether a response is being generated."""
+        return self.is_thinking
+
+    def get_memory_usage(self) -> int:
+        """Approximate memory used by the chat history of this session in bytes."""
+        return (
+            self.history.bytes
+            + sum(sys.getsizeof(part) for part in self.response_parts)
+            + self.model_manager.get_memory_usage()
+        )
+
+    def hibernate(self) -> None:
+        """Free the memory of an idle session; everything dropped is reloaded on demand."""
+        self.history.drop_html()
+        if self.conversation_id is not None:
+            self.history.drop_before(self.first_mounted)
+        self.model_manager.release_history()
+
+    async def close(self) -> None:
+        """Release the session once its client is gone, cancelling the running generation."""
+        self.messages_container = None
+        self.streaming_message = None
+        self.streaming_markdown = None
+        await self._cancel_generation()
+        session_registry.unregister(self.session_id)
+
+    def _is_open_elsewhere(self, conversation_id: str) -> bool:
+        """Whether another live session shows the conversation."""
+        return any(
+            session.state is not self and session.state.conversation_id == conversation_id and session.state.is_alive()
+            for session in session_registry.sessions.values()
+        )
+
+    async def _cancel_generation(self) -> None:
+        """Stop the running generation and wait until its response has been saved."""
+        task = self.generation_task
+        if task is not None:
+            task.cancel()
+            await asyncio.wait([task])
+
+    def start_streaming(self) -> None:
+        """Show the streaming bubble for a new AI response."""
+        self.is_thinking = True
+        self.pending_chunks.clear()
+        self.response_parts = []
+        self.response_seq = None
+        self.checkpointed_at = time.monotonic()
+        if self.messages_container is None:
+            return
+        self.empty_label.set_visibility(False)
+        with self.messages_container:
+            self.streaming_message = self._render_streaming_message()
+        self._scroll_to_bottom()
+
+    def update_streaming_content(self, delta: str) -> None:
+        """Append newly streamed text to the streaming response in UI."""
+        if self.streaming_markdown is not None:
+            self.streaming_markdown.append(delta)
+
+    def update_queue_position(self, position: int, expected_wait: float) -> None:
+        """Show the queue position while waiting for a generation slot."""
+        if self.streaming_markdown is not None:
+            self.streaming_markdown.set_placeholder(QUEUE_POSITION_MSG.format(position=position, wait=expected_wait))
 
-    def add_ai_message(self, text: str) -> None:
-        """Add an AI message to chat history."""
-        stamp = datetime.now().strftime('%X')
-        self.messages.append((AI_ID, text, stamp))
+    def flush_streaming(self) -> None:
+        """Move buffered chunks into the response and push one UI update."""
+        if not self.pending_chunks:
+            return
+        start = len(self.response_parts)
+        while self.pending_chunks:
+            self.response_parts.append(self.pending_chunks.popleft())
+        self.update_streaming_content(''.join(self.response_parts[start:]))
+        if time.monotonic() - self.checkpointed_at > CONVERSATION_CHECKPOINT_INTERVAL:
+            # Save the partial response, so that a crash does not lose it; the final text replaces it
+            self.checkpointed_at = time.monotonic()
+            if self.response_seq is None:
+                self.response_seq = conversation_store.append_message(
+                    self.conversation_id, AI_ID, ''.join(self.response_parts), int(time.time())
+                )
+            else:
+                conversation_store.update_message(self.conversation_id, self.response_seq, AI_ID,
+                                                  ''.join(self.response_parts))
 
-    def clear_messages(self) -> None:
-        """Clear all messages from chat history."""
-        self.messages.clear()
+    def finish_streaming(self, error: Optional[str] = None) -> None:
+        """Replace the streaming bubble with the final AI message."""
+        self.flush_streaming()
+        text = self.model_manager.last_response or ''  # The string the conversation holds, not a second copy
+        self.is_thinking = False
+        self.response_parts = []
+        self.streaming_markdown = None
+        if self.streaming_message is not None:
+            self.streaming_message.delete()
+            self.streaming_message = None
+        if error is not None:
+            self.add_status_message(error)
+        else:
+            self.add_ai_message(text, _format_stats(self.model_manager.last_response_stats))
 
-    def update_streaming_content(self, text: str) -> None:
-        """Update streaming response in UI."""
-        if "streaming" in self.markdown_components:
-            self.markdown_components["streaming"].content = text
+    async def get_ai_response(self, message_text: str) -> None:
+        """Get AI response with streaming updates.
 
-    def get_ai_response(self, message_text: str) -> None:
-        """Get AI response with streaming updates."""
+        Cached answers are replayed without touching the model. Otherwise
+        the request first waits for a slot in the global scheduler. Chunks
+        are only buffered here; the UI picks them up at STREAMING_FRAME_RATE,
+        so the model itself is never throttled.
+        """
+        error = None
         try:
-            self.current_response = ""
-            full_response = ""
-            
-            for chunk in self.model_manager.get_client().stream_chat(message_text):
-                self.current_response += chunk
-                self.update_streaming_content(self.current_response)
-                full_response += chunk
-                time.sleep(STREAMING_DELAY)
-            
-            self.is_thinking = False
-            self.current_response = ""
-            self.message_completed = True
-            self.add_ai_message(full_response)
-            
+            cached = await self.model_manager.get_cached_response(message_text)
+            if cached is not None:
+                self.pending_chunks.append(cached)
+            else:
+                model_name = self.model_manager.current_model
+                async with scheduler.slot(model_name, self.session_id, on_update=self.update_queue_position):
+                    if self.streaming_markdown is not None:
+                        self.streaming_markdown.set_placeholder(THINKING_MSG)
+                    async for chunk in self.model_manager.stream_chat(message_text):
+                        self.pending_chunks.append(chunk)
+        except QueueFullError:
+            error = QUEUE_FULL_MSG
+        except asyncio.CancelledError:
+            self.generation_task = None
+            self.flush_streaming()
+            self.finish_streaming(None if self.response_parts else GENERATION_STOPPED_MSG)
+            raise
         except Exception as e:
-            error_msg = str(e)
-            self.is_thinking = False
-            self.current_response = ""
-            self.message_completed = True
-            self.add_ai_message(f"Error: {error_msg}")
+            error = f"Error: {str(e)}"
+
+        self.generation_task = None
+        self.finish_streaming(error)
+        if self.is_stale:
+            await self.open_conversation(self.conversation_id)
+
+    async def load_earlier_messages(self) -> None:
+        """Mount the page of messages right before the oldest mounted one.
+
+        Messages that are not loaded yet are fetched from the conversation store.
+        """
+        if self.messages_container is None or self.first_mounted == 0 or self.loading_history:
+            return
+        session_registry.touch(self.session_id)
+        self.loading_history = True
+        try:
+            start = max(0, self.first_mounted - CHAT_PAGE_SIZE)
+            if start < self.history.offset:
+                conversation_id = self.conversation_id
+                offset = self.history.offset
+                rows = await conversation_store.load_messages(conversation_id, offset, offset - start)
+                if conversation_id != self.conversation_id or offset != self.history.offset or not rows:
+                    return
+                self.history.prepend(rows[0][0], [(role, content, created_at) for _, role, content, created_at in rows])
+                start = max(start, self.history.offset)
+            with self.messages_container:
+                elements = [self._render_message(seq) for seq in range(start, self.first_mounted)]
+            for offset, element in enumerate(elements, start=1):  # Right after the history loader
+                element.move(target_index=offset)
+            self.message_elements.extendleft(reversed(elements))
+            self.first_mounted = start
+            self.history_loader.set_visibility(start > 0)
+        finally:
+            self.loading_history = False
+
+    def _add_message(self, user_id: str, text: str, details: Optional[str] = None) -> None:
+        """Append a message to the history, the page and the conversation store."""
+        created_at = int(time.time())
+        if self.conversation_id is None:
+            self.conversation_id = conversation_store.create_conversation(self.owner, self.model_manager.current_model)
+            if self.on_conversations_changed is not None:
+                self.on_conversations_changed()
+        seq = self.history.append(user_id, text, created_at)
+        if details is not None:
+            self.history.set_details(seq, details)
+        stored_seq, self.response_seq = self.response_seq, None
+        if stored_seq is None:
+            stored_seq = conversation_store.append_message(self.conversation_id, user_id, text, created_at)
+        else:
+            conversation_store.update_message(self.conversation_id, stored_seq, user_id, text)
+        if stored_seq != seq:
+            # Another tab wrote to the conversation in between; it is reloaded once the response is done
+            self.is_stale = True
+        self._append_message(seq)
+        self.history.spill(self.first_mounted, self.model_manager.get_memory_usage())
+
+    def _load_history(self, offset: int, messages: List[MessageRecord]) -> None:
+        """Replace the loaded history and redraw it."""
+        self.history.reset(offset, messages)
+        self.is_stale = False
+        if self.messages_container is not None:
+            self.chat_messages.refresh()
+
+    def _append_message(self, seq: int) -> None:
+        """Render a single new message without rebuilding the history."""
+        if self.messages_container is None:
+            return
+        self.empty_label.set_visibility(False)
+        with self.messages_container:
+            self.message_elements.append(self._render_message(seq))
+        if len(self.message_elements) > CHAT_WINDOW_SIZE + CHAT_PAGE_SIZE:
+            self._unmount_oldest(len(self.message_elements) - CHAT_WINDOW_SIZE)
+        self._scroll_to_bottom()
+
+    def _unmount_oldest(self, count: int) -> None:
+        """Remove the oldest mounted messages from the page; they can be loaded again."""
+        for _ in range(count):
+            self.message_elements.popleft().delete()
+        self.first_mounted += count
+        self.history_loader.set_visibility(True)
+
+    def _render_message(self, seq: int) -> ui.chat_message:
+        """Create the UI component for the message at the given position of the conversation."""
+        user_id, text, created_at = self.history.get(seq)
+        stamp = _format_stamp(created_at)
+        details = self.history.get_details(seq)
+        if details is not None:
+            stamp = f'{stamp} · {details}'
+        if user_id == USER_ID:
+            return ui.chat_message(text=text, stamp=stamp, avatar=None, sent=True)
+        html = self.history.get_html(seq)
+        if html is None:
+            html = render_markdown(text)
+            self.history.set_html(seq, html)
+        with ui.chat_message(stamp=stamp, avatar=None, sent=False) as message:
+            StreamingMarkdown(html=html)
+        return message
+
+    def _render_streaming_message(self) -> ui.chat_message:
+        """Create the chat bubble that is updated in place while streaming."""
+        with ui.chat_message(stamp=datetime.now().strftime('%X'), avatar=None, sent=False) as msg:
+            self.streaming_markdown = StreamingMarkdown(''.join(self.response_parts), placeholder=THINKING_MSG)
+            # Lives inside the bubble, so it stops as soon as the bubble is deleted
+            ui.timer(1 / STREAMING_FRAME_RATE, self.flush_streaming)
+        return msg
+
+    def _scroll_to_bottom(self) -> None:
+        """Scroll the page to the newest message."""
+        self.messages_container.client.run_javascript('window.scrollTo(0, document.body.scrollHeight)')
 
     @ui.refreshable
     def chat_messages(self) -> None:
-        """Display chat messages in UI."""
-        self.markdown_components = {}
-        
-        if self.messages:
-            for i, (user_id, text, stamp) in enumerate(self.messages):
-                if user_id == USER_ID:
-                    ui.chat_message(text=text, stamp=stamp, avatar=None, sent=True)
-                else:
-                    with ui.chat_message(stamp=stamp, avatar=None, sent=False) as msg:
-                        msg_id = f"message_{i}"
-                        self.markdown_components[msg_id] = ui.markdown(text)
-        else:
-            ui.label('No messages yet').classes('mx-auto my-36')
-        
-        if self.is_thinking:
-            response_text = self.current_response if self.current_response else "Thinking..."
-            with ui.chat_message(stamp=datetime.now().strftime('%X'), avatar=None, sent=False) as msg:
-                msg_id = "streaming"
-                self.markdown_components[msg_id] = ui.markdown(response_text)
-        
-        if self.is_thinking or self.message_completed:
-            ui.run_javascript('window.scrollTo(0, document.body.scrollHeight)')
-            self.message_completed = False 
\ No newline at end of file
+        """Display chat messages in UI.
+
+        Only the newest CHAT_WINDOW_SIZE messages are mounted; older ones are
+        loaded page by page when the user scrolls up. Afterwards messages are
+        appended incrementally and only a change of the whole history (e.g.
+        clearing the chat) triggers a refresh. Finished messages are rendered
+        to HTML once and reused whenever they are mounted again.
+        """
+        self.message_elements = deque()
+        self.streaming_message = None
+        self.streaming_markdown = None
+        self.first_mounted = max(self.history.offset, self.history.count - CHAT_WINDOW_SIZE)
+
+        with ui.column().classes('w-full') as self.messages_container:
+            with ScrollSentinel(on_visible=self.load_earlier_messages).classes('w-full') as self.history_loader:
+                ui.button('Load earlier messages', on_click=self.load_earlier_messages).props('flat').classes('mx-auto')
+            self.history_loader.set_visibility(self.first_mounted > 0)
+            for seq in range(self.first_mounted, self.history.count):
+                self.message_elements.append(self._render_message(seq))
+            if self.is_thinking:
+                self.streaming_message = self._render_streaming_message()
+
+        self.empty_label = ui.label('No messages yet').classes('mx-auto my-36')
+        self.empty_label.set_visibility(not self.history.count and not self.is_thinking)
+
+
+def _format_stamp(created_at: int) -> str:
+    """Format the time a message was created for display."""
+    return datetime.fromtimestamp(created_at).strftime('%X')
+
+
+def _format_stats(stats: Optional[Dict[str, float]]) -> Optional[str]:
+    """Format the generation statistics of a response for display."""
+    if not stats or 'tokens_per_second' not in stats or 'time_to_first_token' not in stats:
+        return None
+    return RESPONSE_STATS_MSG.format(**stats)
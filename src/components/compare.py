@@ -0,0 +1,194 @@
+"""
+Model comparison for the chat application.
+Sends one prompt to several models at once and streams the answers side by side.
+"""
+import asyncio
+from collections import deque
+from typing import Deque, List, Optional
+
+from nicegui import ui, background_tasks, binding
+
+from src.config.config import (
+    STREAMING_FRAME_RATE, COMPARE_MAX_MODELS, COMPARE_MAX_CONCURRENT,
+    THINKING_MSG, GENERATION_STOPPED_MSG, QUEUE_POSITION_MSG, QUEUE_FULL_MSG,
+    COMPARE_WAITING_MSG, COMPARE_STATS_MSG, MODEL_SWITCH_SUCCESS_MSG, NO_MODELS_FOUND_MSG
+)
+from src.services.catalog import model_catalog
+from src.services.models import ModelManager
+from src.services.scheduler import scheduler, QueueFullError
+from src.components.chat import ChatManager
+from src.components.streaming_markdown import StreamingMarkdown
+
+
+class _CompareColumn:
+    """The streamed answer of one model."""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.pending_chunks: Deque[str] = deque()
+        self.markdown: Optional[StreamingMarkdown] = None
+        self.stats_label: Optional[ui.label] = None
+        self.use_button: Optional[ui.button] = None
+
+    def flush(self) -> None:
+        """Push the buffered chunks to the page in one update."""
+        if self.pending_chunks:
+            delta = ''.join(self.pending_chunks)
+            self.pending_chunks.clear()
+            self.markdown.append(delta)
+
+    def set_status(self, text: str) -> None:
+        """Show a status while nothing has been streamed yet."""
+        self.markdown.set_placeholder(text)
+
+    def update_queue_position(self, position: int, expected_wait: float) -> None:
+        """Show the queue position while waiting for a generation slot."""
+        self.set_status(QUEUE_POSITION_MSG.format(position=position, wait=expected_wait))
+
+
+class CompareView:
+    """Dialog that runs a prompt against several models side by side.
+
+    Every model answers in a fresh conversation, so the chat stays as it is.
+    At most COMPARE_MAX_CONCURRENT models of a comparison generate at once,
+    and each of them also waits for a slot in the global scheduler like a
+    chat message would, so a comparison cannot overload a small host.
+    """
+    is_running = binding.BindableProperty()
+
+    def __init__(self, chat_manager: ChatManager):
+        self.chat_manager = chat_manager
+        self.session_id = ui.context.client.id
+        self.is_running = False
+        self.columns: List[_CompareColumn] = []
+        self.selected: List[str] = []  # Models to compare, in the order they were picked
+        self.tasks: List[asyncio.Task] = []
+
+        self.dialog = ui.dialog().props('maximized')
+        with self.dialog, ui.card().classes('w-full'):
+            with ui.row().classes('w-full items-center'):
+                ui.label('Compare Models').classes('text-xl font-bold')
+                ui.space()
+                ui.button('Close', on_click=self.dialog.close, icon='close').props('flat')
+            self.model_choices()
+            with ui.row().classes('w-full no-wrap items-center'):
+                self.prompt_input = ui.input(placeholder='Type a prompt to compare...') \
+                    .props('rounded outlined input-class=mx-3').classes('flex-grow')
+                self.prompt_input.on('keydown.enter', self.start)
+                ui.button('Run', on_click=self.start).props('icon=send').classes('custom-button') \
+                    .bind_visibility_from(self, 'is_running', backward=lambda running: not running)
+                ui.button('Stop', on_click=self.stop).props('icon=stop').classes('custom-button') \
+                    .bind_visibility_from(self, 'is_running')
+            self.results = ui.row().classes('w-full no-wrap items-stretch')
+
+        ui.context.client.on_disconnect(self.stop)
+
+    async def show(self) -> None:
+        """Open the dialog with the installed models to choose from."""
+        self.dialog.open()
+        if not model_catalog.is_loaded:
+            await model_catalog.refresh()
+        if not self.selected:
+            self.selected = [self.chat_manager.model_manager.current_model]
+        self.model_choices.refresh()
+
+    @ui.refreshable
+    def model_choices(self) -> None:
+        """Display a checkbox for every installed model."""
+        model_names = [model.get('model') for model in model_catalog.get_models()]
+        self.selected = [model_name for model_name in self.selected if model_name in model_names]
+        with ui.row().classes('w-full items-center'):
+            ui.label(f'Models (up to {COMPARE_MAX_MODELS}):').classes('model-meta')
+            if not model_names:
+                ui.label(NO_MODELS_FOUND_MSG).classes('model-meta')
+            for model_name in model_names:
+                ui.checkbox(model_name, value=model_name in self.selected,
+                            on_change=lambda event, name=model_name: self._select_model(name, event.value))
+
+    def _select_model(self, model_name: str, selected: bool) -> None:
+        """Add a model to the comparison or remove it."""
+        if model_name in self.selected:
+            self.selected.remove(model_name)
+        if selected:
+            self.selected.append(model_name)
+
+    def start(self) -> None:
+        """Send the prompt to every selected model."""
+        prompt = self.prompt_input.value
+        model_names = list(self.selected)
+        if not prompt or self.is_running:
+            return
+        if not model_names:
+            ui.notify('Please select the models to compare', color='negative')
+            return
+        if len(model_names) > COMPARE_MAX_MODELS:
+            ui.notify(f'Please select at most {COMPARE_MAX_MODELS} models', color='negative')
+            return
+
+        self.is_running = True
+        self.columns = [_CompareColumn(model_name) for model_name in model_names]
+        self.results.clear()
+        with self.results:
+            for column in self.columns:
+                self._render_column(column)
+        limit = asyncio.Semaphore(COMPARE_MAX_CONCURRENT)
+        self.tasks = [background_tasks.create(self._run_column(column, prompt, limit), name='compare')
+                      for column in self.columns]
+        background_tasks.create(self._wait_for_columns(self.tasks), name='compare_done')
+
+    def stop(self) -> None:
+        """Abort the running comparison, keeping the text received so far."""
+        for task in self.tasks:
+            task.cancel()
+
+    def _render_column(self, column: _CompareColumn) -> None:
+        """Create the card a model streams its answer into."""
+        with ui.card().classes('compare-column flex-1 min-w-0'):
+            with ui.row().classes('w-full items-center no-wrap'):
+                ui.label(column.model_name).classes('model-name')
+                ui.space()
+                column.use_button = ui.button('Use', icon='check', on_click=lambda: self._use_model(column.model_name)) \
+                    .props('flat dense')
+                column.use_button.set_visibility(False)
+            column.stats_label = ui.label().classes('model-meta')
+            column.markdown = StreamingMarkdown(placeholder=COMPARE_WAITING_MSG).classes('w-full')
+            # Lives inside the card, so it stops as soon as the results are cleared
+            ui.timer(1 / STREAMING_FRAME_RATE, column.flush)
+
+    async def _run_column(self, column: _CompareColumn, prompt: str, limit: asyncio.Semaphore) -> None:
+        """Stream the answer of one model and show its statistics."""
+        model_manager = ModelManager(column.model_name)
+        try:
+            async with limit:
+                async with scheduler.slot(column.model_name, self.session_id, on_update=column.update_queue_position):
+                    column.set_status(THINKING_MSG)
+                    async for chunk in model_manager.stream_chat(prompt):
+                        column.pending_chunks.append(chunk)
+        except QueueFullError:
+            column.set_status(QUEUE_FULL_MSG)
+            return
+        except asyncio.CancelledError:
+            column.flush()
+            column.set_status(GENERATION_STOPPED_MSG)
+            raise
+        except Exception as e:
+            column.set_status(f"Error: {str(e)}")
+            return
+        column.flush()
+        stats = model_manager.last_response_stats
+        if stats and 'time_to_first_token' in stats and 'tokens_per_second' in stats:
+            column.stats_label.set_text(COMPARE_STATS_MSG.format(**stats))
+        column.use_button.set_visibility(True)
+
+    async def _wait_for_columns(self, tasks: List[asyncio.Task]) -> None:
+        """Mark the comparison as finished once every model is done."""
+        await asyncio.wait(tasks)
+        if tasks is self.tasks:
+            self.is_running = False
+
+    def _use_model(self, model_name: str) -> None:
+        """Continue the chat with a compared model."""
+        if model_name != self.chat_manager.model_manager.current_model:
+            self.chat_manager.switch_model(model_name)
+            ui.notify(MODEL_SWITCH_SUCCESS_MSG.format(model_name=model_name), color='positive')
+        self.dialog.close()
@@ -2,13 +2,19 @@
 Dialog management for the chat application.
 Handles all dialog-related functionality and UI components.
 """
-from nicegui import ui
-from typing import Callable
+import asyncio
+from nicegui import ui, events
+from typing import Dict, List, Set, Tuple
 
 from src.services.models import ModelManager
+from src.services.catalog import model_catalog
+from src.services.documents import document_index
+from src.services.hosts import host_pool
+from src.services.pulls import pull_manager, Pull, PULL_SUCCEEDED, PULL_FAILED
+from src.services.residency import residency_manager
 from src.components.chat import ChatManager
 from src.config.config import (
-    MODEL_DIALOG_MIN_WIDTH, MODEL_DIALOG_MAX_WIDTH,
+    MODEL_DIALOG_MIN_WIDTH, MODEL_DIALOG_MAX_WIDTH, DOCUMENT_MAX_UPLOAD_BYTES, DOCUMENT_FILE_TYPES,
     NO_MODELS_FOUND_MSG, MODEL_SWITCH_SUCCESS_MSG
 )
 
@@ -17,14 +23,22 @@ class DialogManager:
     def __init__(self, model_manager: ModelManager, chat_manager: ChatManager):
         self.model_manager = model_manager
         self.chat_manager = chat_manager
+        self.started_pulls: Set[str] = set()  # Pulls started from this page, announced when they finish
+        self.pull_rows: Dict[str, Tuple[ui.linear_progress, ui.label]] = {}
+        self.shown_pulls: List[Tuple[str, str]] = []
         
         # Create dialogs
         self.models_dialog = ui.dialog()
         self.pull_dialog = ui.dialog()
+        self.documents_dialog = ui.dialog()
         
         # Initialize dialog components
         self._init_models_dialog()
         self._init_pull_dialog()
+        self._init_documents_dialog()
+        
+        unsubscribe = pull_manager.subscribe(self._on_pulls_changed)
+        ui.context.client.on_disconnect(unsubscribe)
     
     def _init_models_dialog(self):
         """Initialize the models selection dialog."""
@@ -39,12 +53,63 @@ class DialogManager:
                 with ui.column().classes('w-full'):
                     ui.label('Pull New Model').classes('text-xl font-bold')
                     self.model_input = ui.input(placeholder='Enter model name (e.g. llama2)').classes('w-full')
-                    self.progress_bar = ui.linear_progress().classes('w-full')
-                    self.status_label = ui.label('').classes('text-sm')
                     
                     with ui.row().classes('w-full justify-end'):
-                        ui.button('Cancel', on_click=self.pull_dialog.close).props('flat')
+                        ui.button('Close', on_click=self.pull_dialog.close).props('flat')
                         ui.button('Pull', on_click=self._pull_model).props('flat').classes('custom-button')
+                    
+                    self.pull_list()
+    
+    def _init_documents_dialog(self):
+        """Initialize the documents dialog."""
+        with self.documents_dialog:
+            with ui.card().classes('w-full').style(f'min-width: {MODEL_DIALOG_MIN_WIDTH}; max-width: {MODEL_DIALOG_MAX_WIDTH};'):
+                with ui.column().classes('w-full'):
+                    with ui.row().classes('w-full items-center'):
+                        ui.label('Documents').classes('text-xl font-bold')
+                        ui.space()
+                        ui.button('Close', on_click=self.documents_dialog.close, icon='close').props('flat')
+                    ui.label('Checked documents are searched for every message; only the most relevant '
+                             'passages are added to the prompt.').classes('model-meta')
+                    ui.upload(label='Attach text files', multiple=True, auto_upload=True,
+                              max_file_size=DOCUMENT_MAX_UPLOAD_BYTES, on_upload=self._upload_document,
+                              on_rejected=lambda: ui.notify('The file is too large', color='negative')) \
+                        .props(f'accept="{DOCUMENT_FILE_TYPES}" flat bordered').classes('w-full')
+                    self.document_list()
+    
+    @ui.refreshable
+    def document_list(self):
+        """Display the indexed documents and whether this chat uses them."""
+        documents = document_index.get_documents(self.chat_manager.owner)
+        if not documents:
+            ui.label('No documents yet').classes('model-meta')
+        for document in documents:
+            with ui.row().classes('w-full items-center no-wrap'):
+                ui.checkbox(document['name'], value=document['id'] in self.model_manager.document_ids,
+                            on_change=lambda event, document_id=document['id']: self._use_document(document_id, event.value))
+                ui.label(f"{document['chunks']} chunks").classes('model-meta')
+                ui.space()
+                ui.button(icon='delete', on_click=lambda document_id=document['id']: self._delete_document(document_id)) \
+                    .props('flat dense').classes('text-negative')
+    
+    @ui.refreshable
+    def pull_list(self):
+        """Display the pulls of all sessions; progress is updated in place."""
+        self.pull_rows = {}
+        pulls = pull_manager.get_pulls()
+        self.shown_pulls = [(pull.model_name, pull.state) for pull in pulls]
+        for pull in pulls:
+            with ui.column().classes('w-full gap-1'):
+                with ui.row().classes('w-full items-center no-wrap'):
+                    ui.label(pull.model_name).classes('model-name')
+                    ui.space()
+                    if pull.finished:
+                        ui.button(icon='close', on_click=lambda name=pull.model_name: pull_manager.dismiss(name)).props('flat dense')
+                    else:
+                        ui.button(icon='stop', on_click=lambda name=pull.model_name: pull_manager.cancel(name)).props('flat dense').classes('text-negative')
+                progress_bar = ui.linear_progress(value=pull.progress, show_value=False).classes('w-full')
+                status_label = ui.label(_format_pull_status(pull)).classes('model-meta')
+                self.pull_rows[pull.model_name] = (progress_bar, status_label)
     
     @ui.refreshable
     def model_list_component(self, dialog):
@@ -56,7 +121,7 @@ class DialogManager:
             with ui.row():
                 ui.label('Available Models').classes('text-xl font-bold')
                 ui.space()
-                ui.button('Refresh', on_click=lambda: self.model_list_component.refresh(dialog), icon='refresh').props('flat').classes('custom-button')
+                ui.button('Refresh', on_click=lambda: self._reload_models(dialog), icon='refresh').props('flat').classes('custom-button')
                 ui.button('Close', on_click=dialog.close, icon='close').props('flat')
                 
             if models:
@@ -66,9 +131,7 @@ class DialogManager:
                     
                     def select_model(model_to_select=model_name):
                         if model_to_select != self.model_manager.current_model:
-                            self.model_manager.switch_model(model_to_select)
-                            self.chat_manager.clear_messages()
-                            self.chat_manager.chat_messages.refresh()
+                            self.chat_manager.switch_model(model_to_select)
                             ui.notify(MODEL_SWITCH_SUCCESS_MSG.format(model_name=model_to_select), color='positive')
                         
                         self.model_list_component.refresh(dialog)
@@ -80,49 +143,152 @@ class DialogManager:
                                 ui.label(model_name).classes('model-name')
                                 if is_selected:
                                     ui.label('ACTIVE').classes('text-positive text-bold q-ml-sm')
+                                if residency_manager.is_loaded(model_name):
+                                    ui.label('LOADED').classes('text-info text-bold q-ml-sm')
                                 size_mb = model.get('size', 0) / (1024 * 1024)
                                 ui.label(f"Size: {size_mb:.1f} MB").classes('model-meta')
+                                if len(host_pool.hosts) > 1:
+                                    ui.label(f"Hosts: {', '.join(model.get('hosts', []))}").classes('model-meta')
                             ui.space()
                             if not is_selected:  # Don't show delete button for active model
-                                def delete_model(model_to_delete=model_name):
-                                    if self.model_manager.delete_model(model_to_delete):
+                                async def delete_model(model_to_delete=model_name):
+                                    if await self.model_manager.delete_model(model_to_delete):
                                         ui.notify(f"Model {model_to_delete} deleted successfully", color='positive')
-                                        self.model_list_component.refresh(dialog)
                                     else:
                                         ui.notify(f"Failed to delete model {model_to_delete}", color='negative')
+                                    await self._reload_models(dialog)
                                 
                                 ui.button(icon='delete', on_click=delete_model).props('flat dense').classes('text-negative')
             else:
                 ui.label(NO_MODELS_FOUND_MSG).classes('p-4')
+            
+            self._loaded_models_section()
     
-    def _update_progress(self, progress: float, status: str):
-        """Update pull progress bar and status."""
-        self.progress_bar.value = progress
-        self.status_label.set_text(status)
+    def _loaded_models_section(self):
+        """Display the models currently loaded into memory."""
+        ui.separator()
+        ui.label('Loaded in Memory').classes('text-lg font-bold')
+        if not residency_manager.loaded:
+            ui.label('No models loaded').classes('model-meta')
+            return
+        
+        for model in residency_manager.loaded:
+            size_mb = model.get('size', 0) / (1024 * 1024)
+            vram_mb = model.get('size_vram', 0) / (1024 * 1024)
+            expires_at = model.get('expires_at')
+            expiry = f", unloads at {expires_at.strftime('%X')}" if expires_at else ''
+            with ui.row().classes('w-full items-center'):
+                ui.label(model.get('model', 'Unknown')).classes('model-name')
+                if len(host_pool.hosts) > 1:
+                    ui.label(f"on {model.get('host') or 'default'}").classes('model-meta')
+                ui.label(f"Memory: {size_mb:.1f} MB, VRAM: {vram_mb:.1f} MB{expiry}").classes('model-meta')
+        
+        usage = residency_manager.get_memory_usage()
+        total_mb = usage['size'] / (1024 * 1024)
+        total_vram_mb = usage['size_vram'] / (1024 * 1024)
+        ui.label(f"Total: {total_mb:.1f} MB, VRAM: {total_vram_mb:.1f} MB").classes('model-meta')
+    
+    async def _reload_models(self, dialog):
+        """Fetch the model catalog and residency from Ollama and redraw the model list."""
+        await asyncio.gather(model_catalog.refresh(), residency_manager.refresh())
+        self.model_list_component.refresh(dialog)
+
+    def _on_pulls_changed(self):
+        """Show the current state of the pulls (called at most PULL_UPDATE_RATE times per second)."""
+        pulls = pull_manager.get_pulls()
+        for pull in pulls:
+            if pull.finished and pull.model_name in self.started_pulls:
+                self.started_pulls.discard(pull.model_name)
+                with self.pull_dialog:
+                    if pull.state == PULL_SUCCEEDED:
+                        ui.notify(f'Model {pull.model_name} pulled successfully', color='positive')
+                    elif pull.state == PULL_FAILED:
+                        ui.notify(f'Failed to pull model {pull.model_name}', color='negative')
+        
+        if not self.pull_dialog.value:
+            return  # Redrawn when the dialog is opened
+        if [(pull.model_name, pull.state) for pull in pulls] != self.shown_pulls:
+            self.pull_list.refresh()
+            return
+        for pull in pulls:
+            progress_bar, status_label = self.pull_rows[pull.model_name]
+            progress_bar.set_value(pull.progress)
+            status_label.set_text(_format_pull_status(pull))
+    
+    def _use_document(self, document_id: int, used: bool):
+        """Search a document for the messages of this chat, or stop doing so."""
+        if used:
+            self.model_manager.document_ids.add(document_id)
+        else:
+            self.model_manager.document_ids.discard(document_id)
+    
+    async def _upload_document(self, event: events.UploadEventArguments):
+        """Index an uploaded file and use it in this chat."""
+        try:
+            text = event.content.read().decode('utf-8')
+        except UnicodeDecodeError:
+            ui.notify(f'{event.name} is not a text file', color='negative')
+            return
+        
+        progress = ui.notification(f'Indexing {event.name}...', type='ongoing', spinner=True, timeout=None)
+        
+        def show_progress(embedded: int, total: int):
+            progress.message = f'Indexing {event.name}: {embedded} of {total} chunks'
+        
+        try:
+            document = await document_index.add(self.chat_manager.owner, event.name, text, on_progress=show_progress)
+        except Exception as e:
+            print(f"Error indexing document: {str(e)}")
+            ui.notify(f'Failed to index {event.name}: {str(e)}', color='negative')
+            return
+        finally:
+            progress.dismiss()
+        self.model_manager.document_ids.add(document['id'])
+        ui.notify(f"{event.name} attached ({document['chunks']} chunks)", color='positive')
+        self.document_list.refresh()
+    
+    async def _delete_document(self, document_id: int):
+        """Remove a document from the index."""
+        self.model_manager.document_ids.discard(document_id)
+        await document_index.remove(document_id, self.chat_manager.owner)
+        self.document_list.refresh()
     
     def _pull_model(self):
-        """Handle model pulling."""
+        """Start pulling a model, or follow the pull that is already running for it."""
         model_name = self.model_input.value.strip()
         if not model_name:
             ui.notify('Please enter a model name', color='negative')
             return
         
-        def pull_thread():
-            if self.model_manager.pull_model(model_name, self._update_progress):
-                ui.notify(f'Model {model_name} pulled successfully', color='positive')
-                self.model_list_component.refresh(self.models_dialog)
-                self.pull_dialog.close()
-            else:
-                ui.notify(f'Failed to pull model {model_name}', color='negative')
-        
-        import threading
-        threading.Thread(target=pull_thread, daemon=True).start()
+        self.started_pulls.add(model_name)
+        pull_manager.start(model_name)
+        self.model_input.value = ''
     
-    def show_models_dialog(self):
+    async def show_models_dialog(self):
         """Open the models selection dialog."""
         self.models_dialog.open()
+        if not model_catalog.is_loaded:
+            await model_catalog.refresh()
         self.model_list_component.refresh(self.models_dialog)
+        
+        loaded_before = [model.get('model') for model in residency_manager.loaded]
+        await residency_manager.refresh()
+        if [model.get('model') for model in residency_manager.loaded] != loaded_before:
+            self.model_list_component.refresh(self.models_dialog)
+    
+    def show_documents_dialog(self):
+        """Open the documents dialog."""
+        self.document_list.refresh()
+        self.documents_dialog.open()
     
     def show_pull_dialog(self):
         """Open the pull model dialog."""
-        self.pull_dialog.open() 
\ No newline at end of file
+        self.pull_list.refresh()
+        self.pull_dialog.open() 
+
+
+def _format_pull_status(pull: Pull) -> str:
+    """Describe the state of a pull for display."""
+    if pull.total and not pull.finished:
+        return f"{pull.status} ({pull.completed / 1024 ** 3:.2f} of {pull.total / 1024 ** 3:.2f} GB)"
+    return pull.status
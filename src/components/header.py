@@ -1,12 +1,16 @@
 from nicegui import ui
 from src.services.models import ModelManager
 from components.dialogs import DialogManager
+from components.sidebar import ConversationSidebar
+from components.compare import CompareView
 from src.config.config import APP_TITLE
 
-def create_header(dialog_manager: DialogManager, model_manager: ModelManager) -> None:
+def create_header(dialog_manager: DialogManager, model_manager: ModelManager, sidebar: ConversationSidebar,
+                  compare_view: CompareView) -> None:
     """Create the application header."""
     with ui.header().classes('custom-header text-white'):
         with ui.row().classes('w-full items-center'):
+            ui.button(on_click=sidebar.toggle, icon='menu').props('flat round').classes('text-white')
             ui.label(APP_TITLE).classes('text-xl')
             ui.label().bind_text_from(
                 model_manager.get_model_data(), 
@@ -14,5 +18,7 @@ def create_header(dialog_manager: DialogManager, model_manager: ModelManager) ->
                 backward=lambda name: f"Model: {name}"
             ).classes('model-badge')
             ui.space()
+            ui.button('Compare', on_click=compare_view.show, icon='compare_arrows').props('flat').classes('header-button')
+            ui.button('Documents', on_click=dialog_manager.show_documents_dialog, icon='description').props('flat').classes('header-button')
             ui.button('Pull Model', on_click=dialog_manager.show_pull_dialog, icon='download').props('flat').classes('header-button')
             ui.button('Models', on_click=dialog_manager.show_models_dialog, icon='list').props('flat').classes('header-button')
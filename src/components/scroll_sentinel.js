@@ -0,0 +1,15 @@
+export default {
+  template: `<div><slot></slot></div>`,
+  mounted() {
+    this.observer = new IntersectionObserver((entries) => {
+      if (entries.some((entry) => entry.isIntersecting)) this.$emit("visible");
+    });
+    // NOTE: only observe once the page has been scrolled, not while it is still at the top after loading
+    this.observe = () => this.observer.observe(this.$el);
+    window.addEventListener("scroll", this.observe, { once: true });
+  },
+  unmounted() {
+    window.removeEventListener("scroll", this.observe);
+    this.observer.disconnect();
+  },
+};
@@ -0,0 +1,15 @@
+"""
+Scroll sentinel element for the chat application.
+Notifies the server when the user scrolls to it.
+"""
+from typing import Callable
+
+from nicegui import ui
+
+
+class ScrollSentinel(ui.element, component='scroll_sentinel.js'):
+    """Element that emits an event whenever it scrolls into view."""
+
+    def __init__(self, on_visible: Callable[[], None]) -> None:
+        super().__init__()
+        self.on('visible', on_visible)
@@ -0,0 +1,62 @@
+"""
+Conversation sidebar for the chat application.
+Lists stored conversations and switches between them.
+"""
+from datetime import datetime
+from nicegui import ui, background_tasks
+
+from src.components.chat import ChatManager
+from src.services.conversation_store import conversation_store
+from src.config.config import CONVERSATION_LIST_LIMIT
+
+class ConversationSidebar:
+    """Drawer with the most recent conversations (metadata only)."""
+    def __init__(self, chat_manager: ChatManager):
+        self.chat_manager = chat_manager
+        self.chat_manager.on_conversations_changed = self.conversation_list.refresh
+
+        with ui.left_drawer(value=False).classes('bg-white') as self.drawer:
+            ui.button('New Chat', on_click=self._new_conversation, icon='add').props('flat').classes('custom-button w-full')
+            background_tasks.create(self.conversation_list(), name='conversation_list')
+
+    def toggle(self) -> None:
+        """Show or hide the sidebar."""
+        self.drawer.toggle()
+
+    @ui.refreshable
+    async def conversation_list(self) -> None:
+        """Display the stored conversations."""
+        conversations = await conversation_store.list_conversations(self.chat_manager.owner, CONVERSATION_LIST_LIMIT)
+        if not conversations:
+            ui.label('No conversations yet').classes('model-meta p-4')
+            return
+
+        for conversation in conversations:
+            is_selected = conversation['id'] == self.chat_manager.conversation_id
+
+            async def open_conversation(conversation_id=conversation['id']):
+                if conversation_id != self.chat_manager.conversation_id:
+                    await self.chat_manager.open_conversation(conversation_id)
+                    self.conversation_list.refresh()
+
+            with ui.card().classes(f'model-item w-full {"selected" if is_selected else ""}').on('click', open_conversation):
+                with ui.row().classes('w-full items-center no-wrap'):
+                    with ui.column().classes('gap-0 min-w-0'):
+                        ui.label(conversation['title'] or 'New conversation').classes('model-name ellipsis w-full')
+                        updated = datetime.fromtimestamp(conversation['updated_at']).strftime('%x %X')
+                        ui.label(f"{conversation['message_count']} messages, {updated}").classes('model-meta')
+                    ui.space()
+
+                    async def delete_conversation(conversation_id=conversation['id']):
+                        if conversation_id == self.chat_manager.conversation_id:
+                            # Waits until the running response has been saved, so nothing is written after the delete
+                            await self.chat_manager.new_conversation()
+                        conversation_store.delete_conversation(conversation_id, self.chat_manager.owner)
+                        self.conversation_list.refresh()
+
+                    ui.button(icon='delete').props('flat dense').classes('text-negative').on('click.stop', delete_conversation)
+
+    async def _new_conversation(self) -> None:
+        """Start an empty conversation."""
+        await self.chat_manager.new_conversation()
+        self.conversation_list.refresh()
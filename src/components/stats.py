@@ -0,0 +1,71 @@
+"""
+Server statistics view for the chat application.
+Shows live sessions, their memory footprint and the shared services.
+"""
+from datetime import datetime
+from nicegui import ui
+
+from src.services.sessions import session_registry
+from src.services.scheduler import scheduler
+from src.services.response_cache import response_cache
+from src.services.residency import residency_manager
+from src.services.hosts import host_pool
+from src.config.config import MAX_WIDTH, MARGIN_X, MARGIN_Y, SESSION_STATS_REFRESH
+
+SESSION_COLUMNS = [
+    {'name': 'session_id', 'label': 'Session', 'field': 'session_id', 'align': 'left'},
+    {'name': 'created_at', 'label': 'Opened', 'field': 'created_at'},
+    {'name': 'idle_seconds', 'label': 'Idle (s)', 'field': 'idle_seconds', 'sortable': True},
+    {'name': 'state', 'label': 'State', 'field': 'state'},
+    {'name': 'memory', 'label': 'Memory (KB)', 'field': 'memory', 'sortable': True},
+]
+
+def create_stats_view() -> None:
+    """Create the statistics view, updated every SESSION_STATS_REFRESH seconds."""
+    content = ui.refreshable(stats_content)  # One per page, so each timer only refreshes its own view
+    with ui.column().classes(f'w-full max-w-{MAX_WIDTH} {MARGIN_X} {MARGIN_Y}'):
+        ui.label('Server Statistics').classes('text-xl font-bold')
+        content()
+    ui.timer(SESSION_STATS_REFRESH, content.refresh)
+
+def stats_content() -> None:
+    """Display the current statistics."""
+    sessions = session_registry.get_stats()
+    total_kb = sum(session['memory'] for session in sessions) / 1024
+    ui.label('Sessions').classes('text-lg font-bold')
+    ui.label(f"{len(sessions)} live sessions, {total_kb:.1f} KB of chat state").classes('model-meta')
+    rows = [
+        {
+            'session_id': session['session_id'][:8],
+            'created_at': datetime.fromtimestamp(session['created_at']).strftime('%X'),
+            'idle_seconds': session['idle_seconds'],
+            'state': 'generating' if session['busy'] else 'hibernated' if session['hibernated'] else 'active',
+            'memory': round(session['memory'] / 1024, 1),
+        }
+        for session in sessions
+    ]
+    ui.table(columns=SESSION_COLUMNS, rows=rows, row_key='session_id').classes('w-full')
+
+    ui.label('Generations').classes('text-lg font-bold')
+    queues = scheduler.get_stats()
+    if not queues:
+        ui.label('No generations yet').classes('model-meta')
+    for model_name, queue in queues.items():
+        ui.label(f"{model_name}: {queue['running']}/{queue['limit']} running, {queue['waiting']} waiting, "
+                 f"about {queue['average_duration']}s per response").classes('model-meta')
+
+    ui.label('Hosts').classes('text-lg font-bold')
+    for host in host_pool.get_stats():
+        state = 'healthy' if host['healthy'] else f"unreachable ({host['error']})"
+        ui.label(f"{host['host']}: {state}, {host['active']} generating, {host['models']} models installed, "
+                 f"loaded: {', '.join(host['loaded']) or 'none'}").classes('model-meta')
+
+    usage = residency_manager.get_memory_usage()
+    ui.label('Models').classes('text-lg font-bold')
+    ui.label(f"{len(residency_manager.loaded)} loaded, {usage['size'] / (1024 * 1024):.1f} MB").classes('model-meta')
+
+    if response_cache.enabled:
+        cache = response_cache.get_stats()
+        ui.label('Response Cache').classes('text-lg font-bold')
+        ui.label(f"{cache['entries']} entries, {cache['hits']} hits, {cache['misses']} misses "
+                 f"({cache['hit_rate']:.0%} hit rate)").classes('model-meta')
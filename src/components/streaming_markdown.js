@@ -0,0 +1,36 @@
+import { loadResource } from "../../static/utils/resources.js";
+
+export default {
+  template: `
+    <div>
+      <div v-for="(html, index) in blocks" :key="index" v-html="html"></div>
+      <div v-if="tail" class="streaming-tail">{{ tail }}</div>
+      <div v-if="!blocks.length && !tail">{{ placeholder }}</div>
+    </div>
+  `,
+  props: {
+    placeholder: String,
+    codehilite_css_url: String,
+    initial_blocks: Array,
+    initial_tail: String,
+  },
+  data() {
+    return {
+      blocks: [...this.initial_blocks],
+      tail: this.initial_tail,
+    };
+  },
+  async mounted() {
+    await this.$nextTick(); // NOTE: wait for window.path_prefix to be set
+    await loadResource(window.path_prefix + this.codehilite_css_url);
+  },
+  methods: {
+    append(delta) {
+      this.tail += delta;
+    },
+    freeze(html, tail) {
+      this.blocks.push(html);
+      this.tail = tail;
+    },
+  },
+};
@@ -0,0 +1,98 @@
+"""
+Streaming markdown element for the chat application.
+Sends streamed text to the browser as deltas instead of full content.
+"""
+import re
+from typing import Optional, Tuple
+
+from fastapi.responses import PlainTextResponse
+from nicegui import ui, app
+from nicegui.elements.markdown import CODEHILITE_CSS_URL, prepare_content
+from pygments.formatters import HtmlFormatter
+
+MARKDOWN_EXTRAS = 'fenced-code-blocks tables'
+FENCE_PATTERN = re.compile(r'^ {0,3}(```|~~~)')
+# Lines that may continue the previous block even after a blank line
+CONTINUATION_PATTERN = re.compile(r'^([ \t>]|[-*+][ \t]|\d+[.)][ \t])')
+
+
+def split_finished_blocks(text: str) -> Tuple[str, str]:
+    """Split text into finished markdown blocks and the unfinished tail.
+
+    A block is finished once a blank line outside a code fence is followed by
+    a complete line that cannot continue it (no indentation, list item or quote).
+    """
+    boundary = 0
+    position = 0
+    in_fence = False
+    previous_blank = False
+    for line in text.splitlines(keepends=True):
+        if not line.endswith('\n'):
+            break
+        if FENCE_PATTERN.match(line):
+            if not in_fence and previous_blank and position:
+                boundary = position
+            in_fence = not in_fence
+        elif not in_fence and previous_blank and line.strip() and not CONTINUATION_PATTERN.match(line):
+            boundary = position
+        previous_blank = not in_fence and not line.strip()
+        position += len(line)
+    return text[:boundary], text[boundary:]
+
+
+class StreamingMarkdown(ui.element, component='streaming_markdown.js'):
+    """Markdown element that receives streamed text as deltas.
+
+    Finished blocks are rendered to HTML once and frozen in the browser; only
+    the trailing unfinished block travels as raw text deltas. The bytes sent
+    per response therefore grow linearly with its length.
+    """
+
+    def __init__(self, content: str = '', *, placeholder: str = '', html: Optional[str] = None) -> None:
+        super().__init__()
+        self._classes.append('nicegui-markdown')
+        self._props['placeholder'] = placeholder
+        self._props['codehilite_css_url'] = CODEHILITE_CSS_URL
+        _register_codehilite_css()
+
+        if html is None:
+            finished, self._tail = split_finished_blocks(content)
+            html = render_markdown(finished) if finished else ''
+        else:  # A finished message that has been rendered before
+            self._tail = ''
+        self._props['initial_blocks'] = [html] if html else []
+        self._props['initial_tail'] = self._tail
+
+    def append(self, delta: str) -> None:
+        """Append streamed text, freezing every block that has been finished."""
+        if not delta:
+            return
+        finished, tail = split_finished_blocks(self._tail + delta)
+        self._tail = tail
+        if finished:
+            self.run_method('freeze', render_markdown(finished), tail)
+        else:
+            self.run_method('append', delta)
+
+    def set_placeholder(self, placeholder: str) -> None:
+        """Update the text shown while nothing has been streamed yet."""
+        if self._props['placeholder'] == placeholder:
+            return
+        self._props['placeholder'] = placeholder
+        self.update()
+
+
+def render_markdown(content: str) -> str:
+    """Render a finished markdown block to HTML."""
+    return prepare_content(content, extras=MARKDOWN_EXTRAS)
+
+
+def _register_codehilite_css() -> None:
+    """Serve the code highlighting styles even if no ui.markdown was created yet."""
+    if any(getattr(route, 'path', None) == CODEHILITE_CSS_URL for route in app.routes):
+        return
+    app.get(CODEHILITE_CSS_URL)(lambda: PlainTextResponse(
+        HtmlFormatter(nobackground=True).get_style_defs('.codehilite') +
+        HtmlFormatter(nobackground=True, style='github-dark').get_style_defs('.body--dark .codehilite'),
+        media_type='text/css',
+    ))
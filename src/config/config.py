@@ -1,6 +1,7 @@
 """
 Configuration and constants for the chat application.
 """
+import os
 
 # Application settings
 APP_TITLE = "QV Simple Ollama UI"
@@ -9,6 +10,8 @@ APP_PORT = 8080
 # Chat settings
 USER_ID = "user"
 AI_ID = "assistant"
+SYSTEM_ID = "system"
+STATUS_ID = "status"  # Errors and stopped generations; shown like answers, never sent to the model
 
 # Message format: (user_id, text, timestamp)
 MESSAGE_FORMAT = "({user_id}, {text}, {timestamp})"
@@ -18,12 +21,113 @@ MAX_WIDTH = "3xl"  # Tailwind max-width class
 MARGIN_Y = "my-6"  # Vertical margin class
 MARGIN_X = "mx-auto"  # Horizontal margin class
 
+# Static file settings
+STATIC_URL = "/static"  # Path the files in src/static are served at
+STATIC_MAX_CACHE_AGE = 365 * 24 * 3600  # Seconds browsers keep static files; their URLs change with their content
+
 # Model dialog settings
 MODEL_DIALOG_MIN_WIDTH = "500px"
 MODEL_DIALOG_MAX_WIDTH = "90vw"
 
+# Model residency settings
+DEFAULT_KEEP_ALIVE = "10m"  # How long Ollama keeps a model loaded after a request
+MODEL_KEEP_ALIVE = {}  # Per-model overrides, e.g. {"llama3:70b": "2m"}
+MODEL_IDLE_UNLOAD_SECONDS = 300  # Unload models no session has used for this long (below DEFAULT_KEEP_ALIVE)
+MODEL_MEMORY_LIMIT_BYTES = None  # Unload idle models above this total size (None: no limit)
+MODEL_RESIDENCY_CHECK_INTERVAL = 60  # Seconds between residency checks
+
+# Ollama connection pool settings (shared by all sessions)
+OLLAMA_MAX_CONNECTIONS = 32  # Open connections per Ollama host
+OLLAMA_MAX_KEEPALIVE_CONNECTIONS = 16  # Idle connections kept for reuse
+OLLAMA_KEEPALIVE_EXPIRY = 60.0  # Seconds an idle connection is kept
+
+# Ollama host settings
+# Base URLs of the Ollama hosts, e.g. "http://gpu1:11434,http://gpu2:11434" (empty: the default OLLAMA_HOST)
+OLLAMA_HOSTS = [host.strip() for host in os.environ.get("OLLAMA_HOSTS", "").split(",") if host.strip()]
+HOST_CHECK_INTERVAL = 10.0  # Seconds between health checks of the hosts
+HOST_CHECK_TIMEOUT = 5.0  # Seconds before a host that does not answer is taken out of rotation
+MODEL_DELETE_TIMEOUT = 30.0  # Seconds to wait for a host to delete a model
+
+# Model catalog settings
+MODEL_CATALOG_TTL = 30.0  # Seconds before the cached model list is fetched again
+
+# Model pull settings
+PULL_MAX_CONCURRENT = 2  # Downloads running at once; further pulls wait in line
+PULL_UPDATE_RATE = 4  # Progress updates per second sent to the pages
+
+# Conversation storage settings
+CONVERSATION_DB_PATH = "data/conversations.sqlite3"  # SQLite database of all conversations
+CONVERSATION_FLUSH_INTERVAL = 0.5  # Seconds between batched writes
+CONVERSATION_CHECKPOINT_INTERVAL = 2.0  # Seconds between saves of a response that is still streaming
+CONVERSATION_LIST_LIMIT = 50  # Conversations shown in the sidebar
+CONVERSATION_TITLE_LENGTH = 60  # Characters of the first message used as title
+
+# Browser storage settings
+STORAGE_SECRET = os.environ.get("STORAGE_SECRET")  # Signs the browser id cookie (default: generated once and kept in STORAGE_SECRET_PATH)
+STORAGE_SECRET_PATH = "data/storage_secret"
+
+# Session settings
+SESSION_IDLE_TIMEOUT = 1800  # Seconds without activity before a session's caches are released
+SESSION_CHECK_INTERVAL = 60  # Seconds between session checks
+SESSION_STATS_REFRESH = 2.0  # Seconds between updates of the stats page
+
+# Chat history settings
+CHAT_WINDOW_SIZE = 50  # Newest messages mounted in the page
+CHAT_PAGE_SIZE = 25  # Older messages loaded at once when scrolling up
+CHAT_HISTORY_MAX_BYTES = 4 * 1024 * 1024  # Loaded messages per session before older ones are spilled to disk
+
 # Streaming settings
-STREAMING_DELAY = 0.01  # Delay between streaming chunks in seconds
+STREAMING_FRAME_RATE = 25  # UI updates per second while a response is streaming
+
+# Scheduler settings (shared by all sessions of the server process)
+SCHEDULER_MAX_CONCURRENT_PER_MODEL = 2  # Generations running at once per model
+SCHEDULER_MODEL_CONCURRENCY = {}  # Per-model overrides, e.g. {"llama3:70b": 1}
+SCHEDULER_MAX_QUEUE_DEPTH = 20  # Waiting requests per model before new ones are rejected
+SCHEDULER_INITIAL_DURATION_ESTIMATE = 10.0  # Seconds per generation until real durations are known
+
+# Model comparison settings
+COMPARE_MAX_MODELS = 4  # Models a prompt can be compared across
+COMPARE_MAX_CONCURRENT = 2  # Models of one comparison generating at once; the others wait
+
+# Context window settings
+CONTEXT_TOKEN_BUDGET = 3072  # Prompt tokens per request; keep below the model's num_ctx minus room for the reply
+CONTEXT_EVICT_TARGET = 0.75  # Fraction of the budget the window is trimmed to once it is exceeded
+CONTEXT_CHARS_PER_TOKEN = 4  # Characters per token used to estimate message sizes
+CONTEXT_SUMMARY_ENABLED = False  # Summarize evicted turns instead of dropping them
+CONTEXT_SUMMARY_PROMPT = ("Summarize the following conversation in a few sentences. "
+                          "Keep names, facts and decisions that later questions may refer to.")
+
+# Response cache settings
+RESPONSE_CACHE_ENABLED = False  # Answer identical requests from the cache instead of the model
+RESPONSE_CACHE_MAX_ENTRIES = 500  # Responses kept in memory
+RESPONSE_CACHE_TTL = 24 * 3600  # Seconds before a cached response expires
+RESPONSE_CACHE_PATH = "data/response_cache.sqlite3"  # Disk tier that survives restarts (None: memory only)
+RESPONSE_CACHE_DISK_MAX_ENTRIES = 10000  # Responses kept on disk
+
+# Document retrieval settings
+DOCUMENT_EMBEDDING_MODEL = "nomic-embed-text"  # Ollama model that embeds document chunks and messages
+DOCUMENT_INDEX_PATH = "data/documents"  # Directory of the vector index, one subdirectory per embedding model
+DOCUMENT_CHUNK_CHARS = 1500  # Characters per chunk
+DOCUMENT_CHUNK_OVERLAP = 200  # Characters repeated at the start of the next chunk
+DOCUMENT_EMBED_BATCH_SIZE = 32  # Chunks embedded per request
+DOCUMENT_TOP_K = 4  # Most relevant chunks added to each prompt
+DOCUMENT_MAX_UPLOAD_BYTES = 20 * 1024 * 1024  # Largest file that can be attached
+DOCUMENT_FILE_TYPES = ".txt,.md,.markdown,.rst,.csv,.json,.html,.xml,.py,.log"  # Text files that can be attached
+DOCUMENT_CONTEXT_PROMPT = ("Use the following excerpts from the user's documents to answer "
+                           "if they are relevant to the question.")
+
+# Metrics settings (exposed at /metrics)
+METRICS_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)  # Seconds
+METRICS_THROUGHPUT_BUCKETS = (1, 5, 10, 20, 30, 50, 75, 100, 150, 200)  # Tokens per second
+
+# Chat status messages
+THINKING_MSG = "Thinking..."
+GENERATION_STOPPED_MSG = "Generation stopped."
+QUEUE_POSITION_MSG = "Waiting in queue: position {position}, about {wait:.0f}s"
+QUEUE_FULL_MSG = "The server is busy. Please try again in a moment."
+RESPONSE_STATS_MSG = "{tokens} tokens, {tokens_per_second:.1f} tok/s, first token after {time_to_first_token:.2f}s"
+COMPARE_WAITING_MSG = "Waiting for another model to finish..."
+COMPARE_STATS_MSG = "First token {time_to_first_token:.2f}s · {tokens_per_second:.1f} tok/s · {duration:.1f}s total ({tokens} tokens)"
 
 # Error messages
 NO_MODELS_FOUND_MSG = "No models found. Please install models using Ollama."
@@ -0,0 +1,184 @@
+"""
+Headless batch runs for the chat application.
+Runs files of prompts through the models without the UI.
+"""
+import asyncio
+import json
+import math
+import os
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple
+
+from src.services.models import ModelManager, SYSTEM_MESSAGE
+
+BatchKey = Tuple[str, str]  # (prompt id, model name)
+
+
+def read_prompts(path: str) -> Iterator[Dict]:
+    """Read prompts from a JSONL file, one {"prompt": ...} object per line.
+
+    Optional fields are "id" (default: the line number), "model" (default:
+    the models of the run) and "system" (default: the app's system message).
+    """
+    with open(path, encoding='utf-8') as file:
+        for number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if not isinstance(item, dict) or not isinstance(item.get('prompt'), str):
+                raise ValueError(f"{path}:{number}: expected an object with a \"prompt\" string")
+            item['id'] = str(item.get('id', number))
+            yield item
+
+
+def read_completed(path: str) -> Set[BatchKey]:
+    """Prompt and model pairs that already have a successful result in an output file."""
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # A line cut off by an interruption
+            if result.get('error') is None:
+                completed.add((result['id'], result['model']))
+    return completed
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class _ModelStats:
+    """Measurements of the prompts run against one model."""
+
+    def __init__(self):
+        self.durations: List[float] = []
+        self.times_to_first_token: List[float] = []
+        self.tokens = 0
+        self.errors = 0
+        self.first_started: Optional[float] = None
+        self.last_finished: Optional[float] = None
+
+    def summary(self) -> Dict:
+        """Throughput and latency percentiles."""
+        elapsed = (self.last_finished or 0) - (self.first_started or 0)
+
+        def latencies(values: List[float]) -> Dict[str, Optional[float]]:
+            return {f'p{int(fraction * 100)}': _round(percentile(values, fraction)) for fraction in (0.5, 0.9, 0.99)}
+
+        return {
+            'completed': len(self.durations),
+            'errors': self.errors,
+            'requests_per_second': _round(len(self.durations) / elapsed) if elapsed > 0 else None,
+            'tokens_per_second': _round(self.tokens / elapsed) if elapsed > 0 else None,
+            'latency': latencies(self.durations),
+            'time_to_first_token': latencies(self.times_to_first_token),
+        }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    """Round a measurement for the report."""
+    return None if value is None else round(value, 3)
+
+
+class BatchRunner:
+    """Runs prompts against models with at most `concurrency` requests in flight.
+
+    Every prompt goes through its own ModelManager, so requests use the same
+    host routing, context window and metrics as the chat sessions. Results
+    are appended to the output file as soon as they finish; prompt and model
+    pairs that already succeeded in that file are skipped, so an interrupted
+    run continues where it stopped.
+    """
+
+    def __init__(self, models: List[str], output_path: str, concurrency: int = 4):
+        self.models = models
+        self.output_path = output_path
+        self.concurrency = concurrency
+        self.stats: Dict[str, _ModelStats] = {}
+        self.skipped = 0
+
+    async def run(self, prompts: Iterable[Dict]) -> Dict:
+        """Run all prompts and return the report."""
+        completed = read_completed(self.output_path)
+        jobs: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        started = time.monotonic()
+        with open(self.output_path, 'a', encoding='utf-8') as output:
+            workers = [asyncio.create_task(self._work(jobs, output)) for _ in range(self.concurrency)]
+            try:
+                for item in prompts:
+                    for model_name in ([item['model']] if item.get('model') else self.models):
+                        if (item['id'], model_name) in completed:
+                            self.skipped += 1
+                            continue
+                        await jobs.put((item, model_name))
+                for _ in workers:
+                    await jobs.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                for worker in workers:
+                    worker.cancel()
+        return self.report(time.monotonic() - started)
+
+    def report(self, elapsed: float) -> Dict:
+        """Summary of the run per model."""
+        return {
+            'elapsed_seconds': _round(elapsed),
+            'skipped': self.skipped,
+            'models': {model_name: stats.summary() for model_name, stats in self.stats.items()},
+        }
+
+    async def _work(self, jobs: asyncio.Queue, output: TextIO) -> None:
+        """Run jobs from the queue until the end marker arrives."""
+        while True:
+            job = await jobs.get()
+            if job is None:
+                return
+            item, model_name = job
+            result = await self._run_prompt(item, model_name)
+            output.write(json.dumps(result, ensure_ascii=False) + '\n')
+            output.flush()
+
+    async def _run_prompt(self, item: Dict, model_name: str) -> Dict:
+        """Send a single prompt and measure the response."""
+        stats = self.stats.setdefault(model_name, _ModelStats())
+        manager = ModelManager(model_name, item.get('system') or SYSTEM_MESSAGE)
+        started = time.monotonic()
+        if stats.first_started is None:
+            stats.first_started = started
+        parts = []
+        error = None
+        try:
+            async for chunk in manager.stream_chat(item['prompt']):
+                parts.append(chunk)
+        except Exception as e:
+            error = str(e)
+        duration = time.monotonic() - started
+        stats.last_finished = time.monotonic()
+
+        response_stats = manager.last_response_stats or {}
+        if error is None:
+            stats.durations.append(duration)
+            stats.tokens += response_stats.get('tokens', 0)
+            if 'time_to_first_token' in response_stats:
+                stats.times_to_first_token.append(response_stats['time_to_first_token'])
+        else:
+            stats.errors += 1
+        return {
+            'id': item['id'],
+            'model': model_name,
+            'host': manager.host,
+            'response': ''.join(parts),
+            'error': error,
+            'duration': _round(duration),
+            'time_to_first_token': _round(response_stats.get('time_to_first_token')),
+            'tokens': response_stats.get('tokens'),
+            'tokens_per_second': _round(response_stats.get('tokens_per_second')),
+        }
@@ -0,0 +1,104 @@
+"""
+Model catalog cache for the chat application.
+Keeps the list of installed Ollama models in memory for all sessions.
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from src.config.config import MODEL_CATALOG_TTL
+from src.services.hosts import host_pool
+from src.services.metrics import CATALOG_FETCH_DURATION
+
+
+class ModelCatalog:
+    """Process-wide cache of the models installed on the Ollama hosts.
+
+    Reads are served from memory. The list is fetched with the async client,
+    so a slow daemon never blocks the event loop, and concurrent refreshes
+    share a single request. Models installed on several hosts are listed
+    once, with the names of their hosts. When the periodic host check
+    finds other models than the cached ones, the cache takes them over,
+    so the catalog never lags behind the host pool.
+    """
+
+    def __init__(self, ttl: float = MODEL_CATALOG_TTL):
+        self.ttl = ttl
+        self.models: List[Dict] = []
+        self.fetched_at: Optional[float] = None
+        self._version = 0
+        self._models_version = host_pool.models_version
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._refresher: Optional[asyncio.Task] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the catalog has been fetched at least once."""
+        return self.fetched_at is not None
+
+    @property
+    def is_stale(self) -> bool:
+        """Whether the cached list is older than the TTL (or was invalidated)."""
+        return self.fetched_at is None or time.monotonic() - self.fetched_at > self.ttl
+
+    def get_models(self) -> List[Dict]:
+        """Get the cached models, refreshing them in the background when stale."""
+        if self.is_stale:
+            self.refresh_in_background()
+        elif self._models_version != host_pool.models_version:
+            self._take_host_models()
+        return self.models
+
+    async def refresh(self) -> List[Dict]:
+        """Fetch the models from Ollama now and return them."""
+        self.refresh_in_background()
+        await asyncio.shield(self._refresh_task)
+        return self.models
+
+    def refresh_in_background(self) -> None:
+        """Start a fetch unless one is already running."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.get_running_loop().create_task(self._fetch())
+
+    def invalidate(self) -> None:
+        """Mark the cache as outdated, e.g. after a model was pulled or deleted."""
+        self.fetched_at = None
+        self._version += 1
+        self._refresh_task = None  # A fetch that is still running may predate the change
+
+    def start(self) -> None:
+        """Start refreshing the catalog periodically (call once the event loop runs)."""
+        if self._refresher is None:
+            self._refresher = asyncio.get_running_loop().create_task(self._refresh_periodically())
+
+    async def _refresh_periodically(self) -> None:
+        """Keep the cache warm so that readers rarely see a stale list."""
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.ttl)
+
+    async def _fetch(self) -> None:
+        """Fetch the model lists of all hosts."""
+        version = self._version
+        started = time.monotonic()
+        try:
+            await host_pool.refresh()
+            if not any(host['healthy'] for host in host_pool.get_stats()):
+                raise ConnectionError('No Ollama host is reachable')
+            CATALOG_FETCH_DURATION.observe(time.monotonic() - started, 'success')
+            if version != self._version:
+                return
+            self._take_host_models()
+        except Exception as e:
+            CATALOG_FETCH_DURATION.observe(time.monotonic() - started, 'error')
+            print(f"Error fetching models: {str(e)}")
+
+
+    def _take_host_models(self) -> None:
+        """Cache the models the host pool has seen at its last check."""
+        self.models = host_pool.get_models()
+        self.fetched_at = time.monotonic()
+        self._models_version = host_pool.models_version
+
+
+model_catalog = ModelCatalog()
@@ -0,0 +1,52 @@
+"""
+Shared Ollama clients for the chat application.
+All sessions reuse the same HTTP connections instead of opening their own.
+"""
+from typing import TYPE_CHECKING, Dict, Optional
+
+import httpx
+
+if TYPE_CHECKING:
+    import ollama
+
+from src.config.config import (
+    OLLAMA_MAX_CONNECTIONS, OLLAMA_MAX_KEEPALIVE_CONNECTIONS, OLLAMA_KEEPALIVE_EXPIRY
+)
+
+
+class OllamaClientPool:
+    """Process-wide Ollama clients with keep-alive connection pooling.
+
+    There is one async client per host. Each keeps at most
+    OLLAMA_MAX_CONNECTIONS connections open; further requests wait for a free
+    connection instead of opening new sockets. Conversation state is not
+    kept here but in the per-session ModelManager. The ollama package is
+    only imported when the first client is created, which keeps it out of
+    the application's startup.
+    """
+
+    def __init__(self, max_connections: int = OLLAMA_MAX_CONNECTIONS,
+                 max_keepalive_connections: int = OLLAMA_MAX_KEEPALIVE_CONNECTIONS,
+                 keepalive_expiry: float = OLLAMA_KEEPALIVE_EXPIRY):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self._async_clients: Dict[Optional[str], 'ollama.AsyncClient'] = {}
+
+    def get_async_client(self, host: Optional[str] = None) -> 'ollama.AsyncClient':
+        """Get the shared async client for a host (default: OLLAMA_HOST)."""
+        if host not in self._async_clients:
+            import ollama
+            self._async_clients[host] = ollama.AsyncClient(host=host, limits=self.limits)
+        return self._async_clients[host]
+
+    async def close(self) -> None:
+        """Close all pooled connections."""
+        for async_client in self._async_clients.values():
+            await async_client._client.aclose()
+        self._async_clients.clear()
+
+
+client_pool = OllamaClientPool()
@@ -0,0 +1,164 @@
+"""
+Context window management for the chat application.
+Keeps the prompt of long conversations within a token budget.
+"""
+import asyncio
+import math
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from src.config.config import (
+    USER_ID, SYSTEM_ID, CONTEXT_TOKEN_BUDGET, CONTEXT_EVICT_TARGET, CONTEXT_CHARS_PER_TOKEN,
+    CONTEXT_SUMMARY_ENABLED, CONTEXT_SUMMARY_PROMPT
+)
+from src.services.client_pool import client_pool
+from src.services.hosts import host_pool
+
+if TYPE_CHECKING:
+    from qv_ollama_sdk import Conversation
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens of a text without running a tokenizer."""
+    return max(1, math.ceil(len(text) / CONTEXT_CHARS_PER_TOKEN))
+
+
+class ContextWindow:
+    """Sliding, token-budgeted window over a conversation.
+
+    Every message is counted once when it first appears. The window always
+    keeps the system messages and the newest turns. When it exceeds the
+    budget, whole turns are evicted until it is back at CONTEXT_EVICT_TARGET
+    of the budget; this slack keeps the prompt prefix stable for several
+    turns, so Ollama can reuse its prompt cache. Evicted turns can be
+    folded into a rolling summary that is generated in the background.
+    """
+
+    def __init__(self, budget: int = CONTEXT_TOKEN_BUDGET, summarize: bool = CONTEXT_SUMMARY_ENABLED):
+        self.budget = budget
+        self.summarize = summarize
+        self._reset(None)
+
+    def _reset(self, conversation_id) -> None:
+        """Forget all counts, e.g. when a new conversation starts."""
+        self.summary: Optional[str] = None
+        self._summary_tokens = 0
+        self._summarized_until = 0
+        self._summary_task: Optional[asyncio.Task] = None
+        self._conversation_id = conversation_id
+        self._counts: List[int] = []
+        self._system_tokens = 0
+        self._window_start = 0
+        self._window_tokens = 0
+
+    @property
+    def total_tokens(self) -> int:
+        """Estimated size of the prompt built from the current window."""
+        return self._system_tokens + self._summary_tokens + self._window_tokens
+
+    def build_messages(self, conversation: 'Conversation') -> List[Dict[str, str]]:
+        """Get the message history to send, trimmed to the token budget."""
+        self._count_new_messages(conversation)
+        self._evict(conversation)
+
+        messages = conversation.messages
+        history = [message.to_dict() for message in messages if message.role == SYSTEM_ID]
+        if self.summary:
+            history.append({'role': SYSTEM_ID,
+                            'content': f"Summary of the earlier conversation:\n{self.summary}"})
+        history.extend(message.to_dict() for message in messages[self._window_start:]
+                       if message.role != SYSTEM_ID)
+        return history
+
+    def update_summary(self, conversation: 'Conversation', keep_alive=None) -> None:
+        """Fold evicted turns into the rolling summary in the background."""
+        if not self.summarize or self._summarized_until >= self._window_start:
+            return
+        if self._summary_task is not None and not self._summary_task.done():
+            return
+        self._summary_task = asyncio.get_running_loop().create_task(
+            self._summarize(conversation, self._window_start, keep_alive)
+        )
+
+    def discard(self, conversation: 'Conversation', message) -> None:
+        """Remove the newest message again, e.g. a prompt that got no answer."""
+        messages = conversation.messages
+        if not messages or messages[-1] is not message:
+            return
+        messages.pop()
+        if len(self._counts) > len(messages):
+            tokens = self._counts.pop()
+            if message.role == SYSTEM_ID:
+                self._system_tokens -= tokens
+            else:
+                self._window_tokens -= tokens
+            self._window_start = min(self._window_start, len(messages))
+
+    def compact(self, conversation: 'Conversation') -> None:
+        """Remove evicted turns from the conversation to free their memory.
+
+        Turns that still have to be folded into the summary are kept.
+        """
+        self._count_new_messages(conversation)
+        if self.summarize and self._summarized_until < self._window_start:
+            return
+        if self._summary_task is not None and not self._summary_task.done():
+            return
+        messages = conversation.messages
+        kept = [i for i in range(len(messages))
+                if i >= self._window_start or messages[i].role == SYSTEM_ID]
+        removed = len(messages) - len(kept)
+        if not removed:
+            return
+        conversation.messages[:] = [messages[i] for i in kept]
+        self._counts = [self._counts[i] for i in kept]
+        self._window_start -= removed
+        self._summarized_until = self._window_start
+
+    def _count_new_messages(self, conversation: 'Conversation') -> None:
+        """Count the tokens of messages added since the last call."""
+        if conversation.id != self._conversation_id or len(conversation.messages) < len(self._counts):
+            self._reset(conversation.id)
+        for message in conversation.messages[len(self._counts):]:
+            tokens = estimate_tokens(message.content)
+            self._counts.append(tokens)
+            if message.role == SYSTEM_ID:
+                self._system_tokens += tokens
+            else:
+                self._window_tokens += tokens
+
+    def _evict(self, conversation: 'Conversation') -> None:
+        """Drop the oldest turns once the window exceeds the budget."""
+        if self.total_tokens <= self.budget:
+            return
+        messages = conversation.messages
+        last = len(messages) - 1
+        target = self.budget * CONTEXT_EVICT_TARGET
+        while self._window_start < last and (
+            self.total_tokens > target or messages[self._window_start].role != USER_ID
+        ):
+            if messages[self._window_start].role != SYSTEM_ID:
+                self._window_tokens -= self._counts[self._window_start]
+            self._window_start += 1
+
+    async def _summarize(self, conversation: 'Conversation', until: int, keep_alive) -> None:
+        """Generate a new summary from the previous one and the newly evicted turns."""
+        evicted = [message for message in conversation.messages[self._summarized_until:until]
+                   if message.role != SYSTEM_ID]
+        transcript = '\n'.join(f"{message.role.value}: {message.content}" for message in evicted)
+        if self.summary:
+            transcript = f"Previous summary:\n{self.summary}\n\n{transcript}"
+        try:
+            response = await client_pool.get_async_client(host_pool.select(conversation.model_name)).chat(
+                model=conversation.model_name,
+                messages=[{'role': 'system', 'content': CONTEXT_SUMMARY_PROMPT},
+                          {'role': 'user', 'content': transcript}],
+                keep_alive=keep_alive
+            )
+        except Exception as e:
+            print(f"Error summarizing conversation: {str(e)}")
+            return
+        if conversation.id != self._conversation_id:
+            return
+        self.summary = response['message']['content']
+        self._summary_tokens = estimate_tokens(self.summary)
+        self._summarized_until = until
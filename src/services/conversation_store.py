@@ -0,0 +1,233 @@
+"""
+Conversation persistence for the chat application.
+Stores conversations and their messages in SQLite.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from src.config.config import CONVERSATION_DB_PATH, CONVERSATION_FLUSH_INTERVAL, CONVERSATION_TITLE_LENGTH
+
+# (seq, role, content, created_at as epoch seconds)
+StoredMessage = Tuple[int, str, str, int]
+
+CONVERSATION_COLUMNS = ('id', 'title', 'model_name', 'created_at', 'updated_at', 'message_count')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    model_name TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    message_count INTEGER NOT NULL,
+    owner TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS messages (
+    conversation_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (conversation_id, seq)
+) WITHOUT ROWID;
+"""
+# Databases created before conversations had an owner
+MIGRATIONS = (
+    ('owner', "ALTER TABLE conversations ADD COLUMN owner TEXT NOT NULL DEFAULT ''"),
+)
+INDEXES = "CREATE INDEX IF NOT EXISTS conversations_owner ON conversations (owner, updated_at);"
+
+
+class ConversationStore:
+    """Process-wide SQLite store of all conversations.
+
+    Every conversation belongs to an owner (the id of the browser that
+    created it) and is only listed and opened for that owner. Messages are
+    only ever appended; the store numbers them itself, so several tabs
+    writing to the same conversation cannot overwrite each other's
+    messages. Writes are queued in memory and
+    committed in batches every CONVERSATION_FLUSH_INTERVAL seconds by a
+    background task, so neither sending nor streaming waits for the disk.
+    The database runs in WAL mode, so reads never block on the writer.
+    Conversation metadata is kept in its own table, so listing
+    conversations does not touch message bodies.
+    """
+
+    def __init__(self, path: str = CONVERSATION_DB_PATH, flush_interval: float = CONVERSATION_FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._pending: List[Tuple[str, tuple]] = []
+        self._writer: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._write_db: Optional[sqlite3.Connection] = None
+        self._read_db: Optional[sqlite3.Connection] = None
+        self._read_lock = threading.Lock()
+        self._next_seq: Dict[str, int] = {}  # Seq of the next message of the conversations opened so far
+
+    def create_conversation(self, owner: str, model_name: str) -> str:
+        """Create a new, empty conversation and return its id."""
+        conversation_id = uuid.uuid4().hex
+        now = time.time()
+        self._pending.append((
+            'INSERT INTO conversations (id, title, model_name, created_at, updated_at, message_count, owner) '
+            'VALUES (?, ?, ?, ?, ?, 0, ?)',
+            (conversation_id, '', model_name, now, now, owner)
+        ))
+        self._next_seq[conversation_id] = 0
+        return conversation_id
+
+    def append_message(self, conversation_id: str, role: str, content: str, created_at: int) -> int:
+        """Queue a message for writing and return its seq; the first message also sets the title.
+
+        The conversation must have been created or fetched with
+        get_conversation before.
+        """
+        seq = self._next_seq[conversation_id]
+        self._next_seq[conversation_id] = seq + 1
+        self._pending.append((
+            # Messages of a conversation that was deleted meanwhile (e.g. in another tab) are dropped
+            'INSERT INTO messages SELECT ?, ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM conversations WHERE id = ?)',
+            (conversation_id, seq, role, content, created_at, conversation_id)
+        ))
+        self._pending.append((
+            "UPDATE conversations SET updated_at = ?, message_count = ?, "
+            "title = CASE WHEN title = '' THEN ? ELSE title END WHERE id = ?",
+            (created_at, seq + 1, ' '.join(content.split())[:CONVERSATION_TITLE_LENGTH], conversation_id)
+        ))
+        return seq
+
+    def update_message(self, conversation_id: str, seq: int, role: str, content: str) -> None:
+        """Queue a change of a message, e.g. of a response that was saved while streaming."""
+        self._pending.append((
+            'UPDATE messages SET role = ?, content = ? WHERE conversation_id = ? AND seq = ?',
+            (role, content, conversation_id, seq)
+        ))
+
+    def set_model(self, conversation_id: str, model_name: str) -> None:
+        """Queue a change of the model a conversation continues with."""
+        self._pending.append((
+            'UPDATE conversations SET model_name = ? WHERE id = ?', (model_name, conversation_id)
+        ))
+
+    def delete_conversation(self, conversation_id: str, owner: str) -> None:
+        """Queue the deletion of a conversation of an owner and its messages."""
+        self._pending.append((
+            'DELETE FROM messages WHERE conversation_id IN (SELECT id FROM conversations WHERE id = ? AND owner = ?)',
+            (conversation_id, owner)
+        ))
+        self._pending.append(('DELETE FROM conversations WHERE id = ? AND owner = ?', (conversation_id, owner)))
+
+    async def list_conversations(self, owner: str, limit: int) -> List[Dict]:
+        """Metadata of the most recently updated conversations of an owner."""
+        await self.flush()
+        rows = await asyncio.to_thread(
+            self._query,
+            f"SELECT {', '.join(CONVERSATION_COLUMNS)} FROM conversations WHERE owner = ? "
+            "ORDER BY updated_at DESC LIMIT ?",
+            (owner, limit)
+        )
+        return [dict(zip(CONVERSATION_COLUMNS, row)) for row in rows]
+
+    async def get_conversation(self, conversation_id: str, owner: str) -> Optional[Dict]:
+        """Metadata of a single conversation, if it belongs to the owner."""
+        await self.flush()
+        rows = await asyncio.to_thread(
+            self._query,
+            f"SELECT {', '.join(CONVERSATION_COLUMNS)} FROM conversations WHERE id = ? AND owner = ?",
+            (conversation_id, owner)
+        )
+        if not rows:
+            return None
+        conversation = dict(zip(CONVERSATION_COLUMNS, rows[0]))
+        # Only this process writes the database, so once known the counter stays ahead of it
+        self._next_seq.setdefault(conversation_id, conversation['message_count'])
+        return conversation
+
+    async def load_messages(self, conversation_id: str, before: Optional[int], limit: int) -> List[StoredMessage]:
+        """Load up to limit messages preceding the given seq (default: the newest), oldest first."""
+        await self.flush()
+        rows = await asyncio.to_thread(
+            self._query,
+            'SELECT seq, role, content, created_at FROM messages WHERE conversation_id = ? AND seq < ? '
+            'ORDER BY seq DESC LIMIT ?', (conversation_id, before if before is not None else 2 ** 62, limit)
+        )
+        return [(seq, role, content, int(created_at)) for seq, role, content, created_at in reversed(rows)]
+
+    async def flush(self) -> None:
+        """Commit all queued writes."""
+        async with self._flush_lock:  # Also waits for a batch that is being written right now
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+            await asyncio.to_thread(self._write, batch)
+
+    def start(self) -> None:
+        """Start the background writer (call once the event loop runs)."""
+        if self._writer is None:
+            self._writer = asyncio.get_running_loop().create_task(self._flush_periodically())
+
+    async def close(self) -> None:
+        """Write everything that is still queued and close the database."""
+        if self._writer is not None:
+            self._writer.cancel()
+            self._writer = None
+        await self.flush()
+        with self._read_lock:
+            for db in (self._write_db, self._read_db):
+                if db is not None:
+                    db.close()
+            self._write_db = self._read_db = None
+
+    async def _flush_periodically(self) -> None:
+        """Commit queued writes in batches."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection to the database, creating it if needed."""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        db.executescript(SCHEMA)
+        columns = {row[1] for row in db.execute('PRAGMA table_info(conversations)')}
+        for column, statement in MIGRATIONS:
+            if column not in columns:
+                db.execute(statement)
+        db.executescript(INDEXES)
+        return db
+
+    def _write(self, batch: List[Tuple[str, tuple]]) -> None:
+        """Execute a batch of writes in a single transaction (only called by flush)."""
+        try:
+            if self._write_db is None:
+                self._write_db = self._connect()
+            with self._write_db:
+                for statement, parameters in batch:
+                    try:
+                        self._write_db.execute(statement, parameters)
+                    except sqlite3.IntegrityError as e:
+                        # A message with this seq exists already; never overwrite it
+                        print(f"Error saving message: {str(e)}")
+        except Exception as e:
+            print(f"Error saving conversations: {str(e)}")
+
+    def _query(self, statement: str, parameters: tuple) -> List[tuple]:
+        """Run a read query on the reader connection."""
+        try:
+            with self._read_lock:
+                if self._read_db is None:
+                    self._read_db = self._connect()
+                return self._read_db.execute(statement, parameters).fetchall()
+        except Exception as e:
+            print(f"Error loading conversations: {str(e)}")
+            return []
+
+
+conversation_store = ConversationStore()
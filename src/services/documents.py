@@ -0,0 +1,335 @@
+"""
+Document retrieval for the chat application.
+Splits attached documents into chunks, embeds them with Ollama and finds the chunks relevant to a message.
+"""
+import asyncio
+import json
+import os
+import re
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional
+
+from src.config.config import (
+    DOCUMENT_EMBEDDING_MODEL, DOCUMENT_INDEX_PATH, DOCUMENT_CHUNK_CHARS, DOCUMENT_CHUNK_OVERLAP,
+    DOCUMENT_EMBED_BATCH_SIZE, DOCUMENT_TOP_K
+)
+from src.services.client_pool import client_pool
+from src.services.hosts import host_pool
+from src.services.metrics import metrics, EMBEDDING_DURATION, DOCUMENT_SEARCH_DURATION
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Row of the chunk table: owning document and position of the text in the text file
+CHUNK_FIELDS = [('document', '<i4'), ('offset', '<i8'), ('length', '<i4')]
+# Data files of the index; their names carry the generation once the files have been rewritten
+INDEX_FILE_PATTERN = re.compile(r'(vectors|chunks|texts)(\.\d+)?\.(f32|bin|txt)')
+# Preferred places to end a chunk, best first
+CHUNK_SEPARATORS = ('\n\n', '\n', '. ', ' ')
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def chunk_text(text: str, size: int = DOCUMENT_CHUNK_CHARS, overlap: int = DOCUMENT_CHUNK_OVERLAP) -> List[str]:
+    """Split a text into chunks of at most size characters.
+
+    Chunks end at a paragraph, line, sentence or word boundary in their
+    second half where possible; consecutive chunks share overlap characters.
+    """
+    text = text.strip()
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + size)
+        if end < len(text):
+            for separator in CHUNK_SEPARATORS:
+                cut = text.rfind(separator, start + size // 2, end)
+                if cut != -1:
+                    end = cut + len(separator)
+                    break
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        overlap_start = max(end - overlap, start + 1)
+        word_start = text.find(' ', overlap_start, end)
+        start = word_start + 1 if word_start != -1 else overlap_start
+    return chunks
+
+
+class DocumentIndex:
+    """Process-wide vector index of the attached documents.
+
+    Chunk vectors are normalized and appended to a float32 file that is
+    memory-mapped, so the index opens instantly at startup and only the
+    pages a search touches are read into memory. Chunk texts live in a
+    separate file and are read back only for the chunks a search returns.
+    Removing a document writes a new generation of the files next to the
+    current one; the manifest is switched over to it atomically, so an
+    interrupted rewrite leaves the previous generation intact.
+    A search scores every chunk of the selected documents with a single
+    matrix-vector product; the prompt always gets at most top_k chunks,
+    however large the corpus is. Each embedding model has its own index,
+    as their vectors cannot be compared. Every document belongs to the
+    browser that uploaded it and is only listed, searched and deleted for
+    that owner. numpy is only imported once the index is used.
+    """
+
+    def __init__(self, path: str = DOCUMENT_INDEX_PATH, model_name: str = DOCUMENT_EMBEDDING_MODEL,
+                 batch_size: int = DOCUMENT_EMBED_BATCH_SIZE, top_k: int = DOCUMENT_TOP_K):
+        self.model_name = model_name
+        self.directory = os.path.join(path, re.sub(r'[^\w.-]', '_', model_name))
+        self.batch_size = batch_size
+        self.top_k = top_k
+        self.documents: Dict[int, Dict] = {}
+        self.dimensions: Optional[int] = None
+        self.count = 0  # Chunks in the index
+        self.generation = 0  # Generation of the data files the manifest points to
+        self._next_id = 1
+        self._vectors: Optional['np.ndarray'] = None
+        self._chunks: Optional['np.ndarray'] = None
+        self._loaded = False
+        self._write_lock = asyncio.Lock()
+
+    def get_documents(self, owner: str) -> List[Dict]:
+        """The indexed documents of an owner, oldest first."""
+        self._ensure_loaded()
+        return sorted((document for document in self.documents.values() if document.get('owner') == owner),
+                      key=lambda document: document['id'])
+
+    async def add(self, owner: str, name: str, text: str, on_progress: Optional[ProgressCallback] = None) -> Dict:
+        """Chunk, embed and store a document; on_progress is called with the embedded and total chunks."""
+        import numpy as np
+
+        self._ensure_loaded()
+        chunks = chunk_text(text)
+        if not chunks:
+            raise ValueError('The document contains no text')
+        batches = []
+        for start in range(0, len(chunks), self.batch_size):
+            batches.append(await self._embed(chunks[start:start + self.batch_size], 'index'))
+            if on_progress is not None:
+                on_progress(min(start + self.batch_size, len(chunks)), len(chunks))
+        vectors = np.concatenate(batches)
+        async with self._write_lock:
+            if self.dimensions is not None and vectors.shape[1] != self.dimensions:
+                raise ValueError(f"{self.model_name} returned vectors of {vectors.shape[1]} dimensions, "
+                                 f"the index has {self.dimensions}")
+            document = {'id': self._next_id, 'owner': owner, 'name': name, 'chunks': len(chunks),
+                        'created_at': int(time.time())}
+            await asyncio.to_thread(self._append, document, chunks, vectors)
+        return document
+
+    async def remove(self, document_id: int, owner: str) -> None:
+        """Delete a document of an owner and its chunks from the index."""
+        self._ensure_loaded()
+        async with self._write_lock:
+            if self._belongs_to(document_id, owner):
+                await asyncio.to_thread(self._rewrite_without, document_id)
+
+    async def search(self, text: str, document_ids: Iterable[int], owner: str,
+                     top_k: Optional[int] = None) -> List[Dict]:
+        """The chunks of the given documents of an owner most similar to a text, best first."""
+        self._ensure_loaded()
+        document_ids = [document_id for document_id in document_ids if self._belongs_to(document_id, owner)]
+        if not document_ids or not self.count:
+            return []
+        started = time.monotonic()
+        query = (await self._embed([text], 'search'))[0]
+        async with self._write_lock:  # The files must not be rewritten while their chunks are read
+            results = await asyncio.to_thread(self._nearest, query, document_ids, top_k or self.top_k)
+        DOCUMENT_SEARCH_DURATION.observe(time.monotonic() - started)
+        return results
+
+    async def _embed(self, texts: List[str], purpose: str) -> 'np.ndarray':
+        """Embed texts on the least busy host and normalize the vectors to unit length."""
+        import numpy as np
+
+        host = host_pool.select(self.model_name)
+        started = time.monotonic()
+        with host_pool.track(host):
+            response = await client_pool.get_async_client(host).embed(model=self.model_name, input=texts)
+        EMBEDDING_DURATION.observe(time.monotonic() - started, purpose)
+        vectors = np.asarray(response['embeddings'], dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _nearest(self, query: 'np.ndarray', document_ids: List[int], top_k: int) -> List[Dict]:
+        """Score the chunks of the documents against the query vector (runs in a worker thread)."""
+        import numpy as np
+
+        vectors, chunks = self._vectors, self._chunks
+        scores = np.asarray(vectors @ query)  # Cosine similarity, as all vectors are normalized
+        scores[~np.isin(chunks['document'], document_ids)] = -np.inf
+        top_k = min(top_k, int(np.isfinite(scores).sum()))
+        if top_k <= 0:
+            return []
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        with open(self._data_file('texts.txt'), 'rb') as texts:
+            results = []
+            for row in best:
+                chunk = chunks[row]
+                texts.seek(int(chunk['offset']))
+                results.append({
+                    'document': self.documents[int(chunk['document'])]['name'],
+                    'text': texts.read(int(chunk['length'])).decode('utf-8'),
+                    'score': float(scores[row]),
+                })
+        return results
+
+    def _belongs_to(self, document_id: int, owner: str) -> bool:
+        """Whether a document is in the index and was uploaded by the owner."""
+        document = self.documents.get(document_id)
+        return document is not None and document.get('owner') == owner
+
+    def _file(self, name: str) -> str:
+        """Path of a file of the index."""
+        return os.path.join(self.directory, name)
+
+    def _data_file(self, name: str, generation: Optional[int] = None) -> str:
+        """Path of a data file of a generation (default: the current one; 0 has no number)."""
+        generation = self.generation if generation is None else generation
+        if generation:
+            stem, extension = os.path.splitext(name)
+            name = f'{stem}.{generation}{extension}'
+        return self._file(name)
+
+    def _ensure_loaded(self) -> None:
+        """Open the index files on first use."""
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self._file('manifest.json'), encoding='utf-8') as file:
+                manifest = json.load(file)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Error loading document index: {str(e)}")
+            return
+        self._next_id = manifest['next_id']
+        try:
+            self.documents = {document['id']: document for document in manifest['documents']}
+            self.dimensions = manifest['dimensions']
+            self.generation = manifest.get('generation', 0)
+            self._open(manifest['count'])
+        except Exception as e:
+            print(f"Error opening document index: {str(e)}")
+            self.documents = {}
+            self.dimensions = None
+            self._open(0)
+            return
+        self._remove_other_generations()
+
+    def _open(self, count: int) -> None:
+        """Map the first count chunks of the index files into memory.
+
+        Rows written after the last saved manifest (e.g. by an interrupted
+        write) are ignored.
+        """
+        import numpy as np
+
+        if not count:
+            self.count = 0
+            self._vectors = self._chunks = None
+            return
+        vectors = np.memmap(self._data_file('vectors.f32'), dtype=np.float32, mode='r', shape=(count, self.dimensions))
+        chunks = np.memmap(self._data_file('chunks.bin'), dtype=CHUNK_FIELDS, mode='r', shape=(count,))
+        self._vectors, self._chunks, self.count = vectors, chunks, count
+
+    def _append(self, document: Dict, chunks: List[str], vectors: 'np.ndarray') -> None:
+        """Append a document to the index files (runs in a worker thread)."""
+        import numpy as np
+
+        os.makedirs(self.directory, exist_ok=True)
+        table = np.zeros(len(chunks), dtype=CHUNK_FIELDS)
+        table['document'] = document['id']
+        with open(self._data_file('texts.txt'), 'ab') as texts:
+            texts.truncate(self._end_of_texts())
+            texts.seek(0, os.SEEK_END)
+            for row, chunk in enumerate(chunks):
+                data = chunk.encode('utf-8')
+                table[row] = (document['id'], texts.tell(), len(data))
+                texts.write(data)
+        for name, rows in (('vectors.f32', vectors), ('chunks.bin', table)):
+            with open(self._data_file(name), 'ab') as file:
+                file.truncate(self.count * rows[0].nbytes)
+                file.write(rows.tobytes())
+
+        self.documents[document['id']] = document
+        self.dimensions = vectors.shape[1]
+        self._next_id = document['id'] + 1
+        self._save_manifest(self.count + len(chunks))
+        self._open(self.count + len(chunks))
+
+    def _rewrite_without(self, document_id: int) -> None:
+        """Write the next generation of the index files without a document (runs in a worker thread).
+
+        The previous generation is only deleted once the manifest points to the new one.
+        """
+        import numpy as np
+
+        keep = np.flatnonzero(self._chunks['document'] != document_id)
+        vectors = np.array(self._vectors[keep]) if len(keep) else np.zeros((0, self.dimensions), np.float32)
+        table = np.array(self._chunks[keep]) if len(keep) else np.zeros(0, dtype=CHUNK_FIELDS)
+        previous, generation = self.generation, self.generation + 1
+        with open(self._data_file('texts.txt'), 'rb') as source, \
+                open(self._data_file('texts.txt', generation), 'wb') as target:
+            for row in range(len(table)):
+                source.seek(int(table[row]['offset']))
+                data = source.read(int(table[row]['length']))
+                table[row]['offset'] = target.tell()
+                target.write(data)
+        for name, rows in (('vectors.f32', vectors), ('chunks.bin', table)):
+            with open(self._data_file(name, generation), 'wb') as file:
+                file.write(rows.tobytes())
+
+        document = self.documents.pop(document_id)
+        self.generation = generation
+        try:
+            self._save_manifest(len(table))
+        except Exception:
+            self.documents[document_id] = document
+            self.generation = previous
+            raise
+        self._vectors = self._chunks = None
+        self._open(len(table))
+        self._remove_other_generations()
+
+    def _end_of_texts(self) -> int:
+        """Size of the text file covered by the saved chunks."""
+        if not self.count:
+            return 0
+        last = self._chunks[self.count - 1]
+        return int(last['offset']) + int(last['length'])
+
+    def _remove_other_generations(self) -> None:
+        """Delete data files the manifest does not point to, e.g. those left by an interrupted rewrite."""
+        current = {os.path.basename(self._data_file(name)) for name in ('vectors.f32', 'chunks.bin', 'texts.txt')}
+        for name in os.listdir(self.directory):
+            if INDEX_FILE_PATTERN.fullmatch(name) and name not in current:
+                try:
+                    os.remove(self._file(name))
+                except OSError as e:
+                    print(f"Error removing old document index file: {str(e)}")
+
+    def _save_manifest(self, count: int) -> None:
+        """Atomically record the documents and the number of valid rows."""
+        manifest = {
+            'model': self.model_name,
+            'dimensions': self.dimensions,
+            'count': count,
+            'generation': self.generation,
+            'next_id': self._next_id,
+            'documents': list(self.documents.values()),
+        }
+        with open(self._file('manifest.json.tmp'), 'w', encoding='utf-8') as file:
+            json.dump(manifest, file)
+        os.replace(self._file('manifest.json.tmp'), self._file('manifest.json'))
+
+
+document_index = DocumentIndex()
+
+metrics.gauge('qv_document_chunks', 'Chunks in the document index', lambda: {(): document_index.count})
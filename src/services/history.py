@@ -0,0 +1,139 @@
+"""
+Compact chat history for the chat application.
+Keeps the loaded part of a conversation in array-backed columns.
+"""
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.config.config import USER_ID, AI_ID, STATUS_ID, CHAT_HISTORY_MAX_BYTES
+
+# Roles are stored as one-byte codes; decoding always yields the same string objects
+ROLES = (USER_ID, AI_ID, STATUS_ID)
+ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+
+# Bytes per message in the role, timestamp and text columns (without the text itself)
+COLUMN_BYTES = 1 + 8 + 8
+
+# (role, text, created_at as epoch seconds)
+MessageRecord = Tuple[str, str, int]
+
+
+class MessageHistory:
+    """The loaded part of a conversation.
+
+    Messages are addressed by their position (seq) in the conversation.
+    Roles, timestamps and texts are kept in separate columns, and rendered
+    HTML only for the messages that have been displayed. Details (e.g. the
+    generation statistics of a response) are kept for the messages that
+    have them. Once the texts and
+    the HTML exceed max_bytes, the oldest messages are spilled. They remain
+    in the conversation store and are loaded from there when needed again.
+    """
+
+    def __init__(self, max_bytes: int = CHAT_HISTORY_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.offset = 0  # Position of the first loaded message in the conversation
+        self.bytes = 0
+        self._roles = array('B')
+        self._created_at = array('q')
+        self._texts: List[str] = []
+        self._html: Dict[int, str] = {}
+        self._details: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    @property
+    def count(self) -> int:
+        """Number of messages in the conversation, including those not loaded."""
+        return self.offset + len(self._texts)
+
+    def get(self, seq: int) -> MessageRecord:
+        """Get the message at a position of the conversation."""
+        index = seq - self.offset
+        return ROLES[self._roles[index]], self._texts[index], self._created_at[index]
+
+    def get_html(self, seq: int) -> Optional[str]:
+        """Get the rendered HTML of a message, if it has been rendered before."""
+        return self._html.get(seq)
+
+    def get_details(self, seq: int) -> Optional[str]:
+        """Get the details line of a message, if it has one."""
+        return self._details.get(seq)
+
+    def set_details(self, seq: int, details: str) -> None:
+        """Attach a details line to a message."""
+        self._details[seq] = details
+
+    def set_html(self, seq: int, html: str) -> None:
+        """Keep the rendered HTML of a message."""
+        previous = self._html.get(seq)
+        if previous is not None:
+            self.bytes -= sys.getsizeof(previous)
+        self.bytes += sys.getsizeof(html)
+        self._html[seq] = html
+
+    def append(self, role: str, text: str, created_at: int) -> int:
+        """Add the newest message and return its position."""
+        self._roles.append(ROLE_CODES[role])
+        self._created_at.append(created_at)
+        self._texts.append(text)
+        self.bytes += COLUMN_BYTES + sys.getsizeof(text)
+        return self.count - 1
+
+    def prepend(self, offset: int, messages: Iterable[MessageRecord]) -> None:
+        """Add a page of older messages that starts at the given position."""
+        messages = list(messages)
+        self._roles[0:0] = array('B', (ROLE_CODES[role] for role, _, _ in messages))
+        self._created_at[0:0] = array('q', (created_at for _, _, created_at in messages))
+        self._texts[0:0] = [text for _, text, _ in messages]
+        self.bytes += sum(COLUMN_BYTES + sys.getsizeof(text) for _, text, _ in messages)
+        self.offset = offset
+
+    def reset(self, offset: int = 0, messages: Iterable[MessageRecord] = ()) -> None:
+        """Replace the history, e.g. when another conversation is opened."""
+        self.offset = 0
+        self.bytes = 0
+        self._roles = array('B')
+        self._created_at = array('q')
+        self._texts = []
+        self._html = {}
+        self._details = {}
+        self.prepend(offset, messages)
+
+    def drop_before(self, seq: int) -> None:
+        """Unload all messages preceding the given position."""
+        count = min(max(0, seq - self.offset), len(self._texts))
+        if not count:
+            return
+        for index in range(self.offset, self.offset + count):
+            self._details.pop(index, None)
+            html = self._html.pop(index, None)
+            if html is not None:
+                self.bytes -= sys.getsizeof(html)
+        self.bytes -= sum(COLUMN_BYTES + sys.getsizeof(text) for text in self._texts[:count])
+        del self._roles[:count]
+        del self._created_at[:count]
+        del self._texts[:count]
+        self.offset += count
+
+    def drop_html(self) -> None:
+        """Forget all rendered HTML."""
+        self.bytes -= sum(sys.getsizeof(html) for html in self._html.values())
+        self._html.clear()
+
+    def spill(self, keep_from: int, reserved_bytes: int = 0) -> None:
+        """Unload the oldest messages until the byte cap is met, keeping those from keep_from on.
+
+        reserved_bytes is memory of the session outside the history (e.g. the
+        conversation sent to the model) that counts against the same cap.
+        """
+        seq = self.offset
+        excess = self.bytes + reserved_bytes - self.max_bytes
+        while excess > 0 and seq < min(keep_from, self.count):
+            excess -= COLUMN_BYTES + sys.getsizeof(self._texts[seq - self.offset])
+            if seq in self._html:
+                excess -= sys.getsizeof(self._html[seq])
+            seq += 1
+        self.drop_before(seq)
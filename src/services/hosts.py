@@ -0,0 +1,233 @@
+"""
+Ollama host pool for the chat application.
+Tracks the health and the models of every Ollama host and picks the host for each request.
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import httpx
+
+from src.config.config import OLLAMA_HOSTS, HOST_CHECK_INTERVAL, HOST_CHECK_TIMEOUT
+from src.services.client_pool import client_pool
+from src.services.metrics import metrics
+
+Host = Optional[str]  # Base URL of a host; None is the default host (OLLAMA_HOST)
+
+
+class NoHostAvailableError(Exception):
+    """Raised when every host has been tried without success."""
+
+
+class _HostState:
+    """Health, models and load of a single host."""
+    __slots__ = ('url', 'healthy', 'models', 'loaded', 'active', 'checked_at', 'error')
+
+    def __init__(self, url: Host):
+        self.url = url
+        self.healthy = True  # Until a request or check fails
+        self.models: Dict[str, Dict] = {}  # Installed models by name
+        self.loaded: List[Dict] = []
+        self.active = 0  # Generations in flight
+        self.checked_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        """Display name of the host."""
+        return self.url or 'default'
+
+    def has_model(self, model_name: str) -> bool:
+        """Whether the model is installed (assumed until the first check)."""
+        return self.checked_at is None or model_name in self.models
+
+    def has_loaded(self, model_name: str) -> bool:
+        """Whether the model was in memory at the last check."""
+        return any(model.get('model') == model_name for model in self.loaded)
+
+
+def is_host_error(error: Exception) -> bool:
+    """Whether an error means the host is down, so it should be taken out of rotation."""
+    import ollama  # Loaded by the client that raised the error
+
+    if isinstance(error, (ConnectionError, httpx.TransportError, asyncio.TimeoutError)):
+        return True
+    return isinstance(error, ollama.ResponseError) and error.status_code >= 500
+
+
+def is_missing_model_error(error: Exception) -> bool:
+    """Whether an error means the host does not have the model, so another host should be tried."""
+    import ollama  # Loaded by the client that raised the error
+
+    return isinstance(error, ollama.ResponseError) and error.status_code == 404
+
+
+class HostPool:
+    """Process-wide pool of the Ollama hosts in OLLAMA_HOSTS.
+
+    Every HOST_CHECK_INTERVAL seconds each host is asked for its installed
+    (/api/tags) and loaded (/api/ps) models. A host that does not answer
+    within HOST_CHECK_TIMEOUT, or fails a request, is taken out of rotation
+    until it answers a check again. Each request goes to the healthy host
+    that has the model, preferring hosts that hold it in memory and then
+    the one with the fewest generations in flight. Every change of the
+    installed models bumps models_version, so caches built from them can
+    tell that they are outdated.
+    """
+
+    def __init__(self, hosts: Iterable[Host] = (), check_interval: float = HOST_CHECK_INTERVAL,
+                 check_timeout: float = HOST_CHECK_TIMEOUT):
+        self.hosts: Dict[Host, _HostState] = {url: _HostState(url) for url in (list(hosts) or [None])}
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self.models_version = 0
+        self._check_task: Optional[asyncio.Task] = None
+        self._loaded_task: Optional[asyncio.Task] = None
+        self._monitor: Optional[asyncio.Task] = None
+
+    def select(self, model_name: Optional[str] = None, exclude: Iterable[Host] = (), preferred: Host = None) -> Host:
+        """Pick the host for a request; preferred (e.g. the host of the previous turn) breaks ties."""
+        excluded = set(exclude)
+        candidates = [host for url, host in self.hosts.items() if url not in excluded]
+        if not candidates:
+            raise NoHostAvailableError('No Ollama host is available')
+
+        def rank(host: _HostState):
+            has_model = model_name is None or host.has_model(model_name)
+            loaded = model_name is not None and host.has_loaded(model_name)
+            return not host.healthy, not has_model, not loaded, host.active, host.url != preferred
+
+        return min(candidates, key=rank).url
+
+    def has_alternative(self, model_name: str, exclude: Iterable[Host]) -> bool:
+        """Whether another healthy host could serve the model."""
+        excluded = set(exclude)
+        return any(host.healthy and host.has_model(model_name)
+                   for url, host in self.hosts.items() if url not in excluded)
+
+    def hosts_with(self, model_name: str) -> List[Host]:
+        """Healthy hosts that have the model installed."""
+        return [url for url, host in self.hosts.items() if host.healthy and model_name in host.models]
+
+    def count_serving(self, model_name: str) -> int:
+        """Number of healthy hosts that can serve the model."""
+        return sum(1 for host in self.hosts.values() if host.healthy and host.has_model(model_name))
+
+    @contextmanager
+    def track(self, url: Host) -> Iterator[None]:
+        """Count a generation as in flight on a host while inside the block."""
+        host = self.hosts[url]
+        host.active += 1
+        try:
+            yield
+        finally:
+            host.active -= 1
+
+    def mark_missing(self, url: Host, model_name: str) -> None:
+        """Stop routing a model to a host that does not have it, until the next check."""
+        if self.hosts[url].models.pop(model_name, None) is not None:
+            self.models_version += 1
+
+    def mark_failed(self, url: Host, error: Exception) -> None:
+        """Take a host out of rotation until it answers a check again."""
+        host = self.hosts[url]
+        if host.healthy:
+            print(f"Error reaching Ollama host {host.name}: {str(error)}")
+        host.healthy = False
+        host.error = str(error)
+
+    def get_models(self) -> List[Dict]:
+        """Installed models of all healthy hosts, each listed once with the names of its hosts."""
+        models: Dict[str, Dict] = {}
+        for host in self.hosts.values():
+            if not host.healthy:
+                continue
+            for name, model in host.models.items():
+                entry = models.setdefault(name, {**model, 'hosts': []})
+                entry['hosts'].append(host.name)
+        return list(models.values())
+
+    def get_loaded(self) -> List[Dict]:
+        """Models in memory on the healthy hosts, each with the host it is loaded on."""
+        return [{**model, 'host': url} for url, host in self.hosts.items() if host.healthy for model in host.loaded]
+
+    def get_stats(self) -> List[Dict]:
+        """Health and load of every host."""
+        return [
+            {
+                'host': host.name,
+                'healthy': host.healthy,
+                'active': host.active,
+                'models': len(host.models),
+                'loaded': [model.get('model') for model in host.loaded],
+                'error': host.error,
+            }
+            for host in self.hosts.values()
+        ]
+
+    async def refresh(self) -> None:
+        """Check all hosts now; concurrent callers share the same check."""
+        if self._check_task is None or self._check_task.done():
+            self._check_task = asyncio.get_running_loop().create_task(self._check_all())
+        await asyncio.shield(self._check_task)
+
+    async def refresh_loaded(self) -> None:
+        """Fetch only the loaded models (/api/ps) of the healthy hosts; concurrent callers share the request."""
+        if self._loaded_task is None or self._loaded_task.done():
+            self._loaded_task = asyncio.get_running_loop().create_task(self._check_all_loaded())
+        await asyncio.shield(self._loaded_task)
+
+    def start(self) -> None:
+        """Start the periodic health checks (call once the event loop runs)."""
+        if self._monitor is None:
+            self._monitor = asyncio.get_running_loop().create_task(self._check_periodically())
+
+    async def _check_all(self) -> None:
+        """Check all hosts concurrently."""
+        await asyncio.gather(*(self._check(host) for host in self.hosts.values()))
+
+    async def _check_all_loaded(self) -> None:
+        """Fetch the loaded models of the healthy hosts concurrently."""
+        await asyncio.gather(*(self._check_loaded(host) for host in self.hosts.values() if host.healthy))
+
+    async def _check(self, host: _HostState) -> None:
+        """Fetch the installed and loaded models of a host."""
+        client = client_pool.get_async_client(host.url)
+        try:
+            tags, running = await asyncio.wait_for(asyncio.gather(client.list(), client.ps()), self.check_timeout)
+        except Exception as e:
+            self.mark_failed(host.url, e)
+            return
+        finally:
+            host.checked_at = time.monotonic()
+        models = {model.get('model'): dict(model) for model in tags.get('models', [])}
+        if models != host.models:
+            host.models = models
+            self.models_version += 1
+        host.loaded = [dict(model) for model in running.get('models', [])]
+        host.healthy = True
+        host.error = None
+
+    async def _check_loaded(self, host: _HostState) -> None:
+        """Fetch the loaded models of a host."""
+        try:
+            running = await asyncio.wait_for(client_pool.get_async_client(host.url).ps(), self.check_timeout)
+        except Exception as e:
+            self.mark_failed(host.url, e)
+            return
+        host.loaded = [dict(model) for model in running.get('models', [])]
+
+    async def _check_periodically(self) -> None:
+        """Keep the health and the models of all hosts up to date."""
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.check_interval)
+
+
+host_pool = HostPool(OLLAMA_HOSTS)
+
+metrics.gauge('qv_host_healthy', 'Whether an Ollama host is in rotation',
+              lambda: {(host.name,): int(host.healthy) for host in host_pool.hosts.values()}, ('host',))
+metrics.gauge('qv_host_active_generations', 'Generations in flight per Ollama host',
+              lambda: {(host.name,): host.active for host in host_pool.hosts.values()}, ('host',))
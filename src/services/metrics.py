@@ -0,0 +1,213 @@
+"""
+Performance metrics for the chat application.
+Collects latencies and counters and renders them in the Prometheus text format.
+"""
+import math
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.config.config import METRICS_LATENCY_BUCKETS, METRICS_THROUGHPUT_BUCKETS
+
+Labels = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Render label pairs like {model="llama3"}."""
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _escape(value: str) -> str:
+    """Escape a label value."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value."""
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonically increasing count per label combination."""
+    kind = 'counter'
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        """Increase the count of the given label values."""
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        """Exposition lines of all label combinations."""
+        return [f'{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}'
+                for labels, value in self.values.items()]
+
+
+class Histogram:
+    """Distribution of observed values in cumulative buckets per label combination."""
+    kind = 'histogram'
+
+    def __init__(self, name: str, description: str, buckets: Sequence[float], label_names: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self.label_names = tuple(label_names)
+        self.values: Dict[Labels, List[float]] = {}  # Bucket counts, then the sum
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Record a value for the given label values."""
+        counts = self.values.get(labels)
+        if counts is None:
+            counts = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def samples(self) -> List[str]:
+        """Exposition lines of all label combinations."""
+        lines = []
+        for labels, counts in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                bucket_labels = _format_labels(self.label_names + ('le',), labels + (_format_value(bound),))
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            label_text = _format_labels(self.label_names, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(counts[-1])}')
+            lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+
+class Gauge:
+    """Current values that are collected from a callback when the metrics are rendered."""
+    kind = 'gauge'
+
+    def __init__(self, name: str, description: str, collect: Callable[[], Dict[Labels, float]],
+                 label_names: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.collect = collect
+        self.label_names = tuple(label_names)
+
+    def samples(self) -> List[str]:
+        """Exposition lines of the collected values."""
+        return [f'{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}'
+                for labels, value in self.collect().items()]
+
+
+class MetricsRegistry:
+    """Process-wide collection of metrics.
+
+    Recording a value is a dictionary update, so instrumenting the
+    generation path costs next to nothing. The values are only formatted
+    when /metrics is scraped.
+    """
+
+    def __init__(self):
+        self.metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, description: str, label_names: Sequence[str] = ()) -> Counter:
+        """Create and register a counter."""
+        return self._register(Counter(name, description, label_names))
+
+    def histogram(self, name: str, description: str, buckets: Sequence[float],
+                  label_names: Sequence[str] = ()) -> Histogram:
+        """Create and register a histogram."""
+        return self._register(Histogram(name, description, buckets, label_names))
+
+    def gauge(self, name: str, description: str, collect: Callable[[], Dict[Labels, float]],
+              label_names: Sequence[str] = ()) -> Gauge:
+        """Create and register a gauge."""
+        return self._register(Gauge(name, description, collect, label_names))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics.values():
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                print(f"Error collecting metric {metric.name}: {str(e)}")
+                continue
+            lines.append(f'# HELP {metric.name} {metric.description}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+    def _register(self, metric):
+        """Add a metric, keeping the existing one if the name is taken."""
+        return self.metrics.setdefault(metric.name, metric)
+
+
+metrics = MetricsRegistry()
+
+# Generation
+GENERATIONS = metrics.counter(
+    'qv_generations_total', 'Generation requests by outcome', ('model', 'outcome'))
+QUEUE_WAIT = metrics.histogram(
+    'qv_queue_wait_seconds', 'Time spent waiting for a generation slot', METRICS_LATENCY_BUCKETS, ('model',))
+TIME_TO_FIRST_TOKEN = metrics.histogram(
+    'qv_time_to_first_token_seconds', 'Time from sending a request to the first token', METRICS_LATENCY_BUCKETS,
+    ('model',))
+GENERATION_DURATION = metrics.histogram(
+    'qv_generation_duration_seconds', 'Time from sending a request to the last token', METRICS_LATENCY_BUCKETS,
+    ('model',))
+PROMPT_EVAL_DURATION = metrics.histogram(
+    'qv_prompt_eval_duration_seconds', 'Prompt evaluation time reported by Ollama', METRICS_LATENCY_BUCKETS,
+    ('model',))
+LOAD_DURATION = metrics.histogram(
+    'qv_model_load_duration_seconds', 'Model load time reported by Ollama', METRICS_LATENCY_BUCKETS, ('model',))
+TOKENS_PER_SECOND = metrics.histogram(
+    'qv_tokens_per_second', 'Generation throughput reported by Ollama', METRICS_THROUGHPUT_BUCKETS, ('model',))
+TOKENS = metrics.counter(
+    'qv_tokens_total', 'Tokens processed by Ollama', ('model', 'kind'))
+
+# Model management
+PULL_DURATION = metrics.histogram(
+    'qv_pull_duration_seconds', 'Duration of model pulls', METRICS_LATENCY_BUCKETS, ('model', 'outcome'))
+CATALOG_FETCH_DURATION = metrics.histogram(
+    'qv_catalog_fetch_duration_seconds', 'Duration of model list requests', METRICS_LATENCY_BUCKETS, ('outcome',))
+
+# Document retrieval
+EMBEDDING_DURATION = metrics.histogram(
+    'qv_embedding_duration_seconds', 'Duration of embedding requests', METRICS_LATENCY_BUCKETS, ('purpose',))
+DOCUMENT_SEARCH_DURATION = metrics.histogram(
+    'qv_document_search_duration_seconds', 'Time to find the document chunks relevant to a message',
+    METRICS_LATENCY_BUCKETS)
+
+
+def record_generation(model_name: str, time_to_first_token: Optional[float], duration: float,
+                      final_chunk: Optional[Any]) -> Dict[str, float]:
+    """Record a completed generation and return its statistics.
+
+    The token counts and durations (in nanoseconds) come from the final
+    chunk Ollama sends when the response is done.
+    """
+    stats = {'duration': duration}
+    GENERATION_DURATION.observe(duration, model_name)
+    if time_to_first_token is not None:
+        stats['time_to_first_token'] = time_to_first_token
+    if final_chunk is None:
+        return stats
+
+    eval_count = final_chunk.get('eval_count') or 0
+    eval_duration = (final_chunk.get('eval_duration') or 0) / 1e9
+    prompt_eval_count = final_chunk.get('prompt_eval_count') or 0
+    prompt_eval_duration = (final_chunk.get('prompt_eval_duration') or 0) / 1e9
+    load_duration = (final_chunk.get('load_duration') or 0) / 1e9
+    TOKENS.inc(model_name, 'completion', amount=eval_count)
+    TOKENS.inc(model_name, 'prompt', amount=prompt_eval_count)
+    PROMPT_EVAL_DURATION.observe(prompt_eval_duration, model_name)
+    LOAD_DURATION.observe(load_duration, model_name)
+    stats.update(tokens=eval_count, prompt_tokens=prompt_eval_count, prompt_eval_duration=prompt_eval_duration)
+    if eval_duration > 0:
+        stats['tokens_per_second'] = eval_count / eval_duration
+        TOKENS_PER_SECOND.observe(stats['tokens_per_second'], model_name)
+    return stats
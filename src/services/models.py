@@ -1,82 +1,276 @@
 """
 Model management and configuration for the chat application.
 """
-import ollama
-from qv_ollama_sdk import OllamaChatClient
-from typing import Dict, List, Callable
+import asyncio
+import sys
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from src.config.config import USER_ID, SYSTEM_ID, STATUS_ID, DOCUMENT_CONTEXT_PROMPT, MODEL_DELETE_TIMEOUT
+from src.services.catalog import model_catalog
+from src.services.client_pool import client_pool
+from src.services.context import ContextWindow
+from src.services.documents import document_index
+from src.services.hosts import Host, host_pool, is_host_error, is_missing_model_error
+from src.services.metrics import GENERATIONS, TIME_TO_FIRST_TOKEN, record_generation
+from src.services.residency import residency_manager
+from src.services.response_cache import response_cache
+
+if TYPE_CHECKING:
+    from qv_ollama_sdk import Conversation
 
 # Default model configuration
 DEFAULT_MODEL = "gemma2:2b"
 SYSTEM_MESSAGE = "You are a helpful assistant that can answer questions and help with tasks."
 
 class ModelManager:
-    def __init__(self):
-        self.current_model = DEFAULT_MODEL
-        self.model_data = {'current_model': DEFAULT_MODEL}
-        self.client = self._initialize_client()
+    def __init__(self, model_name: str = DEFAULT_MODEL, system_message: str = SYSTEM_MESSAGE):
+        # The SDK is imported by the first session rather than at startup
+        from qv_ollama_sdk import ModelParameters
+
+        self.current_model = model_name
+        self.model_data = {'current_model': model_name}
+        self.system_message = system_message
+        self.parameters = ModelParameters()
+        self.conversation = self._initialize_conversation()
+        self.context_window = ContextWindow()
+        self.last_response_stats: Optional[Dict[str, float]] = None
+        self.last_response: Optional[str] = None  # Answer added to the conversation by the last request
+        self.host: Host = None  # Host of the previous response, preferred while it is as good as the others
+        self.document_ids: Set[int] = set()  # Attached documents searched for every message
+        self.owner: Optional[str] = None  # Browser whose documents may be searched
+
+    def _initialize_conversation(self, model_name: str = None) -> 'Conversation':
+        """Start a new conversation with the specified model.
+
+        Only the conversation state belongs to the session; HTTP clients
+        come from the shared client pool.
+        """
+        from qv_ollama_sdk import Conversation
 
-    def _initialize_client(self, model_name: str = None) -> OllamaChatClient:
-        """Initialize the Ollama client with the specified model."""
         if model_name is None:
             model_name = self.model_data['current_model']
         
-        return OllamaChatClient(
-            model_name=model_name,
-            system_message=SYSTEM_MESSAGE
-        )
+        conversation = Conversation(model_name=model_name)
+        conversation.add_system_message(self.system_message)
+        return conversation
 
     def get_available_models(self) -> List[Dict]:
-        """Get all available models from Ollama."""
-        try:
-            models = ollama.list()
-            return models.get('models', [])
-        except Exception as e:
-            print(f"Error fetching models: {str(e)}")
-            return []
+        """Get all available models from the shared model catalog."""
+        return model_catalog.get_models()
 
     def switch_model(self, model_name: str) -> None:
-        """Switch to a different model."""
+        """Switch to a different model, continuing the current conversation."""
         if model_name != self.model_data['current_model']:
-            self.model_data['current_model'] = model_name
-            self.current_model = model_name
-            self.client = self._initialize_client(model_name)
+            self._set_model(model_name)
+            self.conversation.model_name = model_name
+            residency_manager.warm_up(model_name)
+
+    def new_conversation(self) -> None:
+        """Start a new conversation with the current model."""
+        self.conversation = self._initialize_conversation()
+
+    def restore_conversation(self, model_name: str, messages: List[Tuple[str, str]]) -> None:
+        """Continue a stored conversation from its (role, content) messages.
+
+        Status messages are skipped together with the prompt they stand in
+        for, as that prompt never got an answer (see stream_chat).
+        """
+        from qv_ollama_sdk import Message, MessageRole
+
+        self._set_model(model_name)
+        self.conversation = self._initialize_conversation(model_name)
+        restored = self.conversation.messages
+        for role, content in messages:
+            if role == STATUS_ID:
+                if restored and restored[-1].role == USER_ID:
+                    restored.pop()
+                continue
+            restored.append(Message(role=MessageRole(role), content=content))
+        residency_manager.warm_up(model_name)
+
+    def get_memory_usage(self) -> int:
+        """Approximate memory used by the conversation in bytes."""
+        return sum(sys.getsizeof(message.content) for message in self.conversation.messages)
+
+    def release_history(self) -> None:
+        """Drop the turns that no longer fit into the context window."""
+        self.context_window.compact(self.conversation)
+
+    def _set_model(self, model_name: str) -> None:
+        """Make a model the current one."""
+        self.model_data['current_model'] = model_name
+        self.current_model = model_name
+
+    def get_conversation(self) -> 'Conversation':
+        """Get the conversation of this session."""
+        return self.conversation
+
+    async def get_cached_response(self, message: str) -> Optional[str]:
+        """Answer a message from the response cache if possible.
 
-    def get_client(self) -> OllamaChatClient:
-        """Get the current Ollama client instance."""
-        return self.client
+        On a hit, the message and the cached answer are added to the
+        conversation as if the model had generated it.
+        """
+        self.last_response_stats = None
+        self.last_response = None
+        if not response_cache.enabled or self.document_ids:
+            return None
+        conversation = self.conversation
+        response = await response_cache.get(self._cache_key(message))
+        if response is not None:
+            conversation.add_user_message(message)
+            conversation.add_assistant_message(response)
+            self.last_response = response
+            GENERATIONS.inc(conversation.model_name, 'cached')
+        return response
+
+    def _cache_key(self, message: str) -> str:
+        """Cache key of a message sent in the current conversation."""
+        history = [m.to_dict() for m in self.conversation.messages if m.role != SYSTEM_ID]
+        return response_cache.make_key(self.conversation.model_name, self.system_message, history, message,
+                                       self.parameters.to_dict())
+
+    async def stream_chat(self, message: str) -> AsyncIterator[str]:
+        """Send a message and stream the response without blocking the event loop.
+
+        Uses the conversation of this session, trimmed to the token budget
+        of the context window, plus the chunks of the attached documents
+        that are most relevant to the message. Closing the iterator
+        (e.g. by cancelling the consuming task) closes the HTTP stream, which
+        makes Ollama stop generating. The answer is kept in last_response and
+        the statistics of a completed response in last_response_stats. A
+        prompt that failed, or was stopped before any text arrived, is removed
+        from the conversation again. Turns that left the context window are
+        dropped after every response, so the conversation stays within the
+        token budget.
+        """
+        conversation = self.conversation
+        model_name = conversation.model_name
+        cache_key = self._cache_key(message) if response_cache.enabled and not self.document_ids else None
+        prompt = conversation.add_user_message(message)
+        residency_manager.touch(model_name)
+        self.last_response_stats = None
+        self.last_response = None
+        messages = self.context_window.build_messages(conversation)
+        if self.document_ids:
+            messages = await self._add_excerpts(messages, message)
+        parts = []
+        started = time.monotonic()
+        time_to_first_token = None
+        final_chunk = None
+        outcome = 'cancelled'
+        stream = self._chat_stream(model_name, messages)
+        try:
+            async for chunk in stream:
+                content = chunk['message']['content']
+                if content:
+                    if time_to_first_token is None:
+                        time_to_first_token = time.monotonic() - started
+                        TIME_TO_FIRST_TOKEN.observe(time_to_first_token, model_name)
+                    parts.append(content)
+                    yield content
+                if chunk.get('done'):
+                    final_chunk = chunk
+            outcome = 'completed'
+            self.last_response_stats = record_generation(
+                model_name, time_to_first_token, time.monotonic() - started, final_chunk
+            )
+            if cache_key is not None and parts:
+                self.last_response = ''.join(parts)
+                response_cache.put(cache_key, self.last_response)
+        except Exception:
+            outcome = 'error'
+            raise
+        finally:
+            await stream.aclose()
+            GENERATIONS.inc(model_name, outcome)
+            residency_manager.touch(model_name)
+            if parts and outcome != 'error':
+                if self.last_response is None:
+                    self.last_response = ''.join(parts)
+                conversation.add_assistant_message(self.last_response)
+            else:
+                self.context_window.discard(conversation, prompt)
+            self.context_window.update_summary(
+                conversation, keep_alive=residency_manager.keep_alive_for(conversation.model_name)
+            )
+            self.context_window.compact(conversation)
+
+    async def _add_excerpts(self, messages: List[Dict], message: str) -> List[Dict]:
+        """Put the document chunks relevant to the message right before it.
+
+        The excerpts are only part of this request, not of the conversation,
+        so later prompts do not carry them along.
+        """
+        try:
+            excerpts = await document_index.search(message, self.document_ids, self.owner)
+        except Exception as e:
+            print(f"Error searching documents: {str(e)}")
+            return messages
+        if not excerpts:
+            return messages
+        context = '\n\n'.join(f"[{excerpt['document']}]\n{excerpt['text']}" for excerpt in excerpts)
+        excerpt_message = {'role': SYSTEM_ID, 'content': f"{DOCUMENT_CONTEXT_PROMPT}\n\n{context}"}
+        return messages[:-1] + [excerpt_message, messages[-1]]
+
+    async def _chat_stream(self, model_name: str, messages: List[Dict]) -> AsyncIterator:
+        """Stream the response chunks from the best host.
+
+        If a host cannot be reached or does not have the model before it
+        sent anything, the request is retried on the next host. A host that
+        fails is taken out of rotation, so the next message of the session
+        goes elsewhere; a host without the model only stops getting that model.
+        """
+        tried = []
+        while True:
+            host = host_pool.select(model_name, exclude=tried, preferred=self.host)
+            received = False
+            try:
+                with host_pool.track(host):
+                    stream = await client_pool.get_async_client(host).chat(
+                        model=model_name,
+                        messages=messages,
+                        options=self.parameters.to_dict(),
+                        stream=True,
+                        keep_alive=residency_manager.keep_alive_for(model_name)
+                    )
+                    async for chunk in stream:
+                        received = True
+                        yield chunk
+                self.host = host
+                return
+            except Exception as e:
+                if is_host_error(e):
+                    host_pool.mark_failed(host, e)
+                elif is_missing_model_error(e):
+                    host_pool.mark_missing(host, model_name)
+                else:
+                    raise
+                tried.append(host)
+                if received or not host_pool.has_alternative(model_name, tried):
+                    raise
 
     def get_model_data(self) -> Dict:
         """Get the current model data dictionary."""
         return self.model_data
 
-    def delete_model(self, model_name: str) -> bool:
-        """Delete a model from Ollama."""
-        try:
-            ollama.delete(model_name)
-            return True
-        except Exception as e:
-            print(f"Error deleting model: {str(e)}")
-            return False
+    async def delete_model(self, model_name: str) -> bool:
+        """Delete a model from every healthy host that has it, all at once.
 
-    def pull_model(self, model_name: str, progress_callback: Callable[[float, str], None]) -> bool:
-        """Pull a model from Ollama with progress tracking."""
+        Returns whether every host deleted it; the model catalog is
+        refreshed either way, as some hosts may have.
+        """
+        hosts = host_pool.hosts_with(model_name) or [host_pool.select(model_name)]
+        results = await asyncio.gather(*(self._delete_from(host, model_name) for host in hosts))
+        model_catalog.invalidate()
+        return all(results)
+
+    async def _delete_from(self, host: Host, model_name: str) -> bool:
+        """Delete a model from a single host."""
         try:
-            current_digest = ''
-            for progress in ollama.pull(model_name, stream=True):
-                digest = progress.get('digest', '')
-                if digest != current_digest:
-                    current_digest = digest
-                
-                if not digest:
-                    progress_callback(0, progress.get('status', 'Starting...'))
-                    continue
-                
-                if total := progress.get('total'):
-                    completed = progress.get('completed', 0)
-                    progress_value = completed / total if total > 0 else 0
-                    progress_callback(progress_value, f"Pulling {digest[7:19]}")
-            
+            await asyncio.wait_for(client_pool.get_async_client(host).delete(model_name), MODEL_DELETE_TIMEOUT)
             return True
         except Exception as e:
-            print(f"Error pulling model: {str(e)}")
-            return False 
\ No newline at end of file
+            print(f"Error deleting model from host {host or 'default'}: {str(e) or type(e).__name__}")
+            return False
@@ -0,0 +1,171 @@
+"""
+Model pull management for the chat application.
+Runs model downloads on the server and shares their progress with every session.
+"""
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.config.config import PULL_MAX_CONCURRENT, PULL_UPDATE_RATE
+from src.services.catalog import model_catalog
+from src.services.client_pool import client_pool
+from src.services.hosts import Host, host_pool
+from src.services.metrics import metrics, PULL_DURATION
+
+PULL_QUEUED = 'queued'
+PULL_RUNNING = 'pulling'
+PULL_SUCCEEDED = 'success'
+PULL_FAILED = 'error'
+PULL_CANCELLED = 'cancelled'
+FINISHED_STATES = (PULL_SUCCEEDED, PULL_FAILED, PULL_CANCELLED)
+
+
+class Pull:
+    """A model download and its progress summed over all layers."""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.host: Host = None
+        self.state = PULL_QUEUED
+        self.status = 'Waiting for a free download slot...'
+        self.layers: Dict[str, Tuple[int, int]] = {}  # Digest -> (completed, total) bytes
+        self.progress = 0.0
+        self.error: Optional[str] = None
+        self.created_at = time.monotonic()
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def completed(self) -> int:
+        """Downloaded bytes of all layers."""
+        return sum(completed for completed, _ in self.layers.values())
+
+    @property
+    def total(self) -> int:
+        """Size of all layers announced so far."""
+        return sum(total for _, total in self.layers.values())
+
+    @property
+    def finished(self) -> bool:
+        """Whether the pull has ended, successfully or not."""
+        return self.state in FINISHED_STATES
+
+    def update(self, event) -> None:
+        """Apply a progress event from Ollama."""
+        digest = event.get('digest')
+        total = event.get('total')
+        if digest and total:
+            self.layers[digest] = (event.get('completed') or 0, total)
+            # Layers are announced one after another, so the total grows; the bar never moves backwards
+            self.progress = max(self.progress, self.completed / self.total)
+        self.status = event.get('status') or self.status
+
+
+class PullManager:
+    """Process-wide manager of model pulls.
+
+    Pulls run as server tasks with the async client, at most
+    PULL_MAX_CONCURRENT at a time; the others wait in line. Pulling a
+    model that is already being pulled joins the running pull instead of
+    starting another download. Subscribers are notified of changes at most
+    PULL_UPDATE_RATE times per second, however fast Ollama reports progress.
+    """
+
+    def __init__(self, max_concurrent: int = PULL_MAX_CONCURRENT, update_rate: float = PULL_UPDATE_RATE):
+        self.pulls: Dict[str, Pull] = {}
+        self.max_concurrent = max_concurrent
+        self.update_interval = 1 / update_rate
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._subscribers: List[Callable[[], None]] = []
+        self._notified_at = 0.0
+        self._notify_handle: Optional[asyncio.TimerHandle] = None
+
+    def start(self, model_name: str) -> Pull:
+        """Pull a model, or return the pull of that model that is still running."""
+        pull = self.pulls.get(model_name)
+        if pull is not None and not pull.finished:
+            return pull
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        pull = self.pulls[model_name] = Pull(model_name)
+        pull.task = asyncio.get_running_loop().create_task(self._run(pull))
+        self._notify_now()
+        return pull
+
+    def cancel(self, model_name: str) -> None:
+        """Stop a queued or running pull."""
+        pull = self.pulls.get(model_name)
+        if pull is not None and pull.task is not None and not pull.finished:
+            pull.task.cancel()
+
+    def dismiss(self, model_name: str) -> None:
+        """Forget a finished pull."""
+        pull = self.pulls.get(model_name)
+        if pull is not None and pull.finished:
+            del self.pulls[model_name]
+            self._notify_now()
+
+    def get_pulls(self) -> List[Pull]:
+        """All pulls, oldest first."""
+        return sorted(self.pulls.values(), key=lambda pull: pull.created_at)
+
+    def subscribe(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Call callback whenever pulls change; returns a function that ends the subscription."""
+        self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback) if callback in self._subscribers else None
+
+    async def _run(self, pull: Pull) -> None:
+        """Wait for a download slot, then stream the pull from the least busy host."""
+        started = time.monotonic()
+        try:
+            async with self._slots:
+                pull.state = PULL_RUNNING
+                pull.status = 'Starting...'
+                pull.host = host_pool.select()
+                self._notify_now()
+                started = time.monotonic()
+                stream = await client_pool.get_async_client(pull.host).pull(pull.model_name, stream=True)
+                async for event in stream:
+                    pull.update(event)
+                    self._notify_throttled()
+            pull.state = PULL_SUCCEEDED
+            pull.progress = 1.0
+            model_catalog.invalidate()
+        except asyncio.CancelledError:
+            pull.state = PULL_CANCELLED
+            pull.status = 'Cancelled'
+        except Exception as e:
+            pull.state = PULL_FAILED
+            pull.error = str(e)
+            pull.status = f"Error: {str(e)}"
+            print(f"Error pulling model: {str(e)}")
+        finally:
+            PULL_DURATION.observe(time.monotonic() - started, pull.model_name, pull.state)
+            self._notify_now()
+
+    def _notify_throttled(self) -> None:
+        """Notify the subscribers now or once the update interval has passed."""
+        if self._notify_handle is not None:
+            return
+        delay = self._notified_at + self.update_interval - time.monotonic()
+        if delay <= 0:
+            self._notify_now()
+        else:
+            self._notify_handle = asyncio.get_running_loop().call_later(delay, self._notify_now)
+
+    def _notify_now(self) -> None:
+        """Tell every subscriber that the pulls have changed."""
+        if self._notify_handle is not None:
+            self._notify_handle.cancel()
+            self._notify_handle = None
+        self._notified_at = time.monotonic()
+        for callback in list(self._subscribers):
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error updating pull progress: {str(e)}")
+
+
+pull_manager = PullManager()
+
+metrics.gauge('qv_pulls_running', 'Model pulls in progress',
+              lambda: {(): sum(1 for pull in pull_manager.pulls.values() if pull.state == PULL_RUNNING)})
@@ -0,0 +1,132 @@
+"""
+Model residency management for the chat application.
+Preloads models, applies keep-alive policies and unloads idle models.
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional, Union
+
+from src.config.config import (
+    DEFAULT_KEEP_ALIVE, MODEL_KEEP_ALIVE, MODEL_IDLE_UNLOAD_SECONDS,
+    MODEL_MEMORY_LIMIT_BYTES, MODEL_RESIDENCY_CHECK_INTERVAL
+)
+from src.services.client_pool import client_pool
+from src.services.hosts import host_pool
+from src.services.metrics import metrics
+from src.services.scheduler import scheduler
+
+
+class ModelResidencyManager:
+    """Process-wide view of the models loaded into the memory of the Ollama hosts.
+
+    Models are warmed up as soon as a session switches to them, so the
+    first prompt does not pay the load time. A background check unloads
+    models no session has used for MODEL_IDLE_UNLOAD_SECONDS and, if
+    MODEL_MEMORY_LIMIT_BYTES is set, the least recently used idle models
+    until the loaded models fit into the limit.
+    """
+
+    def __init__(self):
+        self.loaded: List[Dict] = []
+        self.last_used: Dict[str, float] = {}
+        self._started_at = time.monotonic()
+        self._warmups: Dict[str, asyncio.Task] = {}
+        self._monitor: Optional[asyncio.Task] = None
+
+    def keep_alive_for(self, model_name: str) -> Union[str, float]:
+        """Keep-alive value to send with requests for a model."""
+        return MODEL_KEEP_ALIVE.get(model_name, DEFAULT_KEEP_ALIVE)
+
+    def touch(self, model_name: str) -> None:
+        """Record that a session is using a model."""
+        self.last_used[model_name] = time.monotonic()
+
+    def is_loaded(self, model_name: str) -> bool:
+        """Whether the model was resident at the last check."""
+        return any(model.get('model') == model_name for model in self.loaded)
+
+    def get_memory_usage(self) -> Dict[str, int]:
+        """Total memory and VRAM used by the loaded models in bytes."""
+        return {
+            'size': sum(model.get('size', 0) for model in self.loaded),
+            'size_vram': sum(model.get('size_vram', 0) for model in self.loaded),
+        }
+
+    def warm_up(self, model_name: str) -> None:
+        """Load a model in the background unless it is loaded or loading already."""
+        self.touch(model_name)
+        task = self._warmups.get(model_name)
+        if self.is_loaded(model_name) or (task is not None and not task.done()):
+            return
+        self._warmups[model_name] = asyncio.get_running_loop().create_task(self._load(model_name))
+
+    async def refresh(self) -> List[Dict]:
+        """Fetch the currently loaded models from all hosts (only /api/ps, not the model lists)."""
+        try:
+            await host_pool.refresh_loaded()
+            self.loaded = host_pool.get_loaded()
+        except Exception as e:
+            print(f"Error fetching loaded models: {str(e)}")
+        return self.loaded
+
+    async def unload(self, model_name: str) -> None:
+        """Ask every host that holds a model to release it from memory."""
+        for host in {model.get('host') for model in self.loaded if model.get('model') == model_name}:
+            try:
+                await client_pool.get_async_client(host).generate(model=model_name, keep_alive=0)
+                self.loaded = [model for model in self.loaded
+                               if model.get('model') != model_name or model.get('host') != host]
+            except Exception as e:
+                print(f"Error unloading model: {str(e)}")
+
+    def start(self) -> None:
+        """Start the periodic residency check (call once the event loop runs)."""
+        if self._monitor is None:
+            self._monitor = asyncio.get_running_loop().create_task(self._check_periodically())
+
+    async def _load(self, model_name: str) -> None:
+        """Load a model on the host that will serve it by sending an empty prompt."""
+        try:
+            await client_pool.get_async_client(host_pool.select(model_name)).generate(
+                model=model_name, prompt='', keep_alive=self.keep_alive_for(model_name)
+            )
+            await self.refresh()
+        except Exception as e:
+            print(f"Error warming up model: {str(e)}")
+
+    async def _check_periodically(self) -> None:
+        """Refresh the residency and unload models nobody needs."""
+        while True:
+            await self.refresh()
+            await self._unload_unused()
+            await asyncio.sleep(MODEL_RESIDENCY_CHECK_INTERVAL)
+
+    async def _unload_unused(self) -> None:
+        """Unload idle models, then the least recently used ones above the memory limit."""
+        now = time.monotonic()
+        idle = sorted(
+            (model for model in self.loaded if self._is_idle(model.get('model'))),
+            key=lambda model: self.last_used.get(model.get('model'), self._started_at)
+        )
+        for model in idle:
+            last_used = self.last_used.get(model.get('model'), self._started_at)
+            if now - last_used > MODEL_IDLE_UNLOAD_SECONDS:
+                await self.unload(model.get('model'))
+        if MODEL_MEMORY_LIMIT_BYTES is None:
+            return
+        for model in idle:
+            if self.get_memory_usage()['size'] <= MODEL_MEMORY_LIMIT_BYTES:
+                break
+            if self.is_loaded(model.get('model')):
+                await self.unload(model.get('model'))
+
+    def _is_idle(self, model_name: str) -> bool:
+        """Whether no generation is running or waiting for the model."""
+        stats = scheduler.get_stats().get(model_name)
+        return stats is None or (stats['running'] == 0 and stats['waiting'] == 0)
+
+
+residency_manager = ModelResidencyManager()
+
+metrics.gauge('qv_loaded_model_bytes', 'Memory used by the models loaded into Ollama',
+              lambda: {(kind,): size for kind, size in residency_manager.get_memory_usage().items()}, ('kind',))
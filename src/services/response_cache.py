@@ -0,0 +1,153 @@
+"""
+Response cache for the chat application.
+Answers repeated questions without running the model again.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config.config import (
+    RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL,
+    RESPONSE_CACHE_PATH, RESPONSE_CACHE_DISK_MAX_ENTRIES
+)
+
+
+def _normalize(text: str) -> str:
+    """Collapse whitespace so that formatting differences do not miss the cache."""
+    return ' '.join(text.split())
+
+
+class ResponseCache:
+    """Process-wide exact-match cache of model responses.
+
+    Entries are keyed on the model, the system message, the normalized
+    history, the prompt and the generation options. The newest entries are
+    kept in an in-memory LRU; all of them are also written to SQLite, so the
+    cache survives restarts. Entries expire after RESPONSE_CACHE_TTL seconds.
+    """
+
+    def __init__(self, enabled: bool = RESPONSE_CACHE_ENABLED, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 ttl: float = RESPONSE_CACHE_TTL, path: Optional[str] = RESPONSE_CACHE_PATH,
+                 disk_max_entries: int = RESPONSE_CACHE_DISK_MAX_ENTRIES):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.disk_max_entries = disk_max_entries
+        self.entries: 'OrderedDict[str, Tuple[float, str]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model_name: str, system_message: str, history: List[Dict[str, str]],
+                 prompt: str, options: Dict[str, Any]) -> str:
+        """Build the cache key of a request."""
+        history_hash = hashlib.sha256(json.dumps(
+            [(message['role'], _normalize(message['content'])) for message in history]
+        ).encode()).hexdigest()
+        key = json.dumps([model_name, _normalize(system_message), history_hash, _normalize(prompt), options],
+                         sort_keys=True)
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Get a cached response, looking at memory first and then at the disk."""
+        entry = self.entries.get(key)
+        if entry is not None and self._is_expired(entry[0]):
+            del self.entries[key]
+            entry = None
+        if entry is None and self.path is not None:
+            entry = await asyncio.to_thread(self._load, key)
+            if entry is not None:
+                self._remember(key, entry)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, response: str) -> None:
+        """Cache a response; the disk write happens in the background."""
+        entry = (time.time(), response)
+        self._remember(key, entry)
+        if self.path is not None:
+            asyncio.get_running_loop().run_in_executor(None, self._store, key, entry)
+
+    def get_stats(self) -> Dict[str, float]:
+        """Hit and miss counters of the cache."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'entries': len(self.entries),
+        }
+
+    def _remember(self, key: str, entry: Tuple[float, str]) -> None:
+        """Put an entry into the memory tier and evict the least recently used ones."""
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _is_expired(self, stored_at: float) -> bool:
+        """Whether an entry is older than the TTL."""
+        return time.time() - stored_at > self.ttl
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use (call with the lock held)."""
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS responses '
+                '(key TEXT PRIMARY KEY, response TEXT NOT NULL, stored_at REAL NOT NULL, used_at REAL NOT NULL)'
+            )
+            self._db.execute('DELETE FROM responses WHERE stored_at < ?', (time.time() - self.ttl,))
+            self._db.commit()
+        return self._db
+
+    def _load(self, key: str) -> Optional[Tuple[float, str]]:
+        """Read an entry from the disk tier."""
+        try:
+            with self._db_lock:
+                db = self._connect()
+                row = db.execute('SELECT stored_at, response FROM responses WHERE key = ?', (key,)).fetchone()
+                if row is None:
+                    return None
+                if self._is_expired(row[0]):
+                    db.execute('DELETE FROM responses WHERE key = ?', (key,))
+                    db.commit()
+                    return None
+                db.execute('UPDATE responses SET used_at = ? WHERE key = ?', (time.time(), key))
+                db.commit()
+                return row
+        except Exception as e:
+            print(f"Error reading response cache: {str(e)}")
+            return None
+
+    def _store(self, key: str, entry: Tuple[float, str]) -> None:
+        """Write an entry to the disk tier and drop the least recently used ones above the limit."""
+        try:
+            with self._db_lock:
+                db = self._connect()
+                db.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)', (key, entry[1], entry[0], entry[0]))
+                db.execute(
+                    'DELETE FROM responses WHERE key IN '
+                    '(SELECT key FROM responses ORDER BY used_at DESC LIMIT -1 OFFSET ?)',
+                    (self.disk_max_entries,)
+                )
+                db.commit()
+        except Exception as e:
+            print(f"Error writing response cache: {str(e)}")
+
+
+response_cache = ResponseCache()
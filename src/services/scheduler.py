@@ -0,0 +1,185 @@
+"""
+Request scheduling for the chat application.
+Limits concurrent generations per model and queues the rest fairly.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Deque, Dict, List, Optional
+
+from src.config.config import (
+    SCHEDULER_MAX_CONCURRENT_PER_MODEL, SCHEDULER_MODEL_CONCURRENCY,
+    SCHEDULER_MAX_QUEUE_DEPTH, SCHEDULER_INITIAL_DURATION_ESTIMATE
+)
+from src.services.hosts import host_pool
+from src.services.metrics import metrics, GENERATIONS, QUEUE_WAIT
+
+# Weight of the newest generation in the moving average of durations
+DURATION_SMOOTHING = 0.2
+
+QueueCallback = Callable[[int, float], None]
+
+
+class QueueFullError(Exception):
+    """Raised when the queue of a model has reached its maximum depth."""
+
+
+class _Ticket:
+    """A generation request waiting for a slot."""
+    __slots__ = ('session_id', 'future', 'on_update')
+
+    def __init__(self, session_id: str, future: asyncio.Future, on_update: Optional[QueueCallback]):
+        self.session_id = session_id
+        self.future = future
+        self.on_update = on_update
+
+
+class _ModelQueue:
+    """Running count and per-session waiting lines of a single model."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.running = 0
+        self.sessions: 'OrderedDict[str, Deque[_Ticket]]' = OrderedDict()
+        self.average_duration = SCHEDULER_INITIAL_DURATION_ESTIMATE
+
+    @property
+    def depth(self) -> int:
+        """Number of waiting requests."""
+        return sum(len(tickets) for tickets in self.sessions.values())
+
+    def waiting_order(self) -> List[_Ticket]:
+        """Waiting requests in the order they will be served (round-robin over sessions)."""
+        order = []
+        lines = [list(tickets) for tickets in self.sessions.values()]
+        for round_index in range(max((len(line) for line in lines), default=0)):
+            order.extend(line[round_index] for line in lines if round_index < len(line))
+        return order
+
+    def pop_next(self) -> _Ticket:
+        """Take the next request and move its session to the end of the rotation."""
+        session_id, tickets = next(iter(self.sessions.items()))
+        ticket = tickets.popleft()
+        if tickets:
+            self.sessions.move_to_end(session_id)
+        else:
+            del self.sessions[session_id]
+        return ticket
+
+    def remove(self, ticket: _Ticket) -> None:
+        """Drop a request that is no longer waiting."""
+        tickets = self.sessions.get(ticket.session_id)
+        if tickets is not None and ticket in tickets:
+            tickets.remove(ticket)
+            if not tickets:
+                del self.sessions[ticket.session_id]
+
+
+class GenerationScheduler:
+    """Process-wide scheduler for generation requests.
+
+    Each model gets its own queue with a concurrency limit per host that
+    can serve the model. Waiting requests
+    are served round-robin across sessions, so one busy session cannot starve
+    the others, and new requests are rejected once a queue is full.
+    """
+
+    def __init__(self, max_concurrent_per_model: int = SCHEDULER_MAX_CONCURRENT_PER_MODEL,
+                 max_queue_depth: int = SCHEDULER_MAX_QUEUE_DEPTH):
+        self.max_concurrent_per_model = max_concurrent_per_model
+        self.max_queue_depth = max_queue_depth
+        self.queues: Dict[str, _ModelQueue] = {}
+
+    @asynccontextmanager
+    async def slot(self, model_name: str, session_id: str,
+                   on_update: Optional[QueueCallback] = None) -> AsyncIterator[None]:
+        """Wait for a generation slot of the given model and hold it while inside the block.
+
+        While waiting, on_update is called with the queue position and the
+        expected wait in seconds whenever they change.
+        """
+        queue = self._get_queue(model_name)
+        requested = time.monotonic()
+        try:
+            await self._acquire(queue, session_id, on_update)
+        except QueueFullError:
+            GENERATIONS.inc(model_name, 'rejected')
+            raise
+        start = time.monotonic()
+        QUEUE_WAIT.observe(start - requested, model_name)
+        try:
+            yield
+        finally:
+            self._release(queue, time.monotonic() - start)
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """Running and waiting requests per model."""
+        return {
+            model_name: {
+                'running': queue.running,
+                'waiting': queue.depth,
+                'limit': queue.limit,
+                'average_duration': round(queue.average_duration, 2),
+            }
+            for model_name, queue in self.queues.items()
+        }
+
+    def _get_queue(self, model_name: str) -> _ModelQueue:
+        """Get or create the queue of a model, scaling its limit with the hosts that serve the model."""
+        limit = SCHEDULER_MODEL_CONCURRENCY.get(model_name, self.max_concurrent_per_model)
+        limit *= max(1, host_pool.count_serving(model_name))
+        if model_name not in self.queues:
+            self.queues[model_name] = _ModelQueue(limit)
+        self.queues[model_name].limit = limit
+        return self.queues[model_name]
+
+    async def _acquire(self, queue: _ModelQueue, session_id: str, on_update: Optional[QueueCallback]) -> None:
+        """Take a free slot or wait in line for one."""
+        if queue.running < queue.limit and not queue.sessions:
+            queue.running += 1
+            return
+        if queue.depth >= self.max_queue_depth:
+            raise QueueFullError(f"Queue is full ({self.max_queue_depth} requests waiting)")
+
+        ticket = _Ticket(session_id, asyncio.get_running_loop().create_future(), on_update)
+        queue.sessions.setdefault(session_id, deque()).append(ticket)
+        self._notify(queue)
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            if ticket.future.done() and not ticket.future.cancelled():
+                self._release(queue, None)  # The slot was granted right before the cancellation
+            else:
+                queue.remove(ticket)
+                self._notify(queue)
+            raise
+
+    def _release(self, queue: _ModelQueue, duration: Optional[float]) -> None:
+        """Free a slot and hand it to the next waiting request."""
+        queue.running -= 1
+        if duration is not None:
+            queue.average_duration += DURATION_SMOOTHING * (duration - queue.average_duration)
+        while queue.running < queue.limit and queue.sessions:
+            ticket = queue.pop_next()
+            if ticket.future.done():
+                continue
+            queue.running += 1
+            ticket.future.set_result(None)
+        self._notify(queue)
+
+    def _notify(self, queue: _ModelQueue) -> None:
+        """Tell every waiting request its current position and expected wait."""
+        for position, ticket in enumerate(queue.waiting_order(), start=1):
+            if ticket.on_update is not None:
+                expected_wait = math.ceil(position / queue.limit) * queue.average_duration
+                ticket.on_update(position, expected_wait)
+
+
+scheduler = GenerationScheduler()
+
+metrics.gauge('qv_scheduler_running', 'Generations holding a slot',
+              lambda: {(name,): queue.running for name, queue in scheduler.queues.items()}, ('model',))
+metrics.gauge('qv_scheduler_waiting', 'Generations waiting for a slot',
+              lambda: {(name,): queue.depth for name, queue in scheduler.queues.items()}, ('model',))
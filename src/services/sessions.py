@@ -0,0 +1,128 @@
+"""
+Session lifecycle management for the chat application.
+Tracks live sessions, their activity and their memory footprint.
+"""
+import asyncio
+import os
+import secrets
+import time
+from typing import Any, Dict, List, Optional
+
+from src.config.config import SESSION_IDLE_TIMEOUT, SESSION_CHECK_INTERVAL, STORAGE_SECRET, STORAGE_SECRET_PATH
+from src.services.metrics import metrics
+
+
+def get_storage_secret(path: str = STORAGE_SECRET_PATH) -> str:
+    """Secret that signs the browser id cookie.
+
+    Without STORAGE_SECRET a random secret is generated on the first start
+    and kept on disk, so browsers keep their conversations across restarts.
+    """
+    if STORAGE_SECRET:
+        return STORAGE_SECRET
+    try:
+        with open(path, encoding='utf-8') as file:
+            return file.read().strip()
+    except FileNotFoundError:
+        pass
+    secret = secrets.token_urlsafe(32)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w', encoding='utf-8') as file:
+        file.write(secret)
+    return secret
+
+
+class _Session:
+    """Bookkeeping of a single session."""
+    __slots__ = ('state', 'created_at', 'last_active', 'hibernated')
+
+    def __init__(self, state: Any):
+        self.state = state
+        self.created_at = time.time()
+        self.last_active = time.monotonic()
+        self.hibernated = False
+
+
+class SessionRegistry:
+    """Process-wide registry of the sessions (browser tabs) of the server.
+
+    The state of a session is duck-typed. It must provide
+    is_alive() and is_busy(), which return bools; get_memory_usage(),
+    which returns bytes; hibernate(), which frees what can be reloaded;
+    and an async close(). A background check closes the state of
+    sessions whose client is gone. It also hibernates sessions that have
+    been idle for SESSION_IDLE_TIMEOUT seconds.
+    """
+
+    def __init__(self, idle_timeout: float = SESSION_IDLE_TIMEOUT, check_interval: float = SESSION_CHECK_INTERVAL):
+        self.idle_timeout = idle_timeout
+        self.check_interval = check_interval
+        self.sessions: Dict[str, _Session] = {}
+        self._monitor: Optional[asyncio.Task] = None
+
+    def register(self, session_id: str, state: Any) -> None:
+        """Start tracking a session."""
+        self.sessions[session_id] = _Session(state)
+
+    def unregister(self, session_id: str) -> None:
+        """Stop tracking a session."""
+        self.sessions.pop(session_id, None)
+
+    def touch(self, session_id: str) -> None:
+        """Record activity of a session."""
+        session = self.sessions.get(session_id)
+        if session is not None:
+            session.last_active = time.monotonic()
+            session.hibernated = False
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """Activity and memory footprint of every session."""
+        now = time.monotonic()
+        return [
+            {
+                'session_id': session_id,
+                'created_at': session.created_at,
+                'idle_seconds': round(now - session.last_active, 1),
+                'busy': session.state.is_busy(),
+                'hibernated': session.hibernated,
+                'memory': session.state.get_memory_usage(),
+            }
+            for session_id, session in self.sessions.items()
+        ]
+
+    def get_total_memory(self) -> int:
+        """Memory footprint of all sessions in bytes."""
+        return sum(session.state.get_memory_usage() for session in self.sessions.values())
+
+    async def reclaim(self) -> None:
+        """Close sessions whose client is gone and hibernate idle ones."""
+        now = time.monotonic()
+        for session_id, session in list(self.sessions.items()):
+            try:
+                if not session.state.is_alive():
+                    await session.state.close()
+                    self.unregister(session_id)
+                elif (not session.hibernated and not session.state.is_busy()
+                      and now - session.last_active > self.idle_timeout):
+                    session.state.hibernate()
+                    session.hibernated = True
+            except Exception as e:
+                print(f"Error reclaiming session: {str(e)}")
+
+    def start(self) -> None:
+        """Start the periodic session check (call once the event loop runs)."""
+        if self._monitor is None:
+            self._monitor = asyncio.get_running_loop().create_task(self._check_periodically())
+
+    async def _check_periodically(self) -> None:
+        """Reclaim the state of dead and idle sessions."""
+        while True:
+            await asyncio.sleep(self.check_interval)
+            await self.reclaim()
+
+
+session_registry = SessionRegistry()
+
+metrics.gauge('qv_sessions', 'Tracked sessions', lambda: {(): len(session_registry.sessions)})
+metrics.gauge('qv_session_memory_bytes', 'Memory footprint of all sessions',
+              lambda: {(): session_registry.get_total_memory()})
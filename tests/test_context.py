@@ -0,0 +1,85 @@
+"""
+Tests for the token-budgeted context window.
+"""
+from qv_ollama_sdk import Conversation
+
+from src.config.config import CONTEXT_CHARS_PER_TOKEN, CONTEXT_EVICT_TARGET
+from src.services.context import ContextWindow, estimate_tokens
+
+TURN_TOKENS = 10
+TEXT = 'x' * (TURN_TOKENS * CONTEXT_CHARS_PER_TOKEN)
+
+
+def make_conversation(turns: int) -> Conversation:
+    """A conversation with a system message and turns of TURN_TOKENS tokens per message."""
+    conversation = Conversation(model_name='test-model')
+    conversation.add_system_message(TEXT)
+    for turn in range(turns):
+        conversation.add_user_message(f'{turn}{TEXT}'[:len(TEXT)])
+        conversation.add_assistant_message(TEXT)
+    return conversation
+
+
+def prompt_tokens(messages) -> int:
+    return sum(estimate_tokens(message['content']) for message in messages)
+
+
+def test_short_conversation_is_sent_completely():
+    conversation = make_conversation(3)
+    messages = ContextWindow(budget=1000, summarize=False).build_messages(conversation)
+    assert messages == [message.to_dict() for message in conversation.messages]
+
+
+def test_long_conversation_keeps_system_message_and_newest_turns():
+    conversation = make_conversation(20)
+    conversation.add_user_message(TEXT)
+    window = ContextWindow(budget=100, summarize=False)
+    messages = window.build_messages(conversation)
+
+    assert messages[0] == conversation.messages[0].to_dict()
+    assert messages[1]['role'] == 'user'
+    assert messages[1:] == [message.to_dict() for message in conversation.messages[-(len(messages) - 1):]]
+    assert prompt_tokens(messages) <= 100 * CONTEXT_EVICT_TARGET
+    assert window.total_tokens == prompt_tokens(messages)
+
+
+def test_window_start_stays_put_until_the_budget_is_exceeded_again():
+    conversation = make_conversation(20)
+    conversation.add_user_message(TEXT)
+    window = ContextWindow(budget=100, summarize=False)
+    first = window.build_messages(conversation)
+
+    conversation.add_assistant_message(TEXT)
+    conversation.add_user_message(TEXT)
+    second = window.build_messages(conversation)
+
+    assert second[:len(first)] == first  # Same prompt prefix, so Ollama can reuse its cache
+    assert prompt_tokens(second) <= 100
+
+
+def test_compact_drops_evicted_turns_without_changing_the_prompt():
+    conversation = make_conversation(20)
+    conversation.add_user_message(TEXT)
+    window = ContextWindow(budget=100, summarize=False)
+    before = window.build_messages(conversation)
+
+    window.compact(conversation)
+
+    assert len(conversation.messages) == len(before)
+    assert conversation.messages[0].role == 'system'
+    assert window.build_messages(conversation) == before
+
+
+def test_discard_forgets_the_newest_prompt():
+    conversation = make_conversation(2)
+    window = ContextWindow(budget=1000, summarize=False)
+    window.build_messages(conversation)
+    tokens = window.total_tokens
+
+    prompt = conversation.add_user_message(TEXT)
+    window.build_messages(conversation)
+    window.discard(conversation, prompt)
+
+    assert conversation.messages[-1].role == 'assistant'
+    assert window.total_tokens == tokens
+    assert window.build_messages(conversation) == [message.to_dict() for message in conversation.messages]
@@ -0,0 +1,166 @@
+"""
+Tests for document chunking and the vector index files.
+"""
+import os
+import zlib
+from typing import List
+
+import numpy as np
+import pytest
+
+from src.services.documents import DocumentIndex, chunk_text
+
+DIMENSIONS = 32
+OWNER = 'browser-1'
+
+
+def embed_words(texts: List[str], dimensions: int = DIMENSIONS) -> np.ndarray:
+    """Bag-of-words vectors, normalized like DocumentIndex._embed."""
+    vectors = np.zeros((len(texts), dimensions), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in text.lower().split():
+            vectors[row, zlib.crc32(word.strip('.,').encode()) % dimensions] += 1
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def open_index(path: str, dimensions: int = DIMENSIONS) -> DocumentIndex:
+    """An index that embeds locally instead of asking Ollama."""
+    index = DocumentIndex(path=str(path), model_name='test-embed', batch_size=2, top_k=2)
+
+    async def embed(texts: List[str], purpose: str) -> np.ndarray:
+        return embed_words(texts, dimensions)
+
+    index._embed = embed
+    return index
+
+
+def paragraphs(topic: str, count: int) -> str:
+    return '\n\n'.join(f'{topic} paragraph {number} talks about {topic} only.' for number in range(count))
+
+
+def test_chunks_respect_size_and_overlap():
+    text = ' '.join(f'word{number}' for number in range(500))
+    chunks = chunk_text(text, size=200, overlap=50)
+
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    assert chunks[0].startswith('word0 ') and chunks[-1].endswith('word499')
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.split()[0] in previous.split()  # Consecutive chunks overlap at a word boundary
+    assert {word for chunk in chunks for word in chunk.split()} == set(text.split())
+
+
+def test_chunks_end_at_paragraphs():
+    text = 'a' * 120 + '\n\n' + 'b' * 120
+    assert chunk_text(text, size=200, overlap=0) == ['a' * 120, 'b' * 120]
+
+
+async def test_search_returns_the_chunks_of_the_selected_documents(tmp_path):
+    index = open_index(tmp_path)
+    cats = await index.add(OWNER, 'cats.txt', paragraphs('cats', 100))
+    dogs = await index.add(OWNER, 'dogs.txt', paragraphs('dogs', 100))
+    assert cats['chunks'] > 2 and dogs['chunks'] > 2
+
+    results = await index.search('dogs', [cats['id'], dogs['id']], OWNER)
+    assert [result['document'] for result in results] == ['dogs.txt', 'dogs.txt']
+    assert all(result['text'] in paragraphs('dogs', 100) for result in results)
+    assert results[0]['score'] >= results[1]['score']
+
+    results = await index.search('dogs', [cats['id']], OWNER)
+    assert {result['document'] for result in results} == {'cats.txt'}
+
+
+async def test_index_files_are_read_back_after_a_restart(tmp_path):
+    index = open_index(tmp_path)
+    cats = await index.add(OWNER, 'cats.txt', paragraphs('cats', 100))
+    dogs = await index.add(OWNER, 'dogs.txt', paragraphs('dogs', 100))
+    before = await index.search('dogs paragraph 7', [cats['id'], dogs['id']], OWNER)
+
+    reopened = open_index(tmp_path)
+    assert reopened.get_documents(OWNER) == index.get_documents(OWNER)
+    assert reopened.count == index.count == cats['chunks'] + dogs['chunks']
+    assert await reopened.search('dogs paragraph 7', [cats['id'], dogs['id']], OWNER) == before
+
+
+async def test_remove_rewrites_the_files_without_the_document(tmp_path):
+    index = open_index(tmp_path)
+    cats = await index.add(OWNER, 'cats.txt', paragraphs('cats', 100))
+    dogs = await index.add(OWNER, 'dogs.txt', paragraphs('dogs', 100))
+    expected = await index.search('dogs paragraph 3', [dogs['id']], OWNER)
+
+    await index.remove(cats['id'], OWNER)
+
+    assert [document['name'] for document in index.get_documents(OWNER)] == ['dogs.txt']
+    assert index.count == dogs['chunks']
+    assert await index.search('dogs paragraph 3', [dogs['id']], OWNER) == expected
+    assert await index.search('cats', [cats['id']], OWNER) == []
+    directory = tmp_path / 'test-embed'
+    assert sorted(os.listdir(directory)) == ['chunks.1.bin', 'manifest.json', 'texts.1.txt', 'vectors.1.f32']
+    assert os.path.getsize(directory / 'vectors.1.f32') == dogs['chunks'] * DIMENSIONS * 4
+
+    birds = await index.add(OWNER, 'birds.txt', paragraphs('birds', 5))
+    assert birds['id'] == dogs['id'] + 1
+    reopened = open_index(tmp_path)
+    assert await reopened.search('birds', [birds['id']], OWNER) == await index.search('birds', [birds['id']], OWNER)
+
+
+async def test_rows_written_after_the_manifest_are_ignored(tmp_path):
+    index = open_index(tmp_path)
+    cats = await index.add(OWNER, 'cats.txt', paragraphs('cats', 100))
+    directory = tmp_path / 'test-embed'
+    for name, size in (('vectors.f32', DIMENSIONS * 4 * 3), ('chunks.bin', 16 * 3), ('texts.txt', 100)):
+        with open(directory / name, 'ab') as file:  # An interrupted write
+            file.write(b'\xff' * size)
+
+    reopened = open_index(tmp_path)
+    assert len(reopened.get_documents(OWNER)) == 1
+    assert reopened.count == cats['chunks']
+    dogs = await reopened.add(OWNER, 'dogs.txt', paragraphs('dogs', 100))
+    results = await reopened.search('dogs', [dogs['id']], OWNER)
+    assert results and all(result['text'] in paragraphs('dogs', 100) for result in results)
+    assert os.path.getsize(directory / 'vectors.f32') == reopened.count * DIMENSIONS * 4
+
+
+async def test_interrupted_rewrite_keeps_the_previous_files(tmp_path, monkeypatch):
+    index = open_index(tmp_path)
+    cats = await index.add(OWNER, 'cats.txt', paragraphs('cats', 100))
+    dogs = await index.add(OWNER, 'dogs.txt', paragraphs('dogs', 100))
+    expected = await index.search('dogs', [cats['id'], dogs['id']], OWNER)
+
+    def crash(count: int) -> None:
+        raise OSError('No space left on device')
+
+    monkeypatch.setattr(index, '_save_manifest', crash)  # Crash right before the manifest is replaced
+    with pytest.raises(OSError):
+        await index.remove(cats['id'], OWNER)
+
+    for reopened in (index, open_index(tmp_path)):
+        assert [document['name'] for document in reopened.get_documents(OWNER)] == ['cats.txt', 'dogs.txt']
+        assert await reopened.search('dogs', [cats['id'], dogs['id']], OWNER) == expected
+    assert 'vectors.1.f32' not in os.listdir(tmp_path / 'test-embed')  # Removed when the index was reopened
+
+
+async def test_unreadable_files_open_an_empty_index(tmp_path):
+    await open_index(tmp_path).add(OWNER, 'cats.txt', paragraphs('cats', 100))
+    os.truncate(tmp_path / 'test-embed' / 'vectors.f32', 0)
+
+    index = open_index(tmp_path)
+    assert index.get_documents(OWNER) == [] and index.count == 0
+    dogs = await index.add(OWNER, 'dogs.txt', paragraphs('dogs', 10))
+    assert await index.search('dogs', [dogs['id']], OWNER)
+
+
+async def test_documents_are_only_visible_to_their_owner(tmp_path):
+    index = open_index(tmp_path)
+    cats = await index.add(OWNER, 'cats.txt', paragraphs('cats', 10))
+    dogs = await index.add('browser-2', 'dogs.txt', paragraphs('dogs', 10))
+
+    assert [document['name'] for document in index.get_documents(OWNER)] == ['cats.txt']
+    assert await index.search('dogs', [cats['id'], dogs['id']], OWNER) == await index.search('dogs', [cats['id']], OWNER)
+    await index.remove(dogs['id'], OWNER)
+    assert [document['name'] for document in index.get_documents('browser-2')] == ['dogs.txt']
+
+
+async def test_vectors_of_another_size_are_rejected(tmp_path):
+    await open_index(tmp_path).add(OWNER, 'cats.txt', paragraphs('cats', 5))
+    with pytest.raises(ValueError):
+        await open_index(tmp_path, dimensions=DIMENSIONS * 2).add(OWNER, 'dogs.txt', paragraphs('dogs', 5))
@@ -0,0 +1,95 @@
+"""
+Tests for the compact chat history.
+"""
+import sys
+
+from src.config.config import USER_ID, AI_ID, STATUS_ID
+from src.services.history import COLUMN_BYTES, MessageHistory
+
+
+def expected_bytes(history: MessageHistory) -> int:
+    """Bytes of the loaded texts and HTML, counted from scratch."""
+    seqs = range(history.offset, history.count)
+    texts = sum(COLUMN_BYTES + sys.getsizeof(history.get(seq)[1]) for seq in seqs)
+    html = sum(sys.getsizeof(history.get_html(seq)) for seq in seqs if history.get_html(seq) is not None)
+    return texts + html
+
+
+def make_history(count: int, max_bytes: int = 10 ** 9) -> MessageHistory:
+    history = MessageHistory(max_bytes=max_bytes)
+    for seq in range(count):
+        history.append(USER_ID if seq % 2 == 0 else AI_ID, f'message {seq} ' * 10, 1000 + seq)
+    return history
+
+
+def test_messages_are_addressed_by_their_position():
+    history = make_history(0)
+    assert history.append(USER_ID, 'question', 1) == 0
+    assert history.append(STATUS_ID, 'Generation stopped.', 2) == 1
+    history.reset(10, [(USER_ID, 'older', 3), (AI_ID, 'answer', 4)])
+
+    assert (history.offset, history.count, len(history)) == (10, 12, 2)
+    assert history.get(11) == (AI_ID, 'answer', 4)
+    history.prepend(8, [(USER_ID, 'a', 5), (AI_ID, 'b', 6)])
+    assert history.get(8) == (USER_ID, 'a', 5)
+    assert history.get(11) == (AI_ID, 'answer', 4)
+    assert history.bytes == expected_bytes(history)
+
+
+def test_drop_before_unloads_messages_with_their_html_and_details():
+    history = make_history(10)
+    for seq in range(10):
+        history.set_html(seq, f'<p>{seq}</p>')
+    history.set_details(2, 'stats')
+    history.set_details(8, 'stats')
+
+    history.drop_before(5)
+
+    assert (history.offset, history.count) == (5, 10)
+    assert history.get(5)[1].startswith('message 5 ')
+    assert history.get_html(4) is None and history.get_html(5) == '<p>5</p>'
+    assert history.get_details(2) is None and history.get_details(8) == 'stats'
+    assert history.bytes == expected_bytes(history)
+
+
+def test_drop_before_ignores_positions_outside_the_loaded_range():
+    history = make_history(4)
+    history.drop_before(2)
+    history.drop_before(1)
+    assert history.offset == 2
+    history.drop_before(100)
+    assert (history.offset, history.count, len(history), history.bytes) == (4, 4, 0, 0)
+
+
+def test_spill_unloads_the_oldest_messages_until_under_the_cap():
+    history = make_history(20)
+    history.max_bytes = history.bytes // 2
+
+    history.spill(keep_from=20)
+
+    assert history.count == 20 and 0 < len(history) < 20
+    assert history.bytes <= history.max_bytes
+    assert history.bytes == expected_bytes(history)
+    one_more = make_history(20)
+    one_more.drop_before(history.offset - 1)
+    assert one_more.bytes > history.max_bytes  # Only as many messages as needed were unloaded
+
+
+def test_spill_keeps_messages_from_keep_from():
+    history = make_history(20)
+    history.max_bytes = 0
+
+    history.spill(keep_from=15)
+
+    assert history.offset == 15
+    assert history.get(15)[1].startswith('message 15 ')
+
+
+def test_spill_counts_the_reserved_bytes_against_the_cap():
+    history = make_history(20)
+    history.max_bytes = history.bytes
+
+    history.spill(keep_from=20, reserved_bytes=history.bytes // 2)
+
+    assert 0 < len(history) < 20
+    assert history.bytes <= history.max_bytes - history.max_bytes // 2
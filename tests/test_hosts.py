@@ -0,0 +1,65 @@
+"""
+Tests for the host checks and the model catalog built from them.
+"""
+from typing import Dict, List
+
+import pytest
+
+from src.services import catalog, hosts
+from src.services.catalog import ModelCatalog
+from src.services.hosts import HostPool
+
+
+class FakeClient:
+    """Answers /api/tags and /api/ps like Ollama and counts the requests."""
+
+    def __init__(self):
+        self.models = ['small:latest']
+        self.loaded: List[str] = []
+        self.requests: List[str] = []
+
+    async def list(self) -> Dict:
+        self.requests.append('tags')
+        return {'models': [{'model': name, 'size': 1} for name in self.models]}
+
+    async def ps(self) -> Dict:
+        self.requests.append('ps')
+        return {'models': [{'model': name, 'size': 1} for name in self.loaded]}
+
+
+@pytest.fixture
+def client(monkeypatch) -> FakeClient:
+    client = FakeClient()
+    monkeypatch.setattr(hosts.client_pool, 'get_async_client', lambda host=None: client)
+    return client
+
+
+@pytest.fixture
+def pool(monkeypatch, client) -> HostPool:
+    pool = HostPool()
+    monkeypatch.setattr(catalog, 'host_pool', pool)
+    return pool
+
+
+async def test_refresh_loaded_only_asks_for_the_loaded_models(client, pool):
+    await pool.refresh()
+    client.requests.clear()
+    client.loaded = ['small:latest']
+
+    await pool.refresh_loaded()
+
+    assert client.requests == ['ps']
+    assert [model['model'] for model in pool.get_loaded()] == ['small:latest']
+
+
+async def test_catalog_follows_the_models_found_by_the_host_check(client, pool):
+    model_catalog = ModelCatalog(ttl=3600)
+    await model_catalog.refresh()
+    assert [model['model'] for model in model_catalog.get_models()] == ['small:latest']
+
+    client.models = ['small:latest', 'large:latest']
+    await pool.refresh()  # The periodic check, not a catalog fetch
+    requests = len(client.requests)
+
+    assert [model['model'] for model in model_catalog.get_models()] == ['small:latest', 'large:latest']
+    assert len(client.requests) == requests
@@ -0,0 +1,90 @@
+"""
+Tests for the generation scheduler.
+"""
+import asyncio
+
+import pytest
+
+from src.services.scheduler import GenerationScheduler, QueueFullError
+
+MODEL = 'test-model'
+
+
+async def hold_slot(scheduler: GenerationScheduler, session_id: str, order: list, name: str) -> None:
+    """Take a slot, record the order it was granted in and give it back."""
+    async with scheduler.slot(MODEL, session_id):
+        order.append(name)
+        await asyncio.sleep(0)
+
+
+async def test_waiting_requests_are_served_round_robin_across_sessions():
+    scheduler = GenerationScheduler(max_concurrent_per_model=1)
+    order = []
+    async with scheduler.slot(MODEL, 'holder'):
+        tasks = [asyncio.create_task(hold_slot(scheduler, session_id, order, name))
+                 for session_id, name in [('a', 'a1'), ('a', 'a2'), ('a', 'a3'), ('b', 'b1'), ('c', 'c1')]]
+        await asyncio.sleep(0)
+        assert scheduler.queues[MODEL].depth == 5
+    await asyncio.gather(*tasks)
+
+    assert order == ['a1', 'b1', 'c1', 'a2', 'a3']
+    assert scheduler.queues[MODEL].running == 0
+
+
+async def test_cancelled_waiting_request_leaves_the_queue():
+    scheduler = GenerationScheduler(max_concurrent_per_model=1)
+    async with scheduler.slot(MODEL, 'holder'):
+        waiter = asyncio.create_task(hold_slot(scheduler, 'a', [], 'a1'))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert scheduler.queues[MODEL].depth == 0
+        assert scheduler.queues[MODEL].running == 1
+    assert scheduler.queues[MODEL].running == 0
+
+
+async def test_slot_granted_right_before_cancellation_is_released():
+    scheduler = GenerationScheduler(max_concurrent_per_model=1)
+    holder = scheduler.slot(MODEL, 'holder')
+    await holder.__aenter__()
+    waiter = asyncio.create_task(hold_slot(scheduler, 'a', [], 'a1'))
+    await asyncio.sleep(0)
+
+    await holder.__aexit__(None, None, None)  # Hands the slot to the waiter, which has not resumed yet
+    assert scheduler.queues[MODEL].running == 1
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert scheduler.queues[MODEL].running == 0
+    assert scheduler.queues[MODEL].depth == 0
+
+
+async def test_full_queue_rejects_new_requests():
+    scheduler = GenerationScheduler(max_concurrent_per_model=1, max_queue_depth=1)
+    async with scheduler.slot(MODEL, 'holder'):
+        waiter = asyncio.create_task(hold_slot(scheduler, 'a', [], 'a1'))
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFullError):
+            async with scheduler.slot(MODEL, 'b'):
+                pass
+    await waiter
+    assert scheduler.queues[MODEL].running == 0
+
+
+async def test_waiting_requests_are_told_their_position():
+    scheduler = GenerationScheduler(max_concurrent_per_model=1)
+    positions = {'a': [], 'b': []}
+
+    async def wait(session_id: str) -> None:
+        async with scheduler.slot(MODEL, session_id, on_update=lambda position, _: positions[session_id].append(position)):
+            await asyncio.sleep(0)
+
+    async with scheduler.slot(MODEL, 'holder'):
+        tasks = [asyncio.create_task(wait('a')), asyncio.create_task(wait('b'))]
+        await asyncio.sleep(0)
+        assert positions == {'a': [1, 1], 'b': [2]}
+    await asyncio.gather(*tasks)
+
+    assert positions['b'][-1] == 1
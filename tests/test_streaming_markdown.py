@@ -0,0 +1,23 @@
+"""
+Tests for splitting streamed markdown into finished blocks.
+"""
+import pytest
+
+from src.components.streaming_markdown import split_finished_blocks
+
+
+@pytest.mark.parametrize('text, finished', [
+    ('Hello', ''),
+    ('First paragraph\n\nSecond', ''),  # The next line is not complete yet
+    ('First paragraph\n\nSecond\n', 'First paragraph\n\n'),
+    ('One\n\nTwo\n\nThree\n', 'One\n\nTwo\n\n'),
+    ('- first\n\n- second\n', ''),  # A list item continues the list
+    ('Quote\n\n> more\n', ''),
+    ('Code:\n\n    indented\n', ''),
+    ('Intro\n\n```\ncode\n\nmore\n', 'Intro\n\n'),  # Blank lines inside a fence do not end a block
+    ('```\ncode\n```\n\nAfter\n', '```\ncode\n```\n\n'),
+])
+def test_split_finished_blocks(text, finished):
+    head, tail = split_finished_blocks(text)
+    assert head == finished
+    assert head + tail == text